@@ -1,49 +1,63 @@
 """
 File download endpoints
 """
-import os
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from ....core.database import get_db
-from ....core.config import settings
+from ....core.responses import FileRangeResponse
 from ....services.job_service import JobService
+from ....services.output_files import output_files
 from ....models.job import JobStatus
 
 router = APIRouter()
 
 
-@router.get("/{job_id}")
+@router.api_route("/{job_id}", methods=["GET", "HEAD"])
 async def download_translated_file(
     job_id: UUID,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Download the translated PDF file"""
+    """Download the translated PDF file.
     
-    job_service = JobService(db)
-    job = await job_service.get_job(job_id)
+    Supports ``Range`` (with ``If-Range``) for resumable downloads and
+    answers ``If-None-Match``/``If-Modified-Since`` with 304. Every request
+    reads the job's status and output hash; repeat downloads of the same
+    output are then served from the output cache without loading the job.
+    """
     
-    if not job:
+    job_service = JobService(db)
+    state = await job_service.output_state(job_id)
+    if state is None:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if job.status != JobStatus.COMPLETED:
+    status, sha256 = state
+    if status != JobStatus.COMPLETED:
         raise HTTPException(
             status_code=400,
-            detail=f"Job is not completed. Current status: {job.status}"
+            detail=f"Job is not completed. Current status: {status}"
         )
     
-    # Construct output file path
-    output_filename = f"translated_{job.filename}"
-    output_path = os.path.join(settings.upload_dir, f"{job.id}_{output_filename}")
-    
-    if not os.path.exists(output_path):
-        raise HTTPException(status_code=404, detail="Translated file not found")
+    output = output_files.get(job_id, sha256)
+    if output is None:
+        job = await job_service.get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        
+        output = await job_service.output_file(job)
+        if output is None:
+            raise HTTPException(status_code=404, detail="Translated file not found")
+        output_files.put(output)
     
-    # Return file response
-    return FileResponse(
-        path=output_path,
-        filename=output_filename,
-        media_type="application/pdf"
+    return FileRangeResponse(
+        path=output.path,
+        request_headers=request.headers,
+        size=output.size,
+        etag=output.etag,
+        last_modified=output.last_modified,
+        filename=output.filename,
+        media_type="application/pdf",
+        method=request.method
     )
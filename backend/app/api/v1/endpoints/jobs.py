@@ -4,12 +4,16 @@ Job management endpoints
 from typing import List, Optional
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from ....core.database import get_db
 from ....models.job import Job, JobStatus
 from ....schemas.job import JobCreate, JobResponse, JobListResponse
+from ....services.job_events import job_event_broker, stream_job_events
 from ....services.job_service import JobService
+from ....services.pagination import InvalidCursor
+from ....services.segment_stream import SegmentQuery, SegmentStream, decode_segment_cursor, parse_fields
 
 router = APIRouter()
 
@@ -34,22 +38,29 @@ async def list_jobs(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     status: Optional[JobStatus] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; takes precedence over skip"),
     db: Session = Depends(get_db)
 ):
-    """List translation jobs with pagination"""
+    """List translation jobs, newest first"""
     job_service = JobService(db)
     
-    jobs, total = await job_service.list_jobs(
-        skip=skip, 
-        limit=limit, 
-        status=status
-    )
+    try:
+        page = await job_service.list_jobs(
+            skip=skip, 
+            limit=limit, 
+            status=status,
+            cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return {
-        "jobs": [job.to_dict() for job in jobs],
-        "total": total,
-        "skip": skip,
-        "limit": limit
+        "jobs": [job.to_dict() for job in page.jobs],
+        "total": page.total,
+        "total_estimated": page.total_estimated,
+        "skip": 0 if cursor else skip,
+        "limit": limit,
+        "next_cursor": page.next_cursor
     }
 
 
@@ -68,6 +79,90 @@ async def get_job(
     return job.to_dict()
 
 
+@router.get("/{job_id}/events")
+async def job_events(
+    job_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Stream a job's progress as server-sent events
+    
+    The first ``job`` event carries the whole job; ``progress`` events then
+    carry the fields that changed, pushed by the worker without further
+    database reads. The stream ends once the job completes, fails or is
+    cancelled.
+    """
+    job_service = JobService(db)
+    
+    # Subscribe before reading the job so no update falls in between
+    subscription = job_event_broker.subscribe(job_id)
+    job = await job_service.get_job(job_id)
+    if not job:
+        subscription.close()
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return StreamingResponse(
+        stream_job_events(subscription, job.to_dict()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{job_id}/segments")
+async def stream_segments(
+    job_id: UUID,
+    page_from: Optional[int] = Query(None, ge=1),
+    page_to: Optional[int] = Query(None, ge=1),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,translated_text"),
+    after: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
+    """Stream a job's segments as NDJSON, one object per line in page order
+    
+    ``page_from`` and ``page_to`` are 1-based and inclusive, so
+    ``page_from=1&page_to=1`` selects the first page. With ``limit``, the
+    last line is ``{"next_cursor": ...}``; pass it back as ``after`` for the
+    next page. Rows are read from a server-side cursor, so whole jobs can be
+    streamed without ``limit``. Streams come from a small pool of their own:
+    503 when it is full, and a stream whose client stops reading is cut off.
+    """
+    job_service = JobService(db)
+    
+    try:
+        query = SegmentQuery(
+            job_id=job_id,
+            fields=parse_fields(fields),
+            page_from=page_from,
+            page_to=page_to,
+            after=decode_segment_cursor(after) if after else None,
+            limit=limit
+        )
+    except ValueError as e:
+        # InvalidCursor is a ValueError too
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if page_from is not None and page_to is not None and page_from > page_to:
+        raise HTTPException(status_code=400, detail="page_from is after page_to")
+    
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    stream = SegmentStream(query)
+    if not stream.reserve():
+        raise HTTPException(
+            status_code=503,
+            detail="Too many segment streams in progress, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    
+    return StreamingResponse(
+        stream.lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/{job_id}/start")
 async def start_job(
     job_id: UUID,
@@ -92,6 +187,29 @@ async def start_job(
     return {"message": "Job queued for processing", "job_id": str(job_id)}
 
 
+@router.post("/{job_id}/resume")
+async def resume_job(
+    job_id: UUID,
+    db: Session = Depends(get_db)
+):
+    """Resume a failed or interrupted job from its last completed pages"""
+    job_service = JobService(db)
+    
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if not await job_service.can_resume(job):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Job cannot be resumed. Current status: {job.status}"
+        )
+    
+    await job_service.resume_job(job)
+    
+    return {"message": "Job queued to resume", "job_id": str(job_id)}
+
+
 @router.post("/{job_id}/cancel")
 async def cancel_job(
     job_id: UUID,
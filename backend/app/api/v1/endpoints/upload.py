@@ -10,6 +10,7 @@ from ....core.database import get_db
 from ....core.config import settings
 from ....schemas.upload import UploadRequest, UploadResponse
 from ....services.job_service import JobService
+from ....services.storage import FileTooLargeError, save_upload_file
 from ....models.job import JobStatus
 
 router = APIRouter()
@@ -73,14 +74,6 @@ async def direct_upload(
             detail="Only PDF files are supported"
         )
     
-    # Validate file size
-    content = await file.read()
-    if len(content) > settings.max_file_size:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size is {settings.max_file_size} bytes"
-        )
-    
     # Create upload directory if it doesn't exist
     upload_dir = settings.upload_dir
     os.makedirs(upload_dir, exist_ok=True)
@@ -89,15 +82,18 @@ async def direct_upload(
     if not file_key:
         file_key = f"{uuid.uuid4()}/{file.filename}"
     
-    # Save file
+    # Stream the file to disk, enforcing the size limit as bytes arrive
     file_path = os.path.join(upload_dir, file_key.replace('/', '_'))
     
-    with open(file_path, "wb") as f:
-        f.write(content)
+    try:
+        stored = await save_upload_file(file, file_path)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
     return {
         "message": "File uploaded successfully",
         "file_key": file_key,
-        "file_size": len(content),
+        "file_size": stored.size,
+        "content_hash": stored.sha256,
         "filename": file.filename
     }
@@ -1,29 +1,98 @@
 """
 Database configuration and session management
 """
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from .config import settings
 
+T = TypeVar("T")
+
 # Create database engine
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,
     pool_recycle=300,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
 )
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Segment streams hold a connection for as long as the client reads, so they
+# draw from a small pool of their own rather than the requests' pool
+stream_engine = create_engine(
+    settings.database_url,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=settings.segment_stream_max_streams,
+    max_overflow=0,
+    pool_timeout=settings.db_pool_timeout,
+)
+StreamSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=stream_engine)
+
 # Create base class for models
 Base = declarative_base()
 
+# Session.info key marking sessions whose queries run off the event loop
+OFFLOAD = "offload"
+
+# One thread per pooled connection, so offloaded queries never queue for a connection
+_executor = ThreadPoolExecutor(
+    max_workers=settings.db_pool_size + settings.db_max_overflow,
+    thread_name_prefix="db"
+)
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database work on the database threadpool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def offloaded(method: Callable[..., T]) -> Callable[..., Any]:
+    """Turn a blocking service method into a coroutine method.
+    
+    The method runs on the database threadpool when the service's session
+    is marked with ``OFFLOAD``, ending with a commit, and inline otherwise.
+    Offloading is only safe for sessions used by one task at a time, such as
+    a request's session; the translation worker shares its session between
+    pipeline stages and keeps its queries on its own event loop.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if not self.db.info.get(OFFLOAD):
+            return method(self, *args, **kwargs)
+        
+        def call():
+            # End the transaction before leaving the thread, so the
+            # connection goes back to the pool rather than waiting with the
+            # request on the event loop
+            try:
+                result = method(self, *args, **kwargs)
+                self.db.commit()
+                return result
+            except BaseException:
+                self.db.rollback()
+                raise
+        return await run_db(call)
+    return wrapper
+
 
 # Dependency to get database session
 def get_db():
-    db = SessionLocal()
+    # Objects stay loaded after commit, so building a response from them
+    # does not query from the event loop
+    db: Session = SessionLocal(expire_on_commit=False)
+    db.info[OFFLOAD] = settings.db_offload
     try:
         yield db
     finally:
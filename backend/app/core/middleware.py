@@ -0,0 +1,104 @@
+"""
+ASGI middleware
+"""
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class RequestBodyLimitMiddleware:
+    """Rejects request bodies larger than ``max_body_size`` with 413.
+    
+    Requests that declare an oversized Content-Length are refused before any
+    of the body is read; chunked bodies are cut off as soon as the running
+    total crosses the limit, with the 413 sent by the middleware itself and
+    any response the app makes afterwards discarded.
+    """
+    
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+        
+        received = 0
+        response_started = False
+        rejected = False
+        
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # Answer here rather than after the app unwinds: form
+                    # parsing catches the error and would answer 400 itself
+                    if not response_started:
+                        rejected = True
+                        await self._reject(scope, receive, send)
+                    raise _BodyTooLarge()
+            return message
+        
+        async def guarded_send(message: Message):
+            nonlocal response_started
+            if rejected:
+                # The 413 has gone out; drop whatever the app answers instead
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+    
+    async def _reject(self, scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body too large. Maximum size is {self.max_body_size} bytes"}
+        )
+        await response(scope, receive, send)
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class ProcessTimeMiddleware:
+    """Adds an ``X-Process-Time`` header: seconds until the response started.
+    
+    Written against plain ASGI rather than ``BaseHTTPMiddleware`` so response
+    messages pass through untouched, including streamed bodies and the
+    server's zero-copy file extensions.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.time()
+        
+        async def timed_send(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Process-Time", str(time.time() - start_time))
+            await send(message)
+        
+        await self.app(scope, receive, timed_send)
@@ -0,0 +1,175 @@
+"""
+File responses with validators, conditional requests and byte ranges
+"""
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Mapping, Optional, Tuple
+from urllib.parse import quote
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from .config import settings
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """The inclusive (first, last) byte of a single ``bytes=`` range.
+    
+    Returns None for headers to ignore (other units, several ranges, bad
+    syntax, a last byte before the first) and raises ValueError for a range
+    that misses the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not dash or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+    
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(0, size - length), size - 1
+    
+    start = int(first)
+    if last and int(last) < start:
+        # Invalid rather than unsatisfiable (RFC 9110, 14.1.1): ignore it
+        return None
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _http_date(value: str) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class FileRangeResponse(Response):
+    """Serves a file with a strong ETag, Last-Modified and single byte ranges.
+    
+    Answers ``If-None-Match`` and ``If-Modified-Since`` with 304, a
+    ``Range`` with 206 (honouring ``If-Range``) and a range past the end
+    with 416. Bodies go out through the server's zero-copy extensions
+    (``http.response.zerocopysend``, or ``http.response.pathsend`` for
+    whole files) when it offers them and in chunks read on the threadpool
+    otherwise.
+    """
+    
+    def __init__(
+        self,
+        path: str,
+        request_headers: Mapping[str, str],
+        size: int,
+        etag: str,
+        last_modified: float,
+        filename: Optional[str] = None,
+        media_type: str = "application/octet-stream",
+        method: str = "GET"
+    ):
+        self.path = path
+        self.size = size
+        self.media_type = media_type
+        self.background = None
+        self.send_body = method != "HEAD"
+        self.range: Optional[Tuple[int, int]] = None
+        
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(last_modified, usegmt=True),
+            "cache-control": "private, no-cache",
+        }
+        if filename is not None:
+            quoted = quote(filename)
+            headers["content-disposition"] = (
+                f'attachment; filename="{filename}"' if quoted == filename
+                else f"attachment; filename*=utf-8''{quoted}"
+            )
+        
+        self.status_code = self._evaluate(request_headers, etag, last_modified)
+        if self.status_code == 206:
+            start, end = self.range
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+            headers["content-length"] = str(end - start + 1)
+        elif self.status_code == 416:
+            headers["content-range"] = f"bytes */{size}"
+            headers["content-length"] = "0"
+        elif self.status_code == 304:
+            self.send_body = False
+        else:
+            headers["content-length"] = str(size)
+        if self.status_code in (200, 206):
+            headers["content-type"] = media_type
+        
+        self.init_headers(headers)
+    
+    def _evaluate(self, request_headers: Mapping[str, str], etag: str, last_modified: float) -> int:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            # Weak comparison: W/"x" matches "x"
+            if "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags):
+                return 304
+        else:
+            since = _http_date(request_headers.get("if-modified-since", ""))
+            if since is not None and int(last_modified) <= since:
+                return 304
+        
+        range_header = request_headers.get("range")
+        if range_header is None:
+            return 200
+        
+        if_range = request_headers.get("if-range")
+        if if_range is not None:
+            if_range = if_range.strip()
+            if if_range.startswith(('"', "W/")):
+                # Strong comparison only
+                if if_range != etag:
+                    return 200
+            elif _http_date(if_range) != int(last_modified):
+                return 200
+        
+        try:
+            self.range = parse_range(range_header, self.size)
+        except ValueError:
+            return 416
+        return 206 if self.range is not None else 200
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.send_body or self.status_code == 416:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        start, end = self.range if self.range is not None else (0, self.size - 1)
+        count = end - start + 1
+        extensions = scope.get("extensions") or {}
+        
+        # Open before the headers go out, so a vanished file is still a 500
+        with open(self.path, "rb") as f:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            
+            if "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": f, "offset": start, "count": count})
+            elif "http.response.pathsend" in extensions and self.range is None:
+                await send({"type": "http.response.pathsend", "path": self.path})
+            else:
+                fd = f.fileno()
+                chunk_size = settings.download_chunk_size
+                offset = start
+                while offset <= end:
+                    chunk = await run_in_threadpool(os.pread, fd, min(chunk_size, end - offset + 1), offset)
+                    if not chunk:
+                        break
+                    offset += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": offset <= end})
+                if offset <= end or count == 0:
+                    await send({"type": "http.response.body", "body": b""})
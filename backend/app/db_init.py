@@ -6,7 +6,7 @@ from sqlalchemy import create_engine
 
 from .core.config import settings
 from .core.database import Base
-from .models import job, segment, glossary, translation_memory
+from .models import job, segment, glossary, translation_memory, job_queue, page_checkpoint
 
 
 def init_db():
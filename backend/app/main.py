@@ -5,9 +5,9 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
-import time
 
 from .core.config import settings
+from .core.middleware import ProcessTimeMiddleware, RequestBodyLimitMiddleware
 from .api.v1.api import api_router
 
 # Create FastAPI app
@@ -32,14 +32,14 @@ app.add_middleware(
     allowed_hosts=["localhost", "127.0.0.1", "*.lovable.dev"]
 )
 
+# Refuse oversized uploads before the body is parsed
+app.add_middleware(
+    RequestBodyLimitMiddleware,
+    max_body_size=settings.max_file_size + settings.max_request_overhead
+)
+
 # Add timing middleware for performance monitoring
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
+app.add_middleware(ProcessTimeMiddleware)
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
@@ -5,5 +5,7 @@ from .job import Job, JobStatus
 from .segment import Segment
 from .glossary import Glossary
 from .translation_memory import TranslationMemory
+from .job_queue import JobQueueEntry, QueueStatus
+from .page_checkpoint import PageCheckpoint
 
-__all__ = ["Job", "JobStatus", "Segment", "Glossary", "TranslationMemory"]
+__all__ = ["Job", "JobStatus", "Segment", "Glossary", "TranslationMemory", "JobQueueEntry", "QueueStatus", "PageCheckpoint"]
@@ -6,7 +6,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, JSON, Float, Integer
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, JSON, Float, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -27,6 +27,16 @@ class JobStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
+# Statuses a job can be left in when its worker dies mid-run
+IN_FLIGHT_STATUSES = {
+    JobStatus.EXTRACTING,
+    JobStatus.TRANSLATING,
+    JobStatus.SHAPING,
+    JobStatus.BUILDING,
+    JobStatus.QA_CHECK,
+}
+
+
 class Job(Base):
     __tablename__ = "jobs"
     
@@ -54,20 +64,29 @@ class Job(Base):
     
     # Results
     output_file_key = Column(String, nullable=True)
+    output_sha256 = Column(String(64), nullable=True)  # content hash of the output file, its download ETag
     download_url = Column(String, nullable=True)
     
     # Metadata
     error_message = Column(String, nullable=True)
     processing_time = Column(Float, nullable=True)  # seconds
+    metrics = Column(JSON, default={})  # Per-job counters and timings reported by the worker
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
+    cancel_requested_at = Column(DateTime, nullable=True)
     
     # Relationships
     segments = relationship("Segment", back_populates="job", cascade="all, delete-orphan")
     
+    # Job lists page by (created_at, id), newest first, optionally within a status
+    __table_args__ = (
+        Index('ix_jobs_created_at_id', 'created_at', 'id'),
+        Index('ix_jobs_status_created_at_id', 'status', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f"<Job(id={self.id}, filename={self.filename}, status={self.status})>"
     
@@ -86,6 +105,8 @@ class Job(Base):
             "download_url": self.download_url,
             "error_message": self.error_message,
             "processing_time": self.processing_time,
+            "metrics": self.metrics or {},
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "cancel_requested_at": self.cancel_requested_at.isoformat() if self.cancel_requested_at else None,
         }
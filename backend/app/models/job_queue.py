@@ -0,0 +1,58 @@
+"""
+Job queue model for durable background processing
+"""
+import uuid
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, Integer, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..core.database import Base
+
+
+class QueueStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobQueueEntry(Base):
+    __tablename__ = "job_queue"
+    
+    # Primary key
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    
+    # Job reference (one entry per job, re-used when a job is queued again)
+    job_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("jobs.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True
+    )
+    
+    # Queue state
+    status = Column(SQLEnum(QueueStatus), default=QueueStatus.QUEUED, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # not claimable before
+    
+    # Lease held by the worker currently processing the entry
+    worker_id = Column(String, nullable=True)
+    leased_until = Column(DateTime, nullable=True)
+    
+    # Metadata
+    last_error = Column(String, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Claim scans filter on status and order by availability
+    __table_args__ = (
+        Index('ix_job_queue_status_available', 'status', 'available_at'),
+    )
+    
+    def __repr__(self):
+        return f"<JobQueueEntry(job_id={self.job_id}, status={self.status}, attempts={self.attempts})>"
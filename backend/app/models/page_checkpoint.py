@@ -0,0 +1,32 @@
+"""
+Per-page progress checkpoints for resuming interrupted jobs
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..core.database import Base
+
+
+class PageCheckpoint(Base):
+    __tablename__ = "page_checkpoints"
+    
+    # One row per job page, written in the same transaction as its segments
+    job_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("jobs.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    page_number = Column(Integer, primary_key=True)
+    
+    # Segment rows stored for the page
+    segment_count = Column(Integer, nullable=False)
+    
+    # Stage completion times; NULL until the stage has committed the page
+    extracted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    translated_at = Column(DateTime, nullable=True)
+    built_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<PageCheckpoint(job_id={self.job_id}, page={self.page_number}, segments={self.segment_count})>"
@@ -2,7 +2,7 @@
 Segment model for individual text segments within a job
 """
 import uuid
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, JSON, Text
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, JSON, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -37,6 +37,7 @@ class Segment(Base):
     font_name = Column(String, nullable=True)
     font_size = Column(Float, nullable=True)
     font_flags = Column(Integer, default=0)  # Bold, italic, etc.
+    style_runs = Column(JSON, default=[])  # Per-span fonts and positions for rebuilding
     
     # Translation metadata
     translation_method = Column(String, nullable=True)  # "mt", "tm", "glossary"
@@ -49,6 +50,11 @@ class Segment(Base):
     # Relationships
     job = relationship("Job", back_populates="segments")
     
+    # A page's segments are written once; a resumed job never re-inserts them
+    __table_args__ = (
+        UniqueConstraint('job_id', 'page_number', 'segment_index', name='uq_segments_job_page_index'),
+    )
+    
     def __repr__(self):
         return f"<Segment(id={self.id}, page={self.page_number}, text='{self.source_text[:50]}...')>"
     
@@ -79,6 +85,7 @@ class Segment(Base):
             "post_edited_text": self.post_edited_text,
             "font_name": self.font_name,
             "font_size": self.font_size,
+            "style_runs": self.style_runs,
             "translation_method": self.translation_method,
             "confidence_score": self.confidence_score,
             "tm_match_score": self.tm_match_score,
@@ -31,8 +31,10 @@ class JobResponse(BaseModel):
     download_url: Optional[str]
     error_message: Optional[str]
     processing_time: Optional[float]
+    metrics: Dict[str, Any] = Field(default_factory=dict)
     created_at: datetime
     completed_at: Optional[datetime]
+    cancel_requested_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
@@ -41,8 +43,10 @@ class JobResponse(BaseModel):
 class JobListResponse(BaseModel):
     jobs: List[JobResponse]
     total: int
+    total_estimated: bool = False  # total is the planner's row estimate
     skip: int
     limit: int
+    next_cursor: Optional[str] = None  # pass as ``cursor`` for the next page
 
 
 class JobProgress(BaseModel):
@@ -0,0 +1,179 @@
+"""
+Background-only PDF generation: strip text drawing while keeping everything else
+"""
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Set, Tuple
+
+import pikepdf
+
+from ..core.config import settings
+
+
+# Operators that paint glyphs
+TEXT_SHOW_OPERATORS = {"Tj", "TJ", "'", '"'}
+
+# Operators that only set text state or position; a BT/ET block left with
+# nothing else draws nothing and is dropped entirely
+TEXT_STATE_OPERATORS = {"Tc", "Tw", "Tz", "TL", "Tf", "Tr", "Ts", "Td", "TD", "Tm", "T*"}
+
+ObjGen = Tuple[int, int]
+
+
+def strip_text_instructions(instructions: list) -> Tuple[list, bool]:
+    """Drop text-showing operators from parsed content stream instructions.
+    
+    Returns the filtered instructions and whether anything was removed.
+    Graphics state set inside a text object persists after ET, so BT/ET
+    blocks are only removed when they held nothing but text state.
+    """
+    result = []
+    changed = False
+    block_start: Optional[int] = None
+    block_drawable = False
+    
+    for instruction in instructions:
+        operator = str(instruction.operator)
+        if operator in TEXT_SHOW_OPERATORS:
+            changed = True
+            continue
+        
+        if operator == "BT":
+            block_start = len(result)
+            block_drawable = False
+        elif operator == "ET" and block_start is not None:
+            if not block_drawable:
+                del result[block_start:]
+                block_start = None
+                continue
+            block_start = None
+        elif block_start is not None and operator not in TEXT_STATE_OPERATORS:
+            block_drawable = True
+        
+        result.append(instruction)
+    
+    return result, changed
+
+
+class TextStripper:
+    """Removes text from the pages of an open PDF.
+    
+    Each content stream is parsed once. Streams are indirect objects, so a
+    content stream or Form XObject shared by many pages is recognised by its
+    object number, stripped the first time it is reached and skipped after.
+    Form XObjects are followed recursively through their own resources.
+    """
+    
+    def __init__(self, pdf: pikepdf.Pdf):
+        self.pdf = pdf
+        self.stripped: Dict[ObjGen, bytes] = {}  # rewritten streams by object
+        self._seen: Set[ObjGen] = set()
+        self.streams_parsed = 0
+        self.cache_hits = 0
+    
+    def strip_page(self, page: pikepdf.Page):
+        contents = page.obj.get("/Contents")
+        if contents is not None:
+            streams = contents if isinstance(contents, pikepdf.Array) else [contents]
+            for stream in streams:
+                self._strip_stream(stream)
+        self._strip_resources(page.obj.get("/Resources"))
+    
+    def _strip_stream(self, stream: pikepdf.Stream):
+        objgen = stream.objgen
+        if objgen in self._seen:
+            self.cache_hits += 1
+            return
+        self._seen.add(objgen)
+        
+        instructions, changed = strip_text_instructions(pikepdf.parse_content_stream(stream))
+        self.streams_parsed += 1
+        if changed:
+            data = pikepdf.unparse_content_stream(instructions)
+            stream.write(data)
+            self.stripped[objgen] = data
+    
+    def _strip_resources(self, resources: Optional[pikepdf.Dictionary]):
+        if resources is None or "/XObject" not in resources:
+            return
+        for _, xobject in resources.XObject.items():
+            if xobject.get("/Subtype") != pikepdf.Name.Form:
+                continue
+            if xobject.objgen in self._seen:
+                self.cache_hits += 1
+                continue
+            self._strip_stream(xobject)
+            self._strip_resources(xobject.get("/Resources"))
+
+
+def strip_page_range(file_path: str, start: int, stop: int) -> Tuple[Dict[ObjGen, bytes], int, int]:
+    """Strip pages [start, stop) and return the rewritten streams and counters.
+    
+    Runs inside worker processes. Object numbers are stable for the same
+    file, so the caller applies the returned streams to its own copy.
+    """
+    with pikepdf.Pdf.open(file_path) as pdf:
+        stripper = TextStripper(pdf)
+        for page_number in range(start, stop):
+            stripper.strip_page(pdf.pages[page_number])
+        return stripper.stripped, stripper.streams_parsed, stripper.cache_hits
+
+
+def remove_text(input_path: str, output_path: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """Write a copy of a PDF with all text drawing removed.
+    
+    Documents of at least ``background_parallel_min_pages`` pages are split
+    into page ranges stripped in parallel worker processes; a stream shared
+    across ranges is stripped once per worker rather than once per page.
+    Returns counters for the job metrics.
+    """
+    workers = max(1, workers or settings.extraction_workers)
+    chunk_pages = max(1, settings.extraction_chunk_pages)
+    
+    with pikepdf.Pdf.open(input_path) as pdf:
+        total_pages = len(pdf.pages)
+        
+        if workers == 1 or total_pages < max(chunk_pages + 1, settings.background_parallel_min_pages):
+            stripper = TextStripper(pdf)
+            for page in pdf.pages:
+                stripper.strip_page(page)
+            stats = {
+                "background_streams_parsed": stripper.streams_parsed,
+                "background_cache_hits": stripper.cache_hits,
+            }
+        else:
+            ranges = [
+                (start, min(start + chunk_pages, total_pages))
+                for start in range(0, total_pages, chunk_pages)
+            ]
+            # spawn rather than fork: jobs run alongside other threads in this process
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            ) as pool:
+                results = list(pool.map(
+                    strip_page_range,
+                    [input_path] * len(ranges),
+                    [start for start, _ in ranges],
+                    [stop for _, stop in ranges]
+                ))
+            
+            stripped: Dict[ObjGen, bytes] = {}
+            for streams, _, _ in results:
+                stripped.update(streams)
+            for objgen, data in stripped.items():
+                pdf.get_object(objgen).write(data)
+            stats = {
+                "background_streams_parsed": sum(parsed for _, parsed, _ in results),
+                "background_cache_hits": sum(hits for _, _, hits in results),
+            }
+        
+        pdf.save(output_path)
+    
+    return stats
+
+
+async def remove_text_async(input_path: str, output_path: str, workers: Optional[int] = None) -> Dict[str, int]:
+    """Run remove_text off the event loop"""
+    return await asyncio.to_thread(remove_text, input_path, output_path, workers)
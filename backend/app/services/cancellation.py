@@ -0,0 +1,103 @@
+"""
+Cooperative cancellation for running jobs
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Set
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.job import Job, JobStatus
+
+
+class JobCancelled(Exception):
+    """Raised at a page or batch boundary once a job has been cancelled"""
+    
+    def __init__(self, job_id: UUID):
+        super().__init__(f"Job {job_id} was cancelled")
+        self.job_id = job_id
+
+
+class LeaseLost(JobCancelled):
+    """Raised once the job's queue lease has passed to another worker.
+    
+    The job carries on under its new lease, so unlike a cancellation the
+    stale run stops without touching the job's status or results.
+    """
+    
+    def __init__(self, job_id: UUID):
+        Exception.__init__(self, f"Lease on job {job_id} was lost")
+        self.job_id = job_id
+
+
+# Jobs cancelled from this process; lets same-process workers skip the DB poll
+_cancelled_jobs: Set[str] = set()
+_cancelled_lock = threading.Lock()
+
+
+def request_cancellation(job_id: UUID):
+    """Signal workers in this process that a job was cancelled"""
+    with _cancelled_lock:
+        _cancelled_jobs.add(str(job_id))
+
+
+def clear_cancellation(job_id: UUID):
+    with _cancelled_lock:
+        _cancelled_jobs.discard(str(job_id))
+
+
+class CancellationToken:
+    """Cheap cancellation check for a running job.
+    
+    Checks the in-process signal on every call and polls the job's status
+    column at most every ``poll_interval`` seconds, which covers cancellations
+    made by an API process on another machine. A queue worker passes
+    ``lease_lost``, set once its lease on the job is gone.
+    """
+    
+    def __init__(
+        self,
+        db: Session,
+        job_id: UUID,
+        poll_interval: Optional[float] = None,
+        lease_lost: Optional[threading.Event] = None
+    ):
+        self.db = db
+        self.job_id = job_id
+        self._lease_lost = lease_lost
+        self.poll_interval = settings.cancel_poll_interval if poll_interval is None else poll_interval
+        self.cancelled = False
+        self.requested_at: Optional[datetime] = None
+        self._polled_at = 0.0
+    
+    def lease_lost(self) -> bool:
+        return self._lease_lost is not None and self._lease_lost.is_set()
+    
+    def is_cancelled(self) -> bool:
+        if self.cancelled or self.lease_lost():
+            return True
+        
+        with _cancelled_lock:
+            signalled = str(self.job_id) in _cancelled_jobs
+        
+        now = time.monotonic()
+        if signalled or now - self._polled_at >= self.poll_interval:
+            self._polled_at = now
+            row = self.db.execute(
+                select(Job.status, Job.cancel_requested_at).where(Job.id == self.job_id)
+            ).first()
+            if row is None or row.status == JobStatus.CANCELLED:
+                self.cancelled = True
+                self.requested_at = row.cancel_requested_at if row is not None else None
+        
+        return self.cancelled
+    
+    def raise_if_cancelled(self):
+        if self.lease_lost():
+            raise LeaseLost(self.job_id)
+        if self.is_cancelled():
+            raise JobCancelled(self.job_id)
@@ -0,0 +1,127 @@
+"""
+Per-page checkpoints for resuming interrupted jobs
+"""
+from datetime import datetime
+from typing import Dict, List, Tuple
+from uuid import UUID
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from ..models.page_checkpoint import PageCheckpoint
+from ..models.segment import Segment
+
+
+class CheckpointStore:
+    """Records which pages of a job have been extracted, translated and built.
+    
+    A page's checkpoint is written in the same transaction as its segment
+    rows, so a checkpointed page always has exactly ``segment_count`` rows
+    and segment rows without a checkpoint are leftovers of a transaction
+    that committed part way (a failure report commits the session). A run
+    started on a job with checkpoints skips re-inserting the stored pages
+    and keeps their translations. Like the segment writers, the store never
+    commits except in ``load``; the caller owns the transaction.
+    """
+    
+    def __init__(self, db: Session, job_id: UUID):
+        self.db = db
+        self.job_id = job_id
+        self.pages: Dict[int, int] = {}  # segment count by checkpointed page
+    
+    def load(self) -> Dict[int, int]:
+        """Read the job's checkpoints and drop segment rows no checkpoint covers"""
+        rows = self.db.execute(
+            select(PageCheckpoint.page_number, PageCheckpoint.segment_count)
+            .where(PageCheckpoint.job_id == self.job_id)
+        ).all()
+        self.pages = {page_number: segment_count for page_number, segment_count in rows}
+        
+        covered = select(PageCheckpoint.page_number).where(PageCheckpoint.job_id == self.job_id)
+        self.db.execute(
+            delete(Segment).where(Segment.job_id == self.job_id, Segment.page_number.not_in(covered))
+        )
+        self.db.commit()
+        return self.pages
+    
+    def is_stored(self, page_number: int, segment_count: int) -> bool:
+        """Whether a page's segments are already stored.
+        
+        A checkpoint whose segment count no longer matches the extraction
+        (the extractor changed between runs) is discarded with its rows, so
+        the page is inserted afresh.
+        """
+        stored = self.pages.get(page_number)
+        if stored is None:
+            return False
+        if stored != segment_count:
+            self.discard_pages([page_number])
+            return False
+        return True
+    
+    def discard_pages(self, page_numbers: List[int]):
+        """Delete the checkpoints and segment rows of some pages"""
+        self.db.execute(
+            delete(Segment).where(Segment.job_id == self.job_id, Segment.page_number.in_(page_numbers))
+        )
+        self.db.execute(
+            delete(PageCheckpoint)
+            .where(PageCheckpoint.job_id == self.job_id, PageCheckpoint.page_number.in_(page_numbers))
+        )
+        for page_number in page_numbers:
+            self.pages.pop(page_number, None)
+    
+    def clear(self):
+        """Delete every checkpoint of the job"""
+        self.db.execute(delete(PageCheckpoint).where(PageCheckpoint.job_id == self.job_id))
+        self.pages = {}
+    
+    def stored_segments(self, page_numbers: List[int]) -> Dict[int, List[Row]]:
+        """The stored segments of checkpointed pages, in order, by page"""
+        segments: Dict[int, List[Row]] = {page_number: [] for page_number in page_numbers}
+        if not page_numbers:
+            return segments
+        rows = self.db.execute(
+            select(
+                Segment.id,
+                Segment.page_number,
+                Segment.translated_text,
+                Segment.translation_method,
+                Segment.confidence_score,
+                Segment.tm_match_score,
+            )
+            .where(Segment.job_id == self.job_id, Segment.page_number.in_(page_numbers))
+            .order_by(Segment.page_number, Segment.segment_index)
+        ).all()
+        for row in rows:
+            segments[row.page_number].append(row)
+        return segments
+    
+    def mark_extracted(self, pages: List[Tuple[int, int]]):
+        """Checkpoint newly inserted pages, given as (page number, segment count)"""
+        if not pages:
+            return
+        now = datetime.utcnow()
+        self.db.execute(insert(PageCheckpoint), [
+            {"job_id": self.job_id, "page_number": page_number, "segment_count": segment_count, "extracted_at": now}
+            for page_number, segment_count in pages
+        ])
+        self.pages.update(pages)
+    
+    def mark_translated(self, page_numbers: List[int]):
+        if not page_numbers:
+            return
+        self.db.execute(
+            update(PageCheckpoint)
+            .where(PageCheckpoint.job_id == self.job_id, PageCheckpoint.page_number.in_(page_numbers))
+            .values(translated_at=datetime.utcnow())
+        )
+    
+    def mark_built(self):
+        """Checkpoint every page as built once the output document is saved"""
+        self.db.execute(
+            update(PageCheckpoint)
+            .where(PageCheckpoint.job_id == self.job_id)
+            .values(built_at=datetime.utcnow())
+        )
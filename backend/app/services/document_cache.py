@@ -0,0 +1,194 @@
+"""
+Content-addressed cache for document extraction artifacts
+"""
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+from typing import Optional, Dict, Any, Callable, Iterator, List, Tuple
+
+from ..core.config import settings
+
+
+# Suffixes of the artifacts this cache writes; eviction touches nothing else
+ARTIFACT_SUFFIXES = (".jsonl.gz", ".json.gz", ".background.pdf")
+_SHARD = re.compile(r"[0-9a-f]{2}")
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Hash a file in chunks without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactWriter:
+    """Writes a gzip-compressed JSON-lines artifact one record at a time.
+    
+    Records go to a temporary file that only replaces the cached artifact
+    on ``commit``, so readers never see a partial document.
+    """
+    
+    def __init__(self, cache: "DocumentCache", path: str):
+        self.cache = cache
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        self._raw = os.fdopen(fd, "wb")
+        self._file = gzip.open(self._raw, "wt", encoding="utf-8")
+    
+    def write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":")))
+        self._file.write("\n")
+    
+    def commit(self):
+        self._file.close()
+        self._raw.close()
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict()
+    
+    def abort(self):
+        self._file.close()
+        self._raw.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class DocumentCache:
+    """Stores artifacts per document content hash.
+    
+    Extraction output is a gzip-compressed JSON-lines artifact, written and
+    read page by page; derived files such as the background-only PDF sit
+    beside it under their own suffix.
+    Artifacts live under ``<cache_dir>/<hash[:2]>/<hash><suffix>``. Hits bump
+    the file's mtime, so eviction drops entries older than ``max_age_days``
+    first and then the least recently used ones until the cache fits in
+    ``max_bytes``. Entries used within the last ``grace_seconds`` are kept
+    even over budget, as a running job may be about to open the path it was
+    handed. Other files under the directory, such as the font subset cache
+    in ``fonts/``, are not the cache's to evict.
+    """
+    
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+        grace_seconds: Optional[float] = None
+    ):
+        self.cache_dir = cache_dir or settings.document_cache_dir or os.path.join(settings.upload_dir, ".cache")
+        self.max_bytes = settings.document_cache_max_bytes if max_bytes is None else max_bytes
+        self.max_age = (
+            settings.document_cache_max_age_days if max_age_days is None else max_age_days
+        ) * 86400
+        self.grace = settings.document_cache_grace_seconds if grace_seconds is None else grace_seconds
+    
+    def path_for(self, content_hash: str, suffix: str = ".json.gz") -> str:
+        return os.path.join(self.cache_dir, content_hash[:2], f"{content_hash}{suffix}")
+    
+    def iter_records(self, content_hash: str, suffix: str = ".jsonl.gz") -> Optional[Iterator[Dict[str, Any]]]:
+        """Stream the records of a JSON-lines artifact, or None on a miss"""
+        path = self.path_for(content_hash, suffix)
+        try:
+            f = gzip.open(path, "rt", encoding="utf-8")
+        except (FileNotFoundError, OSError):
+            return None
+        
+        self.touch(path)
+        
+        def records():
+            with f:
+                for line in f:
+                    yield json.loads(line)
+        
+        return records()
+    
+    def open_records(self, content_hash: str, suffix: str = ".jsonl.gz") -> ArtifactWriter:
+        """Start writing a JSON-lines artifact for a content hash"""
+        return ArtifactWriter(self, self.path_for(content_hash, suffix))
+    
+    def get_file(self, content_hash: str, suffix: str) -> Optional[str]:
+        """Return the path of a cached file artifact, or None on a miss"""
+        path = self.path_for(content_hash, suffix)
+        if not os.path.exists(path):
+            return None
+        self.touch(path)
+        return path
+    
+    def put_file(self, content_hash: str, suffix: str, write: Callable[[str], Any]) -> str:
+        """Cache a file artifact produced by ``write(tmp_path)`` and return its path"""
+        path = self.path_for(content_hash, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        self.evict()
+        return path
+    
+    def touch(self, path: str):
+        """Mark an entry as recently used"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    
+    def _artifacts(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) of every committed artifact"""
+        entries = []
+        try:
+            shards = [
+                entry.path for entry in os.scandir(self.cache_dir)
+                if entry.is_dir() and _SHARD.fullmatch(entry.name)
+            ]
+        except FileNotFoundError:
+            return entries
+        for shard in shards:
+            try:
+                files = list(os.scandir(shard))
+            except FileNotFoundError:
+                continue
+            for entry in files:
+                if not entry.name.endswith(ARTIFACT_SUFFIXES):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+    
+    def evict(self) -> int:
+        """Remove expired entries, then LRU entries over the size budget"""
+        entries = self._artifacts()
+        now = time.time()
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_bytes:
+                break
+            if now - mtime < self.grace:
+                # This and every later entry were used too recently to drop
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        
+        return removed
@@ -0,0 +1,350 @@
+"""
+Font discovery, metrics and subsetting shared across jobs
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from fontTools.subset import Options, Subsetter
+from fontTools.ttLib import TTFont
+
+from ..core.cache import LRUCache
+from ..core.config import settings
+
+
+FONT_EXTENSIONS = (".ttf", ".otf")
+
+# PDF font flag bits (PDF 32000-1:2008, 9.8.2) as reported by PyMuPDF spans
+FLAG_ITALIC = 1 << 1
+FLAG_BOLD = 1 << 4
+
+# Metric-compatible stand-ins for the standard 14 fonts, most preferred first
+STANDARD_FONT_ALIASES = {
+    "helvetica": ["arial", "liberationsans", "arimo", "dejavusans", "notosans"],
+    "arial": ["liberationsans", "arimo", "dejavusans", "notosans"],
+    "times": ["timesnewroman", "liberationserif", "tinos", "dejavuserif", "notoserif"],
+    "timesnewroman": ["liberationserif", "tinos", "dejavuserif", "notoserif"],
+    "courier": ["couriernew", "liberationmono", "cousine", "dejavusansmono", "notosansmono"],
+    "couriernew": ["liberationmono", "cousine", "dejavusansmono", "notosansmono"],
+}
+
+_SUBSET_PREFIX = re.compile(r"^[A-Z]{6}\+")
+_STYLE_SUFFIX = re.compile(r"[-,]?(bold|italic|oblique|regular|roman|book|medium|semibold|light|black|mt|psmt)+$")
+
+
+def normalize_font_name(name: str) -> str:
+    """Lowercase alphanumerics only, without a subset tag ("ABCDEF+Arial-Bold" -> "arialbold")"""
+    return re.sub(r"[^a-z0-9]", "", _SUBSET_PREFIX.sub("", name).lower())
+
+
+def _family_key(name: str) -> str:
+    return _STYLE_SUFFIX.sub("", normalize_font_name(name))
+
+
+@dataclass
+class FontFace:
+    """An indexed font file"""
+    path: str
+    postscript_name: str
+    family: str
+    bold: bool
+    italic: bool
+    weight: int  # OS/2 weight class, 400 regular, 700 bold
+
+
+@dataclass
+class FontMetrics:
+    """Glyph lookup and advance tables for one font.
+    
+    ``advances`` and ``glyph_ids`` are indexed by Basic Multilingual Plane
+    code point so whole strings can be measured with one NumPy gather;
+    characters outside the BMP fall back to the dictionaries.
+    """
+    path: str
+    units_per_em: int
+    ascender: float  # em units
+    descender: float
+    advances: np.ndarray  # float32[0x10000], em units, 0 for unmapped
+    glyph_ids: np.ndarray  # uint16[0x10000], 0 (.notdef) for unmapped
+    wide_advances: Dict[int, float]
+    wide_glyph_ids: Dict[int, int]
+    
+    def text_width(self, text: str, size: float) -> float:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        bmp = codes < 0x10000
+        width = float(self.advances[codes[bmp]].sum())
+        if not bmp.all():
+            width += sum(self.wide_advances.get(int(c), 0.0) for c in codes[~bmp])
+        return width * size
+    
+    def glyphs_for(self, text: str) -> List[int]:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        if (codes < 0x10000).all():
+            return self.glyph_ids[codes].tolist()
+        return [
+            int(self.glyph_ids[c]) if c < 0x10000 else self.wide_glyph_ids.get(int(c), 0)
+            for c in codes
+        ]
+
+
+def load_metrics(path: str) -> FontMetrics:
+    """Parse a font file into lookup tables"""
+    font = TTFont(path, lazy=True)
+    try:
+        units_per_em = font["head"].unitsPerEm
+        glyph_order = {name: gid for gid, name in enumerate(font.getGlyphOrder())}
+        hmtx = font["hmtx"].metrics
+        advances = np.zeros(0x10000, dtype=np.float32)
+        glyph_ids = np.zeros(0x10000, dtype=np.uint16)
+        wide_advances: Dict[int, float] = {}
+        wide_glyph_ids: Dict[int, int] = {}
+        for codepoint, name in (font.getBestCmap() or {}).items():
+            advance = hmtx[name][0] / units_per_em
+            gid = glyph_order.get(name, 0)
+            if codepoint < 0x10000:
+                advances[codepoint] = advance
+                glyph_ids[codepoint] = gid
+            else:
+                wide_advances[codepoint] = advance
+                wide_glyph_ids[codepoint] = gid
+        hhea = font["hhea"]
+        return FontMetrics(
+            path=path,
+            units_per_em=units_per_em,
+            ascender=hhea.ascent / units_per_em,
+            descender=hhea.descent / units_per_em,
+            advances=advances,
+            glyph_ids=glyph_ids,
+            wide_advances=wide_advances,
+            wide_glyph_ids=wide_glyph_ids
+        )
+    finally:
+        font.close()
+
+
+class FontService:
+    """Maps extracted font names to font files and caches their derived data.
+    
+    The index is built once per process from ``font_dirs``. Parsed fonts and
+    metrics tables are kept in LRU caches, and subsets are memoized on disk
+    by (font file, glyph set) so repeated builds of similar documents reuse
+    them across jobs and processes. Hits bump a subset's mtime, and writing
+    a new one drops the least recently used until the subsets fit in
+    ``subset_cache_bytes``.
+    """
+    
+    def __init__(
+        self,
+        font_dirs: Optional[Iterable[str]] = None,
+        cache_dir: Optional[str] = None,
+        cache_size: Optional[int] = None,
+        subset_cache_bytes: Optional[int] = None
+    ):
+        self.font_dirs = list(settings.font_dirs if font_dirs is None else font_dirs)
+        self.cache_dir = cache_dir or settings.font_cache_dir or os.path.join(settings.upload_dir, ".cache", "fonts")
+        self.subset_cache_bytes = (
+            settings.font_subset_cache_max_bytes if subset_cache_bytes is None else subset_cache_bytes
+        )
+        cache_size = settings.font_cache_size if cache_size is None else cache_size
+        self._fonts = LRUCache(cache_size)
+        self._metrics = LRUCache(cache_size)
+        self._resolved: Dict[tuple, Optional[str]] = {}
+        self._faces: Optional[List[FontFace]] = None
+        self._by_name: Dict[str, FontFace] = {}
+        self._by_family: Dict[str, List[FontFace]] = {}
+        self._lock = threading.Lock()
+    
+    def build_index(self) -> int:
+        """Scan the font directories; returns the number of faces found"""
+        faces = []
+        for font_dir in self.font_dirs:
+            for root, _, files in os.walk(font_dir):
+                for name in sorted(files):
+                    if not name.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        faces.append(self._read_face(path))
+                    except Exception as e:
+                        print(f"Skipping unreadable font {path}: {e}")
+        
+        by_name: Dict[str, FontFace] = {}
+        by_family: Dict[str, List[FontFace]] = {}
+        for face in faces:
+            by_name.setdefault(normalize_font_name(face.postscript_name), face)
+            by_name.setdefault(normalize_font_name(os.path.splitext(os.path.basename(face.path))[0]), face)
+            by_family.setdefault(normalize_font_name(face.family), []).append(face)
+        
+        with self._lock:
+            self._faces = faces
+            self._by_name = by_name
+            self._by_family = by_family
+            self._resolved.clear()
+        return len(faces)
+    
+    @staticmethod
+    def _read_face(path: str) -> FontFace:
+        font = TTFont(path, lazy=True)
+        try:
+            names = font["name"]
+            style = (names.getDebugName(2) or "").lower()
+            mac_style = font["head"].macStyle
+            weight = font["OS/2"].usWeightClass if "OS/2" in font else (700 if mac_style & 1 else 400)
+            return FontFace(
+                path=path,
+                postscript_name=names.getDebugName(6) or os.path.splitext(os.path.basename(path))[0],
+                family=names.getDebugName(16) or names.getDebugName(1) or "",
+                bold="bold" in style or bool(mac_style & 1),
+                italic="italic" in style or "oblique" in style or bool(mac_style & 2),
+                weight=weight
+            )
+        finally:
+            font.close()
+    
+    def resolve(self, font_name: Optional[str], font_flags: int = 0) -> Optional[str]:
+        """Return the font file to draw text captured in ``font_name``.
+        
+        Tries the exact PostScript/file name, then the family with matching
+        bold/italic style, then metric-compatible aliases of the standard
+        fonts, and finally ``output_font_path``. None means the standard
+        Helvetica.
+        """
+        if self._faces is None:
+            self.build_index()
+        
+        key = (font_name, font_flags)
+        if key in self._resolved:
+            return self._resolved[key]
+        
+        path = None
+        if font_name:
+            name = normalize_font_name(font_name)
+            bold = bool(font_flags & FLAG_BOLD) or "bold" in name
+            italic = bool(font_flags & FLAG_ITALIC) or "italic" in name or "oblique" in name
+            face = self._by_name.get(name)
+            if face is None:
+                family = _family_key(font_name)
+                for candidate in [family] + STANDARD_FONT_ALIASES.get(family, []):
+                    face = self._pick_style(self._by_family.get(candidate, []), bold, italic)
+                    if face is not None:
+                        break
+            path = face.path if face is not None else None
+        
+        path = path or settings.output_font_path
+        self._resolved[key] = path
+        return path
+    
+    @staticmethod
+    def _pick_style(faces: List[FontFace], bold: bool, italic: bool) -> Optional[FontFace]:
+        if not faces:
+            return None
+        target_weight = 700 if bold else 400
+        return min(faces, key=lambda face: (
+            (face.bold != bold) + (face.italic != italic),
+            abs(face.weight - target_weight)
+        ))
+    
+    def get_font(self, path: str) -> TTFont:
+        """A fully parsed font, shared read-only"""
+        font = self._fonts.get(path)
+        if font is None:
+            font = TTFont(path)
+            font.ensureDecompiled()
+            self._fonts.put(path, font)
+        return font
+    
+    def get_metrics(self, path: str) -> FontMetrics:
+        metrics = self._metrics.get(path)
+        if metrics is None:
+            metrics = load_metrics(path)
+            self._metrics.put(path, metrics)
+        return metrics
+    
+    def subset(self, path: str, glyph_ids: Iterable[int]) -> bytes:
+        """Font program reduced to the given glyphs, with glyph IDs kept stable"""
+        glyph_ids = sorted(set(glyph_ids) | {0})
+        stat = os.stat(path)
+        key = hashlib.sha256(
+            f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{glyph_ids}".encode()
+        ).hexdigest()
+        cache_path = os.path.join(self.cache_dir, key[:2], f"{key}.subset")
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read()
+            try:
+                os.utime(cache_path)
+            except OSError:
+                pass
+            return data
+        except FileNotFoundError:
+            pass
+        
+        # Subsetting mutates the font, so it works on a private copy
+        font = TTFont(path)
+        try:
+            options = Options()
+            options.retain_gids = True
+            options.notdef_outline = True
+            subsetter = Subsetter(options)
+            subsetter.populate(gids=glyph_ids)
+            subsetter.subset(font)
+            buffer = io.BytesIO()
+            font.save(buffer)
+            data = buffer.getvalue()
+        finally:
+            font.close()
+        
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+        self.evict_subsets()
+        return data
+    
+    def evict_subsets(self) -> int:
+        """Remove the least recently used subsets over the size budget"""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".subset"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.subset_cache_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
+
+
+_font_service: Optional[FontService] = None
+_font_service_lock = threading.Lock()
+
+
+def get_font_service() -> FontService:
+    """The process-wide font service"""
+    global _font_service
+    with _font_service_lock:
+        if _font_service is None:
+            _font_service = FontService()
+        return _font_service
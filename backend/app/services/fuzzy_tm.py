@@ -0,0 +1,253 @@
+"""
+Fuzzy translation memory matching with MinHash/LSH
+"""
+import heapq
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.translation_memory import TranslationMemory
+
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WHITESPACE = re.compile(r"\s+")
+_TOKENS = re.compile(r"\w+|[^\w\s]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace, matching TranslationMemory.generate_hash"""
+    return _WHITESPACE.sub(" ", text.lower().strip())
+
+
+def tokenize(normalized: str) -> List[str]:
+    """Words and runs of punctuation, the units fuzzy scores are counted in"""
+    return _TOKENS.findall(normalized)
+
+
+@dataclass
+class FuzzyMatch:
+    """A translation memory candidate and its similarity to the query"""
+    entry_id: UUID
+    source_text: str
+    target_text: str
+    score: float  # 0.0 to 1.0, edit similarity of the normalized texts' tokens
+
+
+class MinHashLSHIndex:
+    """Near-duplicate index over translation memory source texts.
+    
+    Each text is reduced to its character n-gram shingles and a MinHash
+    signature of ``num_perm`` values, computed with NumPy. Signatures are split
+    into ``bands`` buckets (locality-sensitive hashing), so a lookup only
+    scores entries sharing at least one band with the query.
+    
+    Lookups stay cheap however many entries share a band: only the
+    ``max_candidates`` entries sharing the most bands are considered, those
+    whose token count alone rules out ``min_score`` are dropped, the rest are
+    ranked by signature agreement, and only the best few are rescored with
+    the edit similarity of their token sequences (words and punctuation),
+    which costs a fraction of a character-level comparison on long segments.
+    """
+    
+    def __init__(
+        self,
+        num_perm: int = 64,
+        bands: int = 16,
+        ngram: int = 3,
+        seed: int = 1,
+        max_candidates: int = 64
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.ngram = ngram
+        self.max_candidates = max(1, max_candidates)
+        
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        
+        # entry id -> (normalized, source, target, signature, token count)
+        self._entries: Dict[UUID, Tuple[str, str, str, np.ndarray, int]] = {}
+        self._buckets: List[Dict[bytes, Set[UUID]]] = [{} for _ in range(bands)]
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def signature(self, normalized: str) -> np.ndarray:
+        """MinHash signature of a normalized text"""
+        padded = f" {normalized} "
+        if len(padded) < self.ngram:
+            padded = padded.ljust(self.ngram)
+        shingles = {padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) & _MERSENNE_PRIME for shingle in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        # (a * x + b) mod p for every shingle and permutation; values stay below 2**62
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+    
+    def add(self, entry_id: UUID, source_text: str, target_text: str):
+        """Index (or re-index) a translation memory entry"""
+        normalized = normalize_text(source_text)
+        signature = self.signature(normalized)
+        with self._lock:
+            if entry_id in self._entries:
+                self.remove(entry_id)
+            self._entries[entry_id] = (normalized, source_text, target_text, signature, len(tokenize(normalized)))
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band].setdefault(key, set()).add(entry_id)
+    
+    def remove(self, entry_id: UUID):
+        with self._lock:
+            entry = self._entries.pop(entry_id, None)
+            if entry is None:
+                return
+            for band, key in enumerate(self._band_keys(entry[3])):
+                bucket = self._buckets[band].get(key)
+                if bucket is not None:
+                    bucket.discard(entry_id)
+                    if not bucket:
+                        del self._buckets[band][key]
+    
+    def query(self, text: str, top_k: int = 3, min_score: float = 0.0) -> List[FuzzyMatch]:
+        """Return up to ``top_k`` entries most similar to ``text``, best first"""
+        normalized = normalize_text(text)
+        tokens = tokenize(normalized)
+        signature = self.signature(normalized)
+        
+        with self._lock:
+            # Entries sharing more bands are likelier near-duplicates
+            shared: Dict[UUID, int] = {}
+            for band, key in enumerate(self._band_keys(signature)):
+                for entry_id in self._buckets[band].get(key, ()):
+                    shared[entry_id] = shared.get(entry_id, 0) + 1
+            if not shared:
+                return []
+            candidates = shared if len(shared) <= self.max_candidates else heapq.nlargest(
+                self.max_candidates, shared, key=shared.get
+            )
+            entries = [(entry_id, self._entries[entry_id]) for entry_id in candidates]
+        
+        # No edit similarity exceeds 2 * shorter / (both lengths)
+        if min_score > 0.0:
+            length = len(tokens)
+            entries = [
+                (entry_id, entry) for entry_id, entry in entries
+                if 2.0 * min(length, entry[4]) >= min_score * (length + entry[4])
+            ]
+        
+        # Rank by estimated Jaccard similarity before the more expensive rescoring
+        if len(entries) > top_k * 4:
+            signatures = np.stack([entry[3] for _, entry in entries])
+            agreement = (signatures == signature).sum(axis=1)
+            best = np.argpartition(-agreement, top_k * 4)[:top_k * 4]
+            entries = [entries[i] for i in best]
+        
+        matches = []
+        for entry_id, (entry_normalized, source_text, target_text, _, _) in entries:
+            matcher = SequenceMatcher(None, tokens, tokenize(entry_normalized), autojunk=False)
+            if matcher.quick_ratio() < min_score:
+                continue
+            score = matcher.ratio()
+            if score >= min_score:
+                matches.append(FuzzyMatch(entry_id, source_text, target_text, round(score, 4)))
+        
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches[:top_k]
+    
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[band * self.rows:(band + 1) * self.rows].tobytes()
+            for band in range(self.bands)
+        ]
+
+
+class _IndexState:
+    def __init__(self, index: MinHashLSHIndex):
+        self.index = index
+        self.loaded_until: Optional[datetime] = None
+        self.refreshed_at = 0.0
+        self.lock = threading.Lock()
+
+
+# One index per (source_language, target_language), built on first use
+_indexes: Dict[Tuple[str, str], _IndexState] = {}
+_indexes_lock = threading.Lock()
+
+
+def _new_index() -> MinHashLSHIndex:
+    return MinHashLSHIndex(
+        num_perm=settings.tm_fuzzy_num_perm,
+        bands=settings.tm_fuzzy_bands,
+        max_candidates=settings.tm_fuzzy_max_candidates
+    )
+
+
+def get_fuzzy_index(db: Session, source_language: str, target_language: str) -> MinHashLSHIndex:
+    """Return the index for a language pair, loading entries added since the last refresh.
+    
+    The first call loads the whole language pair; later calls pick up rows
+    created since the previous load at most every ``tm_fuzzy_refresh_interval``
+    seconds. Entries added through TranslationMemoryService.add_entry are
+    indexed immediately.
+    """
+    key = (source_language, target_language)
+    with _indexes_lock:
+        state = _indexes.get(key)
+        if state is None:
+            state = _indexes[key] = _IndexState(_new_index())
+    
+    with state.lock:
+        now = time.monotonic()
+        if state.loaded_until is not None and now - state.refreshed_at < settings.tm_fuzzy_refresh_interval:
+            return state.index
+        
+        query = (
+            select(
+                TranslationMemory.id,
+                TranslationMemory.source_text,
+                TranslationMemory.target_text,
+                TranslationMemory.created_at
+            )
+            .where(
+                TranslationMemory.source_language == source_language,
+                TranslationMemory.target_language == target_language
+            )
+            .execution_options(yield_per=5000)
+        )
+        if state.loaded_until is not None:
+            query = query.where(TranslationMemory.created_at >= state.loaded_until)
+        
+        for entry_id, source_text, target_text, created_at in db.execute(query):
+            state.index.add(entry_id, source_text, target_text)
+            if state.loaded_until is None or created_at > state.loaded_until:
+                state.loaded_until = created_at
+        
+        if state.loaded_until is None:
+            state.loaded_until = datetime.min
+        state.refreshed_at = now
+        return state.index
+
+
+def index_entry(entry: TranslationMemory):
+    """Add a new entry to its language pair's index if that index is loaded"""
+    state = _indexes.get((entry.source_language, entry.target_language))
+    if state is not None:
+        state.index.add(entry.id, entry.source_text, entry.target_text)
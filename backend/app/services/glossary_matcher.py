@@ -0,0 +1,255 @@
+"""
+Glossary term matching with a compiled Aho-Corasick automaton
+"""
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from ..models.glossary import Glossary
+
+
+@dataclass(frozen=True)
+class GlossaryTerm:
+    """The fields of a glossary row needed for matching"""
+    id: UUID
+    source_term: str
+    target_term: str
+    case_sensitive: bool
+    exact_match_only: bool
+    priority: int
+
+
+@dataclass
+class GlossaryMatch:
+    """A glossary term found at text[start:end]"""
+    term: GlossaryTerm
+    start: int
+    end: int
+
+
+def _fold(text: str) -> str:
+    """Lowercase without changing string length, so offsets stay valid"""
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher: one linear pass finds every pattern occurrence"""
+    
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        # Trie of goto transitions; outputs hold (pattern length, payload)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int]]] = [[]]
+        
+        for pattern, payload in patterns:
+            if not pattern:
+                continue
+            node = 0
+            for c in pattern:
+                next_node = self._goto[node].get(c)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][c] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = next_node
+            self._out[node].append((len(pattern), payload))
+        
+        # Breadth-first failure links; outputs inherit those of their fallback
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for c, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and c not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(c, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+    
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield (start, end, payload) for every occurrence in ``text``"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, c in enumerate(text):
+            while node and c not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(c, 0)
+            for length, payload in out[node]:
+                yield i + 1 - length, i + 1, payload
+
+
+class GlossaryMatcher:
+    """Finds glossary terms in segments.
+    
+    Case-insensitive terms are compiled into an automaton over lowercased
+    text and case-sensitive ones into a second automaton over the original
+    text. Overlapping matches are resolved by priority, then by length, then
+    by position.
+    """
+    
+    def __init__(self, terms: List[GlossaryTerm]):
+        self.terms = terms
+        self._insensitive = AhoCorasick(
+            (_fold(term.source_term), i) for i, term in enumerate(terms) if not term.case_sensitive
+        )
+        self._sensitive = AhoCorasick(
+            (term.source_term, i) for i, term in enumerate(terms) if term.case_sensitive
+        )
+    
+    def find(self, text: str) -> List[GlossaryMatch]:
+        """Return non-overlapping matches in text order"""
+        if not self.terms:
+            return []
+        
+        candidates = []
+        for automaton, haystack in ((self._insensitive, _fold(text)), (self._sensitive, text)):
+            for start, end, index in automaton.iter_matches(haystack):
+                term = self.terms[index]
+                if term.exact_match_only and (
+                    (start > 0 and _is_word_char(text[start - 1]) and _is_word_char(text[start]))
+                    or (end < len(text) and _is_word_char(text[end]) and _is_word_char(text[end - 1]))
+                ):
+                    continue
+                candidates.append(GlossaryMatch(term, start, end))
+        
+        if len(candidates) <= 1:
+            return candidates
+        
+        candidates.sort(key=lambda m: (-m.term.priority, -(m.end - m.start), m.start))
+        taken = bytearray(len(text))
+        selected = []
+        for match in candidates:
+            if any(taken[match.start:match.end]):
+                continue
+            taken[match.start:match.end] = b"\x01" * (match.end - match.start)
+            selected.append(match)
+        
+        selected.sort(key=lambda m: m.start)
+        return selected
+    
+    @staticmethod
+    def apply(text: str, matches: List[GlossaryMatch]) -> str:
+        """Replace matched source terms with their target terms"""
+        parts = []
+        position = 0
+        for match in matches:
+            parts.append(text[position:match.start])
+            parts.append(match.term.target_term)
+            position = match.end
+        parts.append(text[position:])
+        return "".join(parts)
+
+
+# Compiled matchers keyed by (source_language, target_language, domain), each
+# stored with the fingerprint of the rows it was built from
+_matchers: Dict[Tuple[str, str, Optional[str]], Tuple[tuple, GlossaryMatcher]] = {}
+_matchers_lock = threading.Lock()
+
+
+def _glossary_filter(source_language: str, target_language: str, domain: Optional[str]):
+    conditions = [
+        Glossary.source_language == source_language,
+        Glossary.target_language == target_language,
+    ]
+    if domain is not None:
+        # Domain glossaries plus the general-purpose terms
+        conditions.append(or_(Glossary.domain == domain, Glossary.domain.is_(None)))
+    else:
+        # General-purpose terms only: no legal or medical terms in general text
+        conditions.append(Glossary.domain.is_(None))
+    return conditions
+
+
+def get_glossary_matcher(
+    db: Session,
+    source_language: str,
+    target_language: str,
+    domain: Optional[str] = None
+) -> GlossaryMatcher:
+    """Return the cached matcher for a language pair, rebuilding it only if rows changed.
+    
+    A row count plus the latest ``updated_at`` fingerprints the glossary, so
+    inserts, edits and deletes all trigger a rebuild while unchanged
+    glossaries cost one aggregate query per call.
+    """
+    key = (source_language, target_language, domain)
+    conditions = _glossary_filter(source_language, target_language, domain)
+    fingerprint = tuple(db.execute(
+        select(func.count(Glossary.id), func.max(Glossary.updated_at)).where(*conditions)
+    ).one())
+    
+    with _matchers_lock:
+        cached = _matchers.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+    
+    rows = db.execute(
+        select(
+            Glossary.id,
+            Glossary.source_term,
+            Glossary.target_term,
+            Glossary.case_sensitive,
+            Glossary.exact_match_only,
+            Glossary.priority
+        ).where(*conditions)
+    ).all()
+    matcher = GlossaryMatcher([
+        GlossaryTerm(
+            id=row.id,
+            source_term=row.source_term,
+            target_term=row.target_term,
+            case_sensitive=bool(row.case_sensitive),
+            exact_match_only=row.exact_match_only is not False,
+            priority=row.priority or 0
+        )
+        for row in rows
+    ])
+    
+    with _matchers_lock:
+        _matchers[key] = (fingerprint, matcher)
+    return matcher
+
+
+class GlossaryUsageTracker:
+    """Accumulates term usage and writes it with one batched UPDATE"""
+    
+    def __init__(self):
+        self.counts: Counter = Counter()
+    
+    def record(self, matches: List[GlossaryMatch]):
+        self.counts.update(match.term.id for match in matches)
+    
+    def flush(self, db: Session):
+        if not self.counts:
+            return
+        
+        table = Glossary.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("term_id"))
+            .values(
+                usage_count=func.coalesce(table.c.usage_count, 0) + bindparam("uses"),
+                last_used_at=datetime.utcnow(),
+                # Usage is not an edit: keep updated_at so cached matchers stay valid
+                updated_at=table.c.updated_at
+            ),
+            [{"term_id": term_id, "uses": uses} for term_id, uses in self.counts.items()]
+        )
+        db.commit()
+        self.counts.clear()
@@ -0,0 +1,246 @@
+"""
+Job progress events: in-process pub/sub bridged across processes by Postgres LISTEN/NOTIFY
+"""
+import asyncio
+import json
+import threading
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional, Set
+from uuid import UUID
+
+from ..core.config import settings
+from ..core.database import engine
+from ..models.job import Job, JobStatus
+
+
+CHANNEL = "job_events"
+
+# Job columns carried by progress events
+EVENT_FIELDS = (
+    "status",
+    "progress_percent",
+    "current_stage",
+    "current_page",
+    "total_pages",
+    "error_message",
+    "download_url",
+)
+
+# Statuses after which a job's stream ends
+FINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+MAX_ERROR_CHARS = 1000  # NOTIFY payloads are limited to 8000 bytes
+
+
+def job_event(job: Job, **updates) -> Dict[str, Any]:
+    """A progress event for a job: its progress columns with ``updates`` applied"""
+    event = {field: getattr(job, field) for field in EVENT_FIELDS}
+    event.update({key: value for key, value in updates.items() if value is not None})
+    return event
+
+
+class Subscription:
+    """One listener's view of a job's events.
+    
+    Events published while the listener is busy are merged field by field,
+    so a slow client only ever receives the latest state and its backlog
+    never grows.
+    """
+    
+    def __init__(self, broker: "JobEventBroker", job_id: str, loop: asyncio.AbstractEventLoop):
+        self.broker = broker
+        self.job_id = job_id
+        self.loop = loop
+        self._pending: Dict[str, Any] = {}
+        self._ready = asyncio.Event()
+    
+    def deliver(self, event: Dict[str, Any]):
+        """Queue an event from any thread"""
+        self.loop.call_soon_threadsafe(self._merge, event)
+    
+    def _merge(self, event: Dict[str, Any]):
+        self._pending.update(event)
+        self._ready.set()
+    
+    async def next(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """The events merged since the last call, or None after ``timeout`` seconds without any"""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        event, self._pending = self._pending, {}
+        self._ready.clear()
+        return event
+    
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class JobEventBroker:
+    """Fans job progress events out to the subscribers in this process.
+    
+    Workers publish every progress update here. On PostgreSQL (psycopg2)
+    each event is also sent with ``NOTIFY`` on a dedicated autocommit
+    connection, and a process with subscribers ``LISTEN``s on one, so API
+    processes hear about jobs running in separate worker processes. Events
+    are tagged with the publishing process and not delivered twice.
+    """
+    
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        
+        dialect = engine.dialect
+        self.use_notify = (
+            settings.job_events_notify and dialect.name == "postgresql" and dialect.driver == "psycopg2"
+        )
+        self._notify_connection = None
+        self._notify_lock = threading.Lock()
+        self._listen_connection = None
+        self._listen_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def publish(self, job_id: UUID, event: Dict[str, Any]):
+        """Send an event to this process's subscribers and, with NOTIFY, to other processes"""
+        event = {**event, "job_id": str(job_id)}
+        if event.get("error_message"):
+            event["error_message"] = event["error_message"][:MAX_ERROR_CHARS]
+        self._deliver(event)
+        if self.use_notify:
+            self._notify(event)
+    
+    def subscribe(self, job_id: UUID) -> Subscription:
+        """Listen for a job's events on the running event loop"""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(self, str(job_id), loop)
+        with self._lock:
+            self._subscribers.setdefault(subscription.job_id, set()).add(subscription)
+        if self.use_notify and self._listen_loop is not loop:
+            self._listen(loop)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.job_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.job_id]
+    
+    def _deliver(self, event: Dict[str, Any]):
+        with self._lock:
+            subscribers = list(self._subscribers.get(event["job_id"], ()))
+        for subscription in subscribers:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:
+                # The subscriber's event loop has closed
+                subscription.close()
+    
+    def _notify(self, event: Dict[str, Any]):
+        payload = json.dumps({**event, "origin": self.origin}, default=str)
+        with self._notify_lock:
+            try:
+                if self._notify_connection is None:
+                    self._notify_connection = _autocommit_connection()
+                with self._notify_connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+            except Exception as e:
+                # Local subscribers already have the event; reconnect on the next one
+                print(f"Failed to publish job event: {e}")
+                self._close_notify_connection()
+    
+    def _close_notify_connection(self):
+        if self._notify_connection is not None:
+            try:
+                self._notify_connection.close()
+            except Exception:
+                pass
+            self._notify_connection = None
+    
+    def _listen(self, loop: asyncio.AbstractEventLoop):
+        """Receive other processes' events on ``loop``, without a thread"""
+        self._stop_listening()
+        try:
+            connection = _autocommit_connection()
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            loop.add_reader(connection.fileno(), self._on_notify)
+        except Exception as e:
+            print(f"Failed to listen for job events: {e}")
+            loop.call_later(settings.job_events_reconnect_seconds, self._relisten, loop)
+            return
+        self._listen_connection = connection
+        self._listen_loop = loop
+    
+    def _relisten(self, loop: asyncio.AbstractEventLoop):
+        if not loop.is_closed() and self._listen_loop is not loop:
+            self._listen(loop)
+    
+    def _stop_listening(self):
+        connection, loop = self._listen_connection, self._listen_loop
+        self._listen_connection = self._listen_loop = None
+        if connection is None:
+            return
+        if not loop.is_closed():
+            loop.remove_reader(connection.fileno())
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def _on_notify(self):
+        connection, loop = self._listen_connection, self._listen_loop
+        try:
+            connection.poll()
+        except Exception as e:
+            print(f"Lost the job events listener connection: {e}")
+            self._stop_listening()
+            loop.call_later(settings.job_events_reconnect_seconds, self._relisten, loop)
+            return
+        
+        while connection.notifies:
+            notification = connection.notifies.pop(0)
+            try:
+                event = json.loads(notification.payload)
+            except ValueError:
+                continue
+            if event.pop("origin", None) != self.origin:
+                self._deliver(event)
+
+
+def _autocommit_connection():
+    """A DBAPI connection of its own, outside the pool, in autocommit mode"""
+    connection = engine.raw_connection()
+    connection.detach()
+    dbapi_connection = connection.dbapi_connection
+    dbapi_connection.autocommit = True
+    return dbapi_connection
+
+
+job_event_broker = JobEventBroker()
+
+
+async def stream_job_events(subscription: Subscription, snapshot: Dict[str, Any]) -> AsyncIterator[str]:
+    """Format a job's events as server-sent events.
+    
+    Sends the full ``snapshot`` first as a ``job`` event, then each merged
+    update as a ``progress`` event, and ends once the job reaches a final
+    status. Comments are sent while idle so proxies keep the stream open.
+    """
+    try:
+        yield _sse("job", snapshot)
+        status = snapshot.get("status")
+        while status not in FINAL_STATUSES:
+            event = await subscription.next(timeout=settings.job_events_keepalive_seconds)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield _sse("progress", event)
+            status = event.get("status", status)
+    finally:
+        subscription.close()
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,198 @@
+"""
+Durable, database-backed job queue
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import offloaded
+from ..models.job import Job, JobStatus
+from ..models.job_queue import JobQueueEntry, QueueStatus
+from .job_events import job_event_broker
+
+
+class JobQueue:
+    """Queue of jobs waiting for a worker, stored in the ``job_queue`` table.
+    
+    Workers claim entries with ``SELECT ... FOR UPDATE SKIP LOCKED`` and hold
+    a lease that they extend while processing. An entry whose lease expires
+    (the worker died or was restarted) becomes claimable again, so in-flight
+    jobs survive restarts of both the API and the workers.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    @offloaded
+    def enqueue(self, job_id: UUID, delay_seconds: float = 0) -> JobQueueEntry:
+        """Add a job to the queue, resetting its entry if it was queued before"""
+        available_at = datetime.utcnow() + timedelta(seconds=delay_seconds)
+        
+        entry = self.db.execute(
+            select(JobQueueEntry).where(JobQueueEntry.job_id == job_id).with_for_update()
+        ).scalar_one_or_none()
+        
+        if entry is None:
+            entry = JobQueueEntry(job_id=job_id)
+            self.db.add(entry)
+        
+        entry.status = QueueStatus.QUEUED
+        entry.attempts = 0
+        entry.max_attempts = settings.job_max_attempts
+        entry.available_at = available_at
+        entry.worker_id = None
+        entry.leased_until = None
+        entry.last_error = None
+        
+        self.db.commit()
+        return entry
+    
+    @offloaded
+    def discard(self, job_id: UUID):
+        """Drop a job's entry if no worker has claimed it yet"""
+        self.db.execute(
+            update(JobQueueEntry)
+            .where(JobQueueEntry.job_id == job_id, JobQueueEntry.status == QueueStatus.QUEUED)
+            .values(status=QueueStatus.DONE)
+        )
+        self.db.commit()
+    
+    @offloaded
+    def is_leased(self, job_id: UUID) -> bool:
+        """Whether a worker currently holds a live lease on the job"""
+        leased_until = self.db.execute(
+            select(JobQueueEntry.leased_until)
+            .where(JobQueueEntry.job_id == job_id, JobQueueEntry.status == QueueStatus.RUNNING)
+        ).scalar_one_or_none()
+        return leased_until is not None and leased_until >= datetime.utcnow()
+    
+    @offloaded
+    def claim(self, worker_id: str, lease_seconds: Optional[int] = None) -> Optional[JobQueueEntry]:
+        """Lease the next available entry, or return None if there is none"""
+        lease_seconds = lease_seconds or settings.job_lease_seconds
+        
+        while True:
+            now = datetime.utcnow()
+            entry = self.db.execute(
+                select(JobQueueEntry)
+                .where(or_(
+                    and_(JobQueueEntry.status == QueueStatus.QUEUED, JobQueueEntry.available_at <= now),
+                    # Lease expired: the worker holding it is gone
+                    and_(JobQueueEntry.status == QueueStatus.RUNNING, JobQueueEntry.leased_until < now),
+                ))
+                .order_by(JobQueueEntry.available_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            
+            if entry is None:
+                self.db.rollback()
+                return None
+            
+            if entry.status == QueueStatus.RUNNING and entry.attempts >= entry.max_attempts:
+                # The last allowed attempt died with its worker
+                job_id, error = entry.job_id, f"Lease held by {entry.worker_id} expired"
+                entry.status = QueueStatus.FAILED
+                entry.last_error = error
+                entry.leased_until = None
+                failed = self.db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status != JobStatus.CANCELLED)
+                    .values(status=JobStatus.FAILED, error_message=error)
+                )
+                self.db.commit()
+                if failed.rowcount:
+                    job_event_broker.publish(job_id, {"status": JobStatus.FAILED, "error_message": error})
+                continue
+            
+            entry.status = QueueStatus.RUNNING
+            entry.attempts += 1
+            entry.worker_id = worker_id
+            entry.leased_until = now + timedelta(seconds=lease_seconds)
+            
+            self.db.commit()
+            return entry
+    
+    @offloaded
+    def heartbeat(self, entry_id: UUID, worker_id: str, lease_seconds: Optional[int] = None) -> bool:
+        """Extend a lease; returns False if the lease now belongs to someone else"""
+        lease_seconds = lease_seconds or settings.job_lease_seconds
+        result = self.db.execute(
+            update(JobQueueEntry)
+            .where(
+                JobQueueEntry.id == entry_id,
+                JobQueueEntry.worker_id == worker_id,
+                JobQueueEntry.status == QueueStatus.RUNNING
+            )
+            .values(leased_until=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        )
+        self.db.commit()
+        return result.rowcount == 1
+    
+    def _held(self, entry_id: UUID, worker_id: Optional[str]):
+        """Conditions matching the entry only while ``worker_id`` still holds its lease"""
+        conditions = [JobQueueEntry.id == entry_id]
+        if worker_id is not None:
+            conditions += [JobQueueEntry.worker_id == worker_id, JobQueueEntry.status == QueueStatus.RUNNING]
+        return conditions
+    
+    @offloaded
+    def complete(self, entry_id: UUID, worker_id: Optional[str] = None) -> bool:
+        """Mark an entry as done; with ``worker_id``, only while that worker holds it"""
+        result = self.db.execute(
+            update(JobQueueEntry)
+            .where(*self._held(entry_id, worker_id))
+            .values(status=QueueStatus.DONE, leased_until=None)
+        )
+        self.db.commit()
+        return result.rowcount == 1
+    
+    @offloaded
+    def fail(self, entry_id: UUID, error: str, worker_id: Optional[str] = None) -> bool:
+        """Record a failed attempt and schedule a retry with exponential backoff.
+        
+        Returns True if the entry will be retried. The job is put back into
+        UPLOADED so the worker accepts it again on the next attempt, which
+        resumes from the job's page checkpoints. With ``worker_id`` nothing
+        is recorded once that worker no longer holds the entry.
+        """
+        entry = self.db.execute(
+            select(JobQueueEntry).where(*self._held(entry_id, worker_id)).with_for_update()
+        ).scalar_one_or_none()
+        if entry is None:
+            self.db.rollback()
+            return False
+        
+        entry.last_error = error
+        entry.leased_until = None
+        
+        retry = entry.attempts < entry.max_attempts
+        event = None
+        if retry:
+            backoff = settings.job_retry_backoff_seconds * (2 ** (entry.attempts - 1))
+            entry.status = QueueStatus.QUEUED
+            entry.available_at = datetime.utcnow() + timedelta(seconds=backoff)
+            event = {
+                "status": JobStatus.UPLOADED,
+                "error_message": None,
+                "current_stage": f"Retrying (attempt {entry.attempts + 1} of {entry.max_attempts})",
+            }
+            requeued = self.db.execute(
+                update(Job)
+                .where(Job.id == entry.job_id, Job.status != JobStatus.CANCELLED)
+                .values(**event)
+            )
+            if not requeued.rowcount:
+                event = None
+        else:
+            entry.status = QueueStatus.FAILED
+        
+        job_id = entry.job_id
+        self.db.commit()
+        if event is not None:
+            job_event_broker.publish(job_id, event)
+        return retry
@@ -2,21 +2,98 @@
 Job service for managing translation jobs
 """
 import hashlib
-from typing import List, Optional, Tuple
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import and_, func, select, text, tuple_, update
 
-from ..models.job import Job, JobStatus
+from ..core.config import settings
+from ..core.database import offloaded
+from ..models.job import IN_FLIGHT_STATUSES, Job, JobStatus
 from ..schemas.job import JobCreate
+from .cancellation import JobCancelled, request_cancellation
+from .document_cache import file_sha256
+from .job_events import job_event, job_event_broker
+from .job_queue import JobQueue
+from .output_files import OutputFile, output_files, output_filename, output_path
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+@dataclass
+class JobPage:
+    """One page of a job listing"""
+    jobs: List[Job]
+    total: int
+    total_estimated: bool
+    next_cursor: Optional[str]
+
+
+class JobCounts:
+    """Job totals for list responses, cached per status filter.
+    
+    Counts are reused for ``job_count_cache_seconds`` and dropped when this
+    process creates or deletes a job. On PostgreSQL the unfiltered total of
+    a table past ``job_count_exact_max`` rows is the planner's estimate
+    rather than a full count.
+    """
+    
+    def __init__(self):
+        self._counts: Dict[Optional[JobStatus], Tuple[int, bool, float]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, db: Session, status: Optional[JobStatus] = None) -> Tuple[int, bool]:
+        """The total and whether it is an estimate"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(status)
+        if cached is not None and now - cached[2] < settings.job_count_cache_seconds:
+            return cached[0], cached[1]
+        
+        total, estimated = None, False
+        if status is None and db.get_bind().dialect.name == "postgresql":
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+                {"table": Job.__tablename__}
+            ).scalar()
+            # Tables never analyzed report -1
+            if estimate is not None and estimate >= settings.job_count_exact_max:
+                total, estimated = int(estimate), True
+        if total is None:
+            query = db.query(func.count(Job.id))
+            if status:
+                query = query.filter(Job.status == status)
+            total = query.scalar()
+        
+        with self._lock:
+            self._counts[status] = (total, estimated, now)
+        return total, estimated
+    
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+job_counts = JobCounts()
 
 
 class JobService:
+    """Job lifecycle operations.
+    
+    Queries run on the database threadpool for request sessions and inline
+    for worker sessions; see ``offloaded``.
+    """
+    
     def __init__(self, db: Session):
         self.db = db
     
-    async def create_job(self, job_data: JobCreate) -> Job:
+    @offloaded
+    def create_job(self, job_data: JobCreate) -> Job:
         """Create a new translation job"""
         
         # Generate a spec hash for idempotency
@@ -49,31 +126,63 @@ class JobService:
         self.db.add(job)
         self.db.commit()
         self.db.refresh(job)
+        job_counts.clear()
         
         return job
     
-    async def get_job(self, job_id: UUID) -> Optional[Job]:
+    @offloaded
+    def get_job(self, job_id: UUID) -> Optional[Job]:
         """Get a job by ID"""
         return self.db.query(Job).filter(Job.id == job_id).first()
     
-    async def list_jobs(
+    @offloaded
+    def output_state(self, job_id: UUID) -> Optional[Tuple[JobStatus, Optional[str]]]:
+        """A job's status and output hash, without loading the row; None if it is gone"""
+        row = self.db.execute(select(Job.status, Job.output_sha256).where(Job.id == job_id)).first()
+        return (row.status, row.output_sha256) if row is not None else None
+    
+    @offloaded
+    def list_jobs(
         self, 
         skip: int = 0, 
         limit: int = 10, 
-        status: Optional[JobStatus] = None
-    ) -> Tuple[List[Job], int]:
-        """List jobs with pagination"""
+        status: Optional[JobStatus] = None,
+        cursor: Optional[str] = None
+    ) -> JobPage:
+        """List jobs newest first.
+        
+        Pass the previous page's ``next_cursor`` to continue after its last
+        job; the index on (created_at, id) makes every page cost the same
+        however deep it is. ``skip`` pages by OFFSET and gets slower with
+        depth. The total is cached and may be an estimate.
+        """
         query = self.db.query(Job)
         
         if status:
             query = query.filter(Job.status == status)
         
-        total = query.count()
-        jobs = query.order_by(Job.created_at.desc()).offset(skip).limit(limit).all()
+        if cursor:
+            created_at, job_id = decode_cursor(cursor, 2)
+            try:
+                after = (datetime.fromisoformat(created_at), UUID(job_id))
+            except (TypeError, ValueError) as e:
+                raise InvalidCursor("Malformed cursor") from e
+            query = query.filter(tuple_(Job.created_at, Job.id) < after)
+        elif skip:
+            query = query.offset(skip)
+        
+        # One extra row tells whether there is a next page
+        jobs = query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(jobs) > limit:
+            jobs = jobs[:limit]
+            next_cursor = encode_cursor(jobs[-1].created_at.isoformat(), jobs[-1].id)
         
-        return jobs, total
+        total, estimated = job_counts.get(self.db, status)
+        return JobPage(jobs=jobs, total=total, total_estimated=estimated, next_cursor=next_cursor)
     
-    async def update_job_status(
+    @offloaded
+    def update_job_status(
         self, 
         job: Job, 
         status: JobStatus, 
@@ -81,34 +190,72 @@ class JobService:
         current_stage: Optional[str] = None,
         current_page: Optional[int] = None,
         total_pages: Optional[int] = None,
-        error_message: Optional[str] = None
+        error_message: Optional[str] = None,
+        download_url: Optional[str] = None,
+        refresh: bool = False,
+        publish: bool = True,
+        unless_cancelled: bool = False
     ) -> Job:
-        """Update job status and progress"""
-        job.status = status
+        """Update job status and progress
+        
+        The job is only re-read from the database when ``refresh`` is set;
+        long-running workers should report through ProgressReporter. The
+        update is published to job event subscribers unless ``publish`` is
+        False.
+        
+        Workers pass ``unless_cancelled``: the row is then only updated while
+        it is not CANCELLED, so a cancel committed by another process is never
+        written over, and JobCancelled is raised instead.
+        """
+        values = {"status": status}
         
         if progress_percent is not None:
-            job.progress_percent = progress_percent
+            values["progress_percent"] = progress_percent
         
         if current_stage is not None:
-            job.current_stage = current_stage
-            
+            values["current_stage"] = current_stage
+        
         if current_page is not None:
-            job.current_page = current_page
-            
+            values["current_page"] = current_page
+        
         if total_pages is not None:
-            job.total_pages = total_pages
-            
+            values["total_pages"] = total_pages
+        
         if error_message is not None:
-            job.error_message = error_message
+            values["error_message"] = error_message
+        
+        if download_url is not None:
+            values["download_url"] = download_url
         
         if status == JobStatus.COMPLETED:
-            job.completed_at = datetime.utcnow()
+            values["completed_at"] = datetime.utcnow()
         elif status in [JobStatus.EXTRACTING, JobStatus.TRANSLATING]:
             if not job.started_at:
-                job.started_at = datetime.utcnow()
+                values["started_at"] = datetime.utcnow()
+        
+        if unless_cancelled:
+            result = self.db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status != JobStatus.CANCELLED)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                raise JobCancelled(job.id)
+            # Mirror the written row on the job without marking it dirty
+            for key, value in values.items():
+                set_committed_value(job, key, value)
+        else:
+            for key, value in values.items():
+                setattr(job, key, value)
         
+        # Read before the commit expires the job
+        event = job_event(job) if publish else None
         self.db.commit()
-        self.db.refresh(job)
+        if event is not None:
+            job_event_broker.publish(job.id, event)
+        if refresh:
+            self.db.refresh(job)
         
         return job
     
@@ -122,38 +269,88 @@ class JobService:
             current_stage="Queued for processing"
         )
         
-        # For now, run the job in a background thread
-        # In production, this would use Celery or similar task queue
-        import threading
-        from ..workers.translation_worker import run_translation_job_sync
+        # Hand the job to the durable queue; workers started with
+        # `python -m app.workers.queue_worker` pick it up
+        await JobQueue(self.db).enqueue(job.id)
         
-        thread = threading.Thread(
-            target=run_translation_job_sync,
-            args=(str(job.id),),
-            daemon=True
+        return job
+    
+    async def can_resume(self, job: Job) -> bool:
+        """Whether a job failed, or was left in flight by a worker that no longer holds it"""
+        if job.status == JobStatus.FAILED:
+            return True
+        return job.status in IN_FLIGHT_STATUSES and not await JobQueue(self.db).is_leased(job.id)
+    
+    async def resume_job(self, job: Job):
+        """Queue a failed or interrupted job to continue from its page checkpoints"""
+        job.error_message = None
+        await self.update_job_status(
+            job,
+            JobStatus.UPLOADED,
+            current_stage="Queued to resume"
         )
-        thread.start()
+        await JobQueue(self.db).enqueue(job.id)
         
         return job
     
     async def cancel_job(self, job: Job):
         """Cancel a job"""
+        job.cancel_requested_at = datetime.utcnow()
         await self.update_job_status(
             job,
             JobStatus.CANCELLED,
             current_stage="Cancelled by user"
         )
         
-        # TODO: Send cancellation signal to worker if job is being processed
+        # Running workers see the status change at their next page or batch
+        # boundary; queued jobs are simply never picked up
+        request_cancellation(job.id)
+        await JobQueue(self.db).discard(job.id)
         
         return job
     
-    async def delete_job(self, job: Job):
+    @offloaded
+    def record_metrics(self, job: Job, **metrics) -> Job:
+        """Merge values into the job's metrics and commit"""
+        job.metrics = {**(job.metrics or {}), **metrics}
+        self.db.commit()
+        return job
+    
+    @offloaded
+    def output_file(self, job: Job) -> Optional[OutputFile]:
+        """Describe a job's output file, or None if it is missing.
+        
+        Outputs written before hashes were recorded are hashed once here.
+        """
+        path = output_path(job)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        
+        if job.output_sha256 is None:
+            job.output_sha256 = file_sha256(path)
+            self.db.commit()
+        
+        return OutputFile(
+            job_id=str(job.id),
+            path=path,
+            filename=output_filename(job),
+            sha256=job.output_sha256,
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns
+        )
+    
+    @offloaded
+    def delete_job(self, job: Job):
         """Delete a job and its associated data"""
         # TODO: Clean up associated files from storage
         
         # Delete job (this will cascade delete segments due to relationship)
+        job_id = job.id
         self.db.delete(job)
         self.db.commit()
+        job_counts.clear()
+        output_files.discard(job_id)
         
         return True
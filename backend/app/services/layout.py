@@ -0,0 +1,161 @@
+"""
+Layout analysis: grouping text spans into lines, paragraphs and columns
+"""
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+
+# Tolerances, as fractions of the font size unless noted
+BASELINE_TOLERANCE = 0.3  # baseline drift still treated as the same line
+WORD_GAP = 0.15  # horizontal gap between spans that implies a space
+MAX_SPAN_GAP = 1.5  # horizontal gap that splits a line (table cells, tab stops)
+MAX_LINE_GAP = 0.8  # vertical whitespace between lines of one paragraph
+SIZE_TOLERANCE = 0.2  # relative font size change that starts a new paragraph
+MIN_GUTTER = 1.0  # narrowest column gutter
+GUTTER_COVERAGE = 0.05  # share of the peak span coverage a gutter may still carry,
+# beyond the one full-width span (a title) it always may
+
+
+@dataclass
+class SpanLayout:
+    """Spans grouped into blocks in reading order.
+    
+    ``blocks`` holds, for each block, its lines as arrays of span indices in
+    left-to-right order. ``space_before`` flags spans separated from the
+    previous span on their line by a word gap.
+    """
+    blocks: List[List[np.ndarray]]
+    space_before: np.ndarray
+
+
+def _column_boundaries(x0: np.ndarray, x1: np.ndarray, size: np.ndarray) -> np.ndarray:
+    """Find x positions of column gutters from how many spans cover each point"""
+    left, right = int(np.floor(x0.min())), int(np.ceil(x1.max()))
+    if right - left < 2:
+        return np.empty(0)
+    
+    # Coverage per 1pt bin via a difference array
+    diff = np.zeros(right - left + 1, dtype=np.int64)
+    np.add.at(diff, np.floor(x0).astype(np.int64) - left, 1)
+    np.add.at(diff, np.ceil(x1).astype(np.int64) - left, -1)
+    coverage = np.cumsum(diff)[:-1]
+    
+    gutter = coverage <= max(1.0, GUTTER_COVERAGE * coverage.max())
+    if not gutter.any():
+        return np.empty(0)
+    
+    # Runs of gutter bins strictly inside the text area
+    edges = np.diff(np.concatenate(([0], gutter.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    interior = (starts > 0) & (stops < len(coverage))
+    wide = (stops - starts) >= MIN_GUTTER * np.median(size)
+    keep = interior & wide
+    return left + (starts[keep] + stops[keep]) / 2.0
+
+
+def _segment_starts(breaks: np.ndarray) -> np.ndarray:
+    """Start offsets of the runs delimited by a boolean break-before mask"""
+    return np.flatnonzero(np.concatenate(([True], breaks)))
+
+
+def analyze_spans(
+    x0: np.ndarray,
+    y0: np.ndarray,
+    x1: np.ndarray,
+    y1: np.ndarray,
+    baseline: np.ndarray,
+    size: np.ndarray,
+    font: np.ndarray,
+    chars: np.ndarray
+) -> SpanLayout:
+    """Group the spans of one page into paragraphs in reading order.
+    
+    All arrays are indexed by span. ``font`` holds interned font ids and
+    ``chars`` the length of each span's text. Spans are clustered into lines
+    by baseline and horizontal gap, lines are assigned to columns found from
+    gutters in the page's span coverage, and consecutive lines of a column
+    form a paragraph while their spacing, size and font stay continuous.
+    Lines crossing a gutter (titles, full-width figures) span the columns and
+    order the page into sections.
+    """
+    n = len(x0)
+    if n == 0:
+        return SpanLayout(blocks=[], space_before=np.zeros(0, dtype=bool))
+    
+    # Columns from the gutters between spans
+    boundaries = _column_boundaries(x0, x1, size)
+    column = np.searchsorted(boundaries, (x0 + x1) / 2.0)
+    crossing = np.searchsorted(boundaries, x0) != np.searchsorted(boundaries, x1)
+    
+    # Rows: cluster baselines in sorted order
+    order = np.argsort(baseline, kind="stable")
+    sorted_baseline = baseline[order]
+    tolerance = BASELINE_TOLERANCE * np.maximum(size[order][1:], size[order][:-1])
+    row = np.empty(n, dtype=np.int64)
+    row[order] = np.cumsum(np.concatenate(([0], np.diff(sorted_baseline) > tolerance)))
+    
+    # Lines: spans of a row left to right, split at wide gaps and gutters
+    order = np.lexsort((x0, row))
+    gap = x0[order][1:] - x1[order][:-1]
+    same_row = row[order][1:] == row[order][:-1]
+    gap_limit = np.maximum(size[order][1:], size[order][:-1])
+    changes_column = (
+        (column[order][1:] != column[order][:-1])
+        & ~crossing[order][1:] & ~crossing[order][:-1]
+    )
+    line_break = ~same_row | (gap > MAX_SPAN_GAP * gap_limit) | changes_column
+    
+    space_before = np.zeros(n, dtype=bool)
+    space_before[order[1:]] = ~line_break & (gap > WORD_GAP * gap_limit)
+    
+    line_starts = _segment_starts(line_break)
+    line_x0 = np.minimum.reduceat(x0[order], line_starts)
+    line_y0 = np.minimum.reduceat(y0[order], line_starts)
+    line_x1 = np.maximum.reduceat(x1[order], line_starts)
+    line_y1 = np.maximum.reduceat(y1[order], line_starts)
+    line_size = np.maximum.reduceat(size[order], line_starts)
+    line_id = np.cumsum(np.concatenate(([0], line_break)))
+    
+    # Dominant font of each line: the font of its longest span
+    by_chars = np.lexsort((chars[order], line_id))
+    last_of_line = np.concatenate((line_starts[1:], [n])) - 1
+    line_font = font[order][by_chars][last_of_line]
+    
+    line_spans = np.split(order, line_starts[1:])
+    line_crossing = np.logical_or.reduceat(crossing[order], line_starts)
+    line_column = np.where(
+        line_crossing | (np.searchsorted(boundaries, line_x0) != np.searchsorted(boundaries, line_x1)),
+        -1,
+        np.searchsorted(boundaries, (line_x0 + line_x1) / 2.0)
+    )
+    
+    # Paragraphs: consecutive lines of a column, top to bottom
+    order = np.lexsort((line_y0, line_column))
+    prev, cur = order[:-1], order[1:]
+    vertical_gap = line_y0[cur] - line_y1[prev]
+    size_ratio = np.abs(line_size[cur] - line_size[prev]) / np.maximum(line_size[prev], 1e-6)
+    overlap = np.minimum(line_x1[cur], line_x1[prev]) - np.maximum(line_x0[cur], line_x0[prev])
+    paragraph_break = (
+        (line_column[cur] != line_column[prev])
+        | (vertical_gap > MAX_LINE_GAP * line_size[prev])
+        | (size_ratio > SIZE_TOLERANCE)
+        | (overlap <= 0)
+        | (line_font[cur] != line_font[prev])
+    )
+    
+    paragraph_starts = _segment_starts(paragraph_break)
+    paragraph_y0 = np.minimum.reduceat(line_y0[order], paragraph_starts)
+    paragraph_column = line_column[order][paragraph_starts]
+    
+    # Reading order: full-width paragraphs divide the page into sections,
+    # read top to bottom; inside a section, column by column
+    spanning = paragraph_column == -1
+    section = np.searchsorted(np.sort(paragraph_y0[spanning]), paragraph_y0, side="right")
+    reading_order = np.lexsort((paragraph_y0, paragraph_column, section))
+    
+    paragraphs = np.split(order, paragraph_starts[1:])
+    blocks = [[line_spans[line] for line in paragraphs[p]] for p in reading_order]
+    return SpanLayout(blocks=blocks, space_before=space_before)
@@ -0,0 +1,93 @@
+"""
+Translated output files and an in-process cache of their download metadata
+"""
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+from uuid import UUID
+
+from ..core.config import settings
+from ..models.job import Job
+
+
+@dataclass(frozen=True)
+class OutputFile:
+    """What a download needs to know about a job's output, without the job row"""
+    job_id: str
+    path: str
+    filename: str
+    sha256: str
+    size: int
+    mtime_ns: int
+    
+    @property
+    def etag(self) -> str:
+        return f'"{self.sha256}"'
+    
+    @property
+    def last_modified(self) -> float:
+        return self.mtime_ns / 1e9
+
+
+def output_filename(job: Job) -> str:
+    return f"translated_{job.filename}"
+
+
+def output_path(job: Job) -> str:
+    return os.path.join(settings.upload_dir, f"{job.id}_{output_filename(job)}")
+
+
+class OutputFileCache:
+    """Recently downloaded outputs by (job, output hash), least recently used first out.
+    
+    Callers look up the job's current status and ``output_sha256`` first, so
+    a job deleted or rerun through another process misses rather than being
+    served from a stale entry. Entries are also checked against the file's
+    size and modification time on every lookup.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max(1, max_entries or settings.download_cache_size)
+        self._entries: "OrderedDict[Tuple[str, str], OutputFile]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, job_id: UUID, sha256: Optional[str]) -> Optional[OutputFile]:
+        if sha256 is None:
+            return None
+        key = (str(job_id), sha256)
+        with self._lock:
+            output = self._entries.get(key)
+            if output is not None:
+                self._entries.move_to_end(key)
+        if output is None:
+            return None
+        
+        try:
+            stat = os.stat(output.path)
+        except OSError:
+            stat = None
+        if stat is None or stat.st_size != output.size or stat.st_mtime_ns != output.mtime_ns:
+            with self._lock:
+                self._entries.pop(key, None)
+            return None
+        return output
+    
+    def put(self, output: OutputFile):
+        with self._lock:
+            key = (output.job_id, output.sha256)
+            self._entries[key] = output
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def discard(self, job_id: UUID):
+        """Drop every output cached for a job"""
+        job_id = str(job_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == job_id]:
+                del self._entries[key]
+
+
+output_files = OutputFileCache()
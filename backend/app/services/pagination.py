@@ -0,0 +1,27 @@
+"""
+Opaque cursors for keyset pagination
+"""
+import base64
+import json
+from typing import Any, List
+
+
+class InvalidCursor(ValueError):
+    """A cursor that was not produced by encode_cursor"""
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode the sort key of the last row on a page"""
+    raw = json.dumps(list(values), default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """Decode a cursor back into the ``length`` values of its sort key"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor("Malformed cursor")
+    return values
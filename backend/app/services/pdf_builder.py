@@ -0,0 +1,485 @@
+"""
+Translated PDF output: translated text overlaid on the background-only pages
+"""
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+import fitz  # PyMuPDF
+import numpy as np
+import pikepdf
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from .font_service import get_font_service
+from .segment_store import write_overflow_flags
+from .text_fitting import LINE_HEIGHT, TextFit, fit_texts
+
+
+@dataclass
+class OverlayText:
+    """A translated segment to draw on a page"""
+    text: str
+    bbox: Tuple[float, float, float, float]  # x0, y0, x1, y1 from the top-left, as extracted
+    font_size: float
+    color: int = 0  # sRGB as 0xRRGGBB
+    font: Optional[str] = None  # path of a TrueType/OpenType file; None for standard Helvetica
+    lines: Optional[List[str]] = None  # set once fitted, with font_size the fitted size
+    segment_id: Optional[UUID] = None
+
+
+# (page index, crop box x0, crop box y1, texts)
+PageOverlay = Tuple[int, float, float, List[OverlayText]]
+
+
+class StandardFont:
+    """The standard Helvetica font: nothing to embed, WinAnsi-encoded strings"""
+    
+    ascender = 0.718
+    
+    def __init__(self):
+        metrics = fitz.Font("helv")
+        # Characters outside WinAnsi are drawn as "?"
+        self.advances = np.full(0x10000, metrics.text_length("?", fontsize=1.0), dtype=np.float32)
+        for byte in range(256):
+            try:
+                char = bytes([byte]).decode("cp1252")
+            except UnicodeDecodeError:
+                continue
+            self.advances[ord(char)] = metrics.text_length(char, fontsize=1.0)
+    
+    def text_width(self, text: str, size: float) -> float:
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        return float(self.advances[np.minimum(codes, 0xFFFF)].sum()) * size
+    
+    def encode(self, text: str) -> bytes:
+        raw = text.encode("cp1252", errors="replace")
+        return b"(" + raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+    
+    def used_glyphs(self) -> Dict[int, str]:
+        return {}
+
+
+class TrueTypeFont:
+    """A TrueType/OpenType font drawn through glyph IDs (Identity-H)"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.metrics = get_font_service().get_metrics(path)
+        self.ascender = self.metrics.ascender
+        self.advances = self.metrics.advances
+        self._used: Dict[int, str] = {}
+    
+    def text_width(self, text: str, size: float) -> float:
+        return self.metrics.text_width(text, size)
+    
+    def encode(self, text: str) -> bytes:
+        gids = self.metrics.glyphs_for(text)
+        for gid, c in zip(gids, text):
+            if gid:
+                self._used.setdefault(gid, c)
+        return b"<" + "".join(f"{gid:04X}" for gid in gids).encode("ascii") + b">"
+    
+    def used_glyphs(self) -> Dict[int, str]:
+        """Glyphs drawn so far, with the character each one stands for"""
+        return self._used
+
+
+# Fonts loaded in this process, by path (None for Helvetica)
+_fonts: Dict[Optional[str], Any] = {}
+
+
+def load_font(path: Optional[str]):
+    font = _fonts.get(path)
+    if font is None:
+        font = _fonts[path] = StandardFont() if path is None else TrueTypeFont(path)
+    return font
+
+
+def fit_page(texts: List[OverlayText]) -> TextFit:
+    """Shrink and wrap a page's texts to their boxes, updating them in place"""
+    fit = fit_texts(
+        [item.text for item in texts],
+        [item.bbox[2] - item.bbox[0] for item in texts],
+        [item.bbox[3] - item.bbox[1] for item in texts],
+        [item.font_size for item in texts],
+        [load_font(item.font) for item in texts]
+    )
+    for i, item in enumerate(texts):
+        item.font_size = float(fit.font_size[i])
+        item.lines = fit.lines(i)
+    return fit
+
+
+def overflow_flag(fit: TextFit, i: int, available_height: float) -> Dict[str, Any]:
+    """QA flag for a text that does not fit its box even at the smallest size"""
+    return {
+        "type": "overflow",
+        "scale": round(float(fit.scale[i]), 3),
+        "lines": int(fit.line_count[i]),
+        "required_height": round(float(fit.required_height[i]), 2),
+        "available_height": round(available_height, 2),
+    }
+
+
+def render_overlay(texts: List[OverlayText], crop_x0: float, crop_y1: float, font_names: Dict[Optional[str], str]) -> bytes:
+    """Content stream drawing the texts of one page.
+    
+    Extracted bboxes have their origin at the top-left of the crop box;
+    PDF user space grows upwards from the bottom-left. Texts not fitted yet
+    are fitted here.
+    """
+    unfitted = [item for item in texts if item.lines is None]
+    if unfitted:
+        fit_page(unfitted)
+    
+    ops = [b"BT"]
+    for item in texts:
+        if not item.lines:
+            continue
+        font = load_font(item.font)
+        size = item.font_size
+        x0, y0, _, _ = item.bbox
+        r, g, b = (item.color >> 16) & 0xFF, (item.color >> 8) & 0xFF, item.color & 0xFF
+        ops.append(f"{r / 255:.3f} {g / 255:.3f} {b / 255:.3f} rg {font_names[item.font]} {size:.2f} Tf".encode("ascii"))
+        
+        baseline = crop_y1 - y0 - font.ascender * size
+        for line in item.lines:
+            ops.append(f"1 0 0 1 {crop_x0 + x0:.2f} {baseline:.2f} Tm ".encode("ascii") + font.encode(line) + b" Tj")
+            baseline -= LINE_HEIGHT * size
+    ops.append(b"ET")
+    return b"\n".join(ops)
+
+
+# Rendered pages with the glyphs drawn per font
+RenderResult = Tuple[List[Tuple[int, bytes, List[Optional[str]]]], Dict[Optional[str], Dict[int, str]]]
+
+
+def render_page_range(pages: List[PageOverlay], font_names: Dict[Optional[str], str]) -> RenderResult:
+    """Render overlay content streams for a batch of pages.
+    
+    Runs inside build worker processes. Returns each page's content with the
+    fonts it uses, and the glyphs drawn per font, so the parent embeds every
+    font once.
+    """
+    rendered = [
+        (
+            page_index,
+            render_overlay(texts, crop_x0, crop_y1, font_names),
+            sorted({item.font for item in texts}, key=lambda path: path or "")
+        )
+        for page_index, crop_x0, crop_y1, texts in pages
+    ]
+    used = {path: dict(load_font(path).used_glyphs()) for path in font_names}
+    for path in font_names:
+        load_font(path).used_glyphs().clear()
+    return rendered, used
+
+
+def embed_font(pdf: pikepdf.Pdf, path: Optional[str], glyphs: Dict[int, str]) -> pikepdf.Dictionary:
+    """Build the font dictionary for a font, subset to the glyphs drawn"""
+    if path is None:
+        return pikepdf.Dictionary(
+            Type=pikepdf.Name.Font,
+            Subtype=pikepdf.Name.Type1,
+            BaseFont=pikepdf.Name.Helvetica,
+            Encoding=pikepdf.Name.WinAnsiEncoding
+        )
+    
+    fonts = get_font_service()
+    font = fonts.get_font(path)
+    units_per_em = font["head"].unitsPerEm
+    scale = 1000.0 / units_per_em
+    glyph_order = font.getGlyphOrder()
+    metrics = font["hmtx"].metrics
+    widths = pikepdf.Array()
+    for gid in sorted(glyphs):
+        widths.append(gid)
+        widths.append(pikepdf.Array([round(metrics[glyph_order[gid]][0] * scale)]))
+    
+    # Glyph IDs are kept stable so the content streams stay valid
+    font_data = fonts.subset(path, glyphs)
+    
+    tag = "".join(chr(ord("A") + b % 26) for b in hashlib.sha1(repr(sorted(glyphs)).encode()).digest()[:6])
+    ps_name = (font["name"].getDebugName(6) or os.path.splitext(os.path.basename(path))[0]).replace(" ", "")
+    base_font = pikepdf.Name(f"/{tag}+{ps_name}")
+    head, hhea = font["head"], font["hhea"]
+    truetype = "glyf" in font
+    
+    descriptor = pikepdf.Dictionary(
+        Type=pikepdf.Name.FontDescriptor,
+        FontName=base_font,
+        Flags=4,
+        FontBBox=[round(v * scale) for v in (head.xMin, head.yMin, head.xMax, head.yMax)],
+        ItalicAngle=0,
+        Ascent=round(hhea.ascent * scale),
+        Descent=round(hhea.descent * scale),
+        CapHeight=round(hhea.ascent * scale),
+        StemV=80
+    )
+    if truetype:
+        descriptor.FontFile2 = pdf.make_stream(font_data)
+    else:
+        descriptor.FontFile3 = pdf.make_stream(font_data, Subtype=pikepdf.Name.OpenType)
+    
+    descendant = pikepdf.Dictionary(
+        Type=pikepdf.Name.Font,
+        Subtype=pikepdf.Name.CIDFontType2 if truetype else pikepdf.Name.CIDFontType0,
+        BaseFont=base_font,
+        CIDSystemInfo=pikepdf.Dictionary(Registry="Adobe", Ordering="Identity", Supplement=0),
+        FontDescriptor=pdf.make_indirect(descriptor),
+        W=widths
+    )
+    if truetype:
+        descendant.CIDToGIDMap = pikepdf.Name.Identity
+    
+    return pikepdf.Dictionary(
+        Type=pikepdf.Name.Font,
+        Subtype=pikepdf.Name.Type0,
+        BaseFont=base_font,
+        Encoding=pikepdf.Name("/Identity-H"),
+        DescendantFonts=[pdf.make_indirect(descendant)],
+        ToUnicode=pdf.make_stream(to_unicode_cmap(glyphs))
+    )
+
+
+def to_unicode_cmap(glyphs: Dict[int, str]) -> bytes:
+    """ToUnicode CMap mapping glyph IDs back to text, for copy and search"""
+    lines = [
+        "/CIDInit /ProcSet findresource begin",
+        "12 dict begin",
+        "begincmap",
+        "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def",
+        "/CMapName /Adobe-Identity-UCS def",
+        "/CMapType 2 def",
+        "1 begincodespacerange",
+        "<0000> <FFFF>",
+        "endcodespacerange",
+    ]
+    entries = sorted(glyphs.items())
+    for start in range(0, len(entries), 100):
+        chunk = entries[start:start + 100]
+        lines.append(f"{len(chunk)} beginbfchar")
+        for gid, char in chunk:
+            lines.append(f"<{gid:04X}> <{char.encode('utf-16-be').hex().upper()}>")
+        lines.append("endbfchar")
+    lines += ["endcmap", "CMapName currentdict /CMap defineresource pop", "end", "end"]
+    return "\n".join(lines).encode("ascii")
+
+
+class OverlayDocument:
+    """A background PDF that page overlays are added to as they are rendered.
+    
+    Fonts get a resource name when a page first uses them and are embedded
+    once, as one shared object subset to the glyphs drawn anywhere in the
+    document, when it is saved. The output is written to a temporary file
+    beside the target path and moved into place.
+    
+    Rendered overlays are not kept in memory until the save: every
+    ``spool_pages`` pages they are written to a spool PDF on disk and the
+    pages reference them there. qpdf copies foreign streams lazily, so their
+    data is only read back while the output is written.
+    """
+    
+    def __init__(self, background_path: str, spool_pages: Optional[int] = None):
+        self.pdf = pikepdf.Pdf.open(background_path)
+        self.font_names: Dict[Optional[str], str] = {}
+        self.pages = 0
+        self.spool_pages = max(1, spool_pages or settings.build_spool_pages)
+        self._font_refs: Dict[Optional[str], pikepdf.Object] = {}
+        self._used: Dict[Optional[str], Dict[int, str]] = {}
+        # Isolate the background's graphics state from the overlay
+        self._save_state = self.pdf.make_stream(b"q\n")
+        self._pending: List[Tuple[int, bytes]] = []
+        self._spools: List[pikepdf.Pdf] = []
+        self._spool_dir: Optional[str] = None
+    
+    def prepare(self, pages: Dict[int, List[OverlayText]]) -> List[PageOverlay]:
+        """Overlays ready to render for the given pages, with their fonts registered"""
+        overlays: List[PageOverlay] = []
+        for page_index in sorted(pages):
+            texts = pages[page_index]
+            if page_index >= len(self.pdf.pages) or not texts:
+                continue
+            for item in texts:
+                if item.font not in self.font_names:
+                    self.font_names[item.font] = f"/InkF{len(self.font_names)}"
+                    self._font_refs[item.font] = self.pdf.make_indirect(pikepdf.Dictionary())
+                    self._used[item.font] = {}
+            box = self.pdf.pages[page_index].cropbox
+            overlays.append((page_index, float(box[0]), float(box[3]), texts))
+        return overlays
+    
+    def apply(self, result: RenderResult):
+        """Add rendered overlays to their pages"""
+        rendered, glyphs = result
+        for path, page_glyphs in glyphs.items():
+            self._used[path].update(page_glyphs)
+        for page_index, content, fonts in rendered:
+            page = self.pdf.pages[page_index]
+            for path in fonts:
+                page.add_resource(self._font_refs[path], pikepdf.Name.Font, pikepdf.Name(self.font_names[path]))
+            page.contents_add(self._save_state, prepend=True)
+            self._pending.append((page_index, b"Q\n" + content))
+            self.pages += 1
+        if len(self._pending) >= self.spool_pages:
+            self._spool()
+    
+    def _spool(self):
+        """Move the pending overlays to a spool file and append them to their pages from there"""
+        if not self._pending:
+            return
+        if self._spool_dir is None:
+            self._spool_dir = tempfile.mkdtemp(prefix="overlays-")
+        
+        path = os.path.join(self._spool_dir, f"{len(self._spools)}.pdf")
+        with pikepdf.new() as spool:
+            spool.Root.InkOverlays = pikepdf.Array([spool.make_stream(content) for _, content in self._pending])
+            spool.save(path)
+        spool = pikepdf.open(path)
+        self._spools.append(spool)
+        
+        for (page_index, _), stream in zip(self._pending, spool.Root.InkOverlays):
+            self.pdf.pages[page_index].contents_add(self.pdf.copy_foreign(stream))
+        self._pending = []
+    
+    def save(self, output_path: str) -> Dict[str, Any]:
+        """Embed the fonts and write the document; returns counters for the job metrics"""
+        self._spool()
+        for path, ref in self._font_refs.items():
+            ref.update(embed_font(self.pdf, path, self._used[path]))
+        
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".part")
+        os.close(fd)
+        try:
+            self.pdf.save(tmp_path)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        return {
+            "output_pages": self.pages,
+            "output_fonts": len(self._font_refs),
+            "output_glyphs": sum(len(glyphs) for glyphs in self._used.values()),
+        }
+    
+    def close(self):
+        self.pdf.close()
+        for spool in self._spools:
+            spool.close()
+        self._spools = []
+        if self._spool_dir is not None:
+            shutil.rmtree(self._spool_dir, ignore_errors=True)
+            self._spool_dir = None
+
+
+def _build_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn rather than fork: jobs run alongside other threads in this process
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class PDFBuilder:
+    """Builds a job's translated PDF as its pages are translated.
+    
+    The worker calls ``start`` with the background, then ``add_pages`` for
+    each batch of translated pages, and ``finish`` to write the file.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self.document: Optional[OverlayDocument] = None
+        self.fit_stats = {"fit_shrunk_segments": 0, "fit_overflow_segments": 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    def fit_overlays(self, pages: Dict[int, List[OverlayText]]) -> Dict[str, int]:
+        """Fit every page's texts to their boxes and flag overflow on the segments.
+        
+        Segments that overflow get an "overflow" entry merged into their
+        ``qa_flags``, and segments that now fit lose a stale one, in one
+        batched UPDATE. It runs on a session of its own and commits there:
+        the builder's session is shared with the translate stage, whose
+        transaction may be half done. Returns counters for the job metrics.
+        """
+        flags: Dict[UUID, Optional[Dict[str, Any]]] = {}
+        shrunk = overflowed = 0
+        for texts in pages.values():
+            fit = fit_page(texts)
+            shrunk += int((fit.scale < 1.0).sum())
+            overflowed += int(fit.overflow.sum())
+            for i, item in enumerate(texts):
+                if item.segment_id is not None:
+                    flags[item.segment_id] = (
+                        overflow_flag(fit, i, item.bbox[3] - item.bbox[1]) if fit.overflow[i] else None
+                    )
+        
+        if flags and self.db is not None:
+            with SessionLocal() as session:
+                write_overflow_flags(session, flags)
+                session.commit()
+        
+        return {
+            "fit_shrunk_segments": shrunk,
+            "fit_overflow_segments": overflowed,
+        }
+    
+    def overlays_for_page(self, page, texts: List[str], segment_ids: List[UUID]) -> List[OverlayText]:
+        """Overlay texts for an extracted page's blocks, drawn with their translations"""
+        fonts = get_font_service()
+        return [
+            OverlayText(
+                text=text,
+                bbox=block.bbox,
+                font_size=block.font_size or 10.0,
+                color=max(block.style_runs, key=lambda run: run.end - run.start).color if block.style_runs else 0,
+                font=fonts.resolve(block.font_name, block.font_flags or 0),
+                segment_id=segment_id
+            )
+            for block, text, segment_id in zip(page.text_blocks, texts, segment_ids)
+        ]
+    
+    def start(self, background_path: str, workers: Optional[int] = None):
+        """Open the background for pages to be added incrementally"""
+        self.document = OverlayDocument(background_path)
+        workers = max(1, workers or settings.build_workers)
+        if workers > 1:
+            self._pool = _build_pool(workers)
+    
+    async def add_pages(self, pages: Dict[int, List[OverlayText]]):
+        """Fit, render and add a batch of pages.
+        
+        Rendering runs in the build process pool, or a thread without one,
+        so the event loop stays free for the other stages of the job.
+        """
+        for key, value in self.fit_overlays(pages).items():
+            self.fit_stats[key] += value
+        overlays = self.document.prepare(pages)
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._pool, render_page_range, overlays, dict(self.document.font_names)
+        )
+        self.document.apply(result)
+    
+    async def finish(self, output_path: str) -> Dict[str, Any]:
+        """Write the incrementally built PDF; returns counters for the job metrics"""
+        try:
+            stats = await asyncio.to_thread(self.document.save, output_path)
+        finally:
+            self.close()
+        return {**stats, **self.fit_stats}
+    
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self.document is not None:
+            self.document.close()
+            self.document = None
@@ -2,15 +2,53 @@
 PDF processing service for text extraction and layout analysis
 """
 import os
+import asyncio
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import fitz  # PyMuPDF
+import numpy as np
 import pikepdf
-from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator, Iterator
+from dataclasses import dataclass, field
+from uuid import UUID
 from sqlalchemy.orm import Session
 
+from ..core.config import settings
 from ..models.job import Job, JobStatus
-from ..models.segment import Segment
+from .background import remove_text, remove_text_async
+from .cancellation import CancellationToken
+from .checkpoints import CheckpointStore
+from .document_cache import DocumentCache
 from .job_service import JobService
+from .layout import analyze_spans
+from .progress_reporter import ProgressReporter
+from .segment_store import SegmentWriter
+
+
+@dataclass
+class StyleRun:
+    """A stretch of a text block's text set in one style on one line"""
+    start: int  # offsets into TextBlock.text
+    end: int
+    font_name: str
+    font_size: float
+    font_flags: int
+    color: int  # sRGB as 0xRRGGBB
+    bbox: Tuple[float, float, float, float]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "start": self.start,
+            "end": self.end,
+            "font": self.font_name,
+            "size": self.font_size,
+            "flags": self.font_flags,
+            "color": self.color,
+            "bbox": list(self.bbox),
+        }
 
 
 @dataclass
@@ -23,151 +61,476 @@ class TextBlock:
     font_flags: int
     page_number: int
     block_number: int
+    style_runs: List[StyleRun] = field(default_factory=list)
 
 
 @dataclass
 class ProcessedPage:
-    """Represents a processed page with text blocks and background"""
+    """Represents a processed page with text blocks and dimensions"""
     page_number: int
     text_blocks: List[TextBlock]
-    background_content: Optional[bytes] = None
     width: float = 0
     height: float = 0
 
 
+def extract_text_blocks(page: fitz.Page, page_number: int) -> List[TextBlock]:
+    """Extract the text blocks of a fitz page.
+    
+    Spans are merged into paragraphs by layout analysis, keeping each span's
+    style as a run; with aggregation disabled every span is its own block.
+    """
+    spans = []
+    
+    # Get text as dictionary with detailed formatting information
+    text_dict = page.get_text("dict")
+    for block in text_dict["blocks"]:
+        for line in block.get("lines", ()):  # Text blocks only
+            for span in line["spans"]:
+                if span["text"].strip():  # Only non-empty text
+                    spans.append(span)
+    
+    if not spans:
+        return []
+    
+    if not settings.layout_aggregation_enabled:
+        return [
+            _build_text_block(spans, [np.array([i])], None, page_number, i)
+            for i in range(len(spans))
+        ]
+    
+    fonts: Dict[str, int] = {}
+    bboxes = np.array([span["bbox"] for span in spans], dtype=np.float64)
+    layout = analyze_spans(
+        bboxes[:, 0], bboxes[:, 1], bboxes[:, 2], bboxes[:, 3],
+        baseline=np.array([span["origin"][1] for span in spans], dtype=np.float64),
+        size=np.array([span["size"] for span in spans], dtype=np.float64),
+        font=np.array([fonts.setdefault(span["font"], len(fonts)) for span in spans]),
+        chars=np.array([len(span["text"]) for span in spans])
+    )
+    return [
+        _build_text_block(spans, lines, layout.space_before, page_number, block_number)
+        for block_number, lines in enumerate(layout.blocks)
+    ]
+
+
+def _build_text_block(
+    spans: List[Dict[str, Any]],
+    lines: List[np.ndarray],
+    space_before: Optional[np.ndarray],
+    page_number: int,
+    block_number: int
+) -> TextBlock:
+    """Join grouped spans into one block, recording a style run per span"""
+    parts: List[str] = []
+    runs: List[StyleRun] = []
+    length = 0
+    
+    for line_number, line in enumerate(lines):
+        for position, index in enumerate(line):
+            span = spans[index]
+            text = span["text"]
+            starts_line = position == 0
+            if parts and not parts[-1][-1:].isspace() and not text[:1].isspace() and (
+                (starts_line and line_number > 0) or (space_before is not None and space_before[index])
+            ):
+                parts.append(" ")
+                length += 1
+            
+            style = (span["font"], span["size"], span["flags"], span["color"])
+            previous = runs[-1] if runs and not starts_line else None
+            if previous is not None and (
+                previous.font_name, previous.font_size, previous.font_flags, previous.color
+            ) == style:
+                # Same style further along the line: extend the run
+                previous.end = length + len(text)
+                previous.bbox = _union(previous.bbox, span["bbox"])
+            else:
+                runs.append(StyleRun(
+                    start=length,
+                    end=length + len(text),
+                    font_name=span["font"],
+                    font_size=span["size"],
+                    font_flags=span["flags"],
+                    color=span["color"],
+                    bbox=tuple(span["bbox"])
+                ))
+            parts.append(text)
+            length += len(text)
+    
+    # Trim surrounding whitespace, shifting the runs to match
+    text = "".join(parts)
+    lead = len(text) - len(text.lstrip())
+    text = text.strip()
+    for run in runs:
+        run.start = min(max(run.start - lead, 0), len(text))
+        run.end = min(max(run.end - lead, 0), len(text))
+    
+    bbox = runs[0].bbox
+    for run in runs[1:]:
+        bbox = _union(bbox, run.bbox)
+    
+    # The block takes the style covering most of its text
+    dominant = max(runs, key=lambda run: run.end - run.start)
+    return TextBlock(
+        text=text,
+        bbox=bbox,
+        font_name=dominant.font_name,
+        font_size=dominant.font_size,
+        font_flags=dominant.font_flags,
+        page_number=page_number,
+        block_number=block_number,
+        style_runs=runs
+    )
+
+
+def _union(a: Tuple[float, ...], b: Tuple[float, ...]) -> Tuple[float, float, float, float]:
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+def extract_page(page: fitz.Page, page_number: int) -> ProcessedPage:
+    """Extract one fitz page"""
+    rect = page.rect
+    return ProcessedPage(
+        page_number=page_number,
+        text_blocks=extract_text_blocks(page, page_number),
+        width=rect.width,
+        height=rect.height
+    )
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[ProcessedPage]:
+    """Extract pages [start, stop) of a PDF.
+    
+    Runs inside extraction worker processes, so it opens its own fitz
+    document rather than sharing one across process boundaries.
+    """
+    with fitz.open(file_path) as doc:
+        return [extract_page(doc[page_num], page_num) for page_num in range(start, stop)]
+
+
+# Bump when the artifact layout or extraction output changes
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def extraction_pool(workers: int) -> ProcessPoolExecutor:
+    """Return this process's extraction pool, starting it on first use.
+    
+    Spawning interpreters that import PyMuPDF costs more than extracting a
+    mid-sized document, so the pool is shared by every job the process runs
+    and only replaced when the worker count changes or a worker has died.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                # Ranges already submitted by other jobs still run to completion
+                _pool.shutdown(wait=False)
+            # spawn rather than fork: jobs run alongside other threads in this process
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def discard_extraction_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next job starts a fresh one"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is pool:
+            _pool, _pool_workers = None, 0
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+ARTIFACT_VERSION = 3
+
+
+def page_to_record(page: ProcessedPage) -> Dict[str, Any]:
+    """Encode a processed page as one compact, JSON-serializable artifact record.
+    
+    The extraction artifact is a header record, {"version", "pages"},
+    followed by one record per page so it can be written and read as the
+    pages stream. Font names are interned into a per-page table and each
+    block is stored as a flat list: [text, x0, y0, x1, y1, font_index,
+    font_size, font_flags, runs], with each style run as [start, end,
+    font_index, font_size, font_flags, color, x0, y0, x1, y1].
+    """
+    fonts: Dict[str, int] = {}
+    blocks = []
+    for block in page.text_blocks:
+        font_index = fonts.setdefault(block.font_name, len(fonts))
+        runs = [
+            [run.start, run.end, fonts.setdefault(run.font_name, len(fonts)),
+             run.font_size, run.font_flags, run.color, *run.bbox]
+            for run in block.style_runs
+        ]
+        blocks.append([block.text, *block.bbox, font_index, block.font_size, block.font_flags, runs])
+    return {
+        "n": page.page_number,
+        "w": page.width,
+        "h": page.height,
+        "fonts": list(fonts),
+        "blocks": blocks,
+    }
+
+
+def page_from_record(record: Dict[str, Any]) -> ProcessedPage:
+    """Decode a page record written by page_to_record"""
+    fonts = record["fonts"]
+    page_number = record["n"]
+    return ProcessedPage(
+        page_number=page_number,
+        text_blocks=[
+            TextBlock(
+                text=text,
+                bbox=(x0, y0, x1, y1),
+                font_name=fonts[font_index],
+                font_size=font_size,
+                font_flags=font_flags,
+                page_number=page_number,
+                block_number=block_number,
+                style_runs=[
+                    StyleRun(
+                        start=start,
+                        end=end,
+                        font_name=fonts[run_font],
+                        font_size=run_size,
+                        font_flags=run_flags,
+                        color=color,
+                        bbox=tuple(run_bbox)
+                    )
+                    for start, end, run_font, run_size, run_flags, color, *run_bbox in runs
+                ]
+            )
+            for block_number, (text, x0, y0, x1, y1, font_index, font_size, font_flags, runs)
+            in enumerate(record["blocks"])
+        ],
+        width=record["w"],
+        height=record["h"]
+    )
+
+
 class PDFProcessor:
     """Main PDF processing service"""
     
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        progress: Optional[ProgressReporter] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ):
         self.db = db
         self.job_service = JobService(db)
+        self.progress = progress
+        self.cancel_token = cancel_token
+        self.segment_writer: Optional[SegmentWriter] = None
+        self.document_cache = DocumentCache() if settings.document_cache_enabled else None
+        self.background_path: Optional[str] = None
+        self.total_pages: Optional[int] = None
     
-    async def process_pdf(self, job: Job, file_path: str) -> List[ProcessedPage]:
-        """Process a PDF file and extract text with layout information"""
+    async def iter_document(
+        self,
+        job: Job,
+        file_path: str,
+        content_hash: str,
+        checkpoints: Optional[CheckpointStore] = None
+    ) -> AsyncIterator[Tuple[ProcessedPage, Optional[List[UUID]]]]:
+        """Yield each page in order with the IDs of its new segments.
+        
+        Pages come from the cached extraction of the same bytes when there is
+        one; otherwise they are extracted and the cache artifact is written
+        alongside, published only once the last page is in. Segment rows are
+        queued on ``segment_writer``, which may still buffer a page's rows
+        after it is yielded; flush it before relying on them. Pages whose
+        segments ``checkpoints`` already has stored are yielded with None
+        instead of IDs and get no new rows. Nothing is committed.
+        """
+        if self.progress is None:
+            self.progress = ProgressReporter(self.job_service, job)
+        progress = self.progress
         
         # Update job status
-        await self.job_service.update_job_status(
-            job, 
+        await progress.report(
             JobStatus.EXTRACTING,
             progress_percent=10.0,
             current_stage="Analyzing PDF structure"
         )
         
-        # Open PDF document
-        doc = fitz.open(file_path)
-        total_pages = len(doc)
+        # Reuse a previous extraction of the same bytes when we have one
+        records = self._open_cached_records(content_hash)
+        
+        doc = None
+        artifact = None
+        if records is not None:
+            total_pages = next(records)["pages"]
+            page_source = self._iter_cached_pages(records)
+        else:
+            # Open PDF document
+            doc = fitz.open(file_path)
+            total_pages = len(doc)
+            page_source = self.iter_pages(file_path, total_pages, doc=doc)
+            if self.document_cache is not None:
+                artifact = self.document_cache.open_records(content_hash)
+                artifact.write({"version": ARTIFACT_VERSION, "pages": total_pages})
+        self.total_pages = total_pages
         
         # Update job with total pages
-        await self.job_service.update_job_status(
-            job,
+        await progress.report(
             JobStatus.EXTRACTING,
             progress_percent=20.0,
             total_pages=total_pages,
-            current_stage="Extracting text from pages"
+            current_stage="Extracting text from pages" if records is None
+            else "Loading cached extraction"
         )
         
-        processed_pages = []
-        
-        for page_num in range(total_pages):
-            # Update progress
-            progress = 20.0 + (page_num / total_pages) * 50.0
-            await self.job_service.update_job_status(
-                job,
-                JobStatus.EXTRACTING,
-                progress_percent=progress,
-                current_page=page_num + 1,
-                current_stage=f"Processing page {page_num + 1}"
-            )
-            
-            # Process individual page
-            page = doc[page_num]
-            processed_page = await self._process_page(page, page_num)
-            processed_pages.append(processed_page)
-            
-            # Save segments to database
-            await self._save_page_segments(job, processed_page)
+        self.segment_writer = SegmentWriter(self.db)
+        completed = False
         
-        doc.close()
+        try:
+            async for processed_page in page_source:
+                if self.cancel_token is not None:
+                    self.cancel_token.raise_if_cancelled()
+                
+                if artifact is not None:
+                    artifact.write(page_to_record(processed_page))
+                
+                if checkpoints is not None and checkpoints.is_stored(
+                    processed_page.page_number, len(processed_page.text_blocks)
+                ):
+                    yield processed_page, None
+                    continue
+                
+                # Queue segments for the database
+                yield processed_page, self.segment_writer.add_page(job.id, processed_page)
+            completed = True
+        finally:
+            # Shut down extraction workers promptly if we stop early
+            await page_source.aclose()
+            if doc is not None:
+                doc.close()
+            if records is not None:
+                records.close()
+            if artifact is not None:
+                if completed:
+                    artifact.commit()
+                else:
+                    artifact.abort()
+    
+    def _open_cached_records(self, content_hash: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """Artifact records positioned at the header, or None unless a current artifact is cached"""
+        if self.document_cache is None:
+            return None
+        records = self.document_cache.iter_records(content_hash)
+        if records is None:
+            return None
+        try:
+            header = next(records, None)
+        except (OSError, ValueError):
+            header = None
+        if header is None or header.get("version") != ARTIFACT_VERSION:
+            records.close()
+            return None
         
-        # Update job status
-        await self.job_service.update_job_status(
-            job,
-            JobStatus.EXTRACTING,
-            progress_percent=70.0,
-            current_stage="Text extraction completed"
-        )
+        def resume():
+            yield header
+            yield from records
         
-        return processed_pages
+        return resume()
     
-    async def _process_page(self, page: fitz.Page, page_number: int) -> ProcessedPage:
-        """Process a single page and extract text blocks"""
-        
-        # Get page dimensions
-        rect = page.rect
-        width, height = rect.width, rect.height
+    async def _iter_cached_pages(self, records: Iterator[Dict[str, Any]]) -> AsyncIterator[ProcessedPage]:
+        for record in records:
+            yield page_from_record(record)
+    
+    async def iter_pages(
+        self,
+        file_path: str,
+        total_pages: int,
+        doc: Optional[fitz.Document] = None,
+        workers: Optional[int] = None
+    ) -> AsyncIterator[ProcessedPage]:
+        """Yield processed pages in page order.
         
-        # Extract text blocks with detailed information
-        text_blocks = []
+        With more than one extraction worker, documents of at least
+        ``extraction_parallel_min_pages`` pages are sharded by page range across
+        the process's extraction pool and results are streamed back in order
+        while at most ``2 * workers`` ranges are in flight. Shorter documents and
+        single-worker configurations are extracted in process.
+        """
+        workers = settings.extraction_workers if workers is None else workers
+        chunk_pages = max(1, settings.extraction_chunk_pages)
         
-        # Get text as dictionary with detailed formatting information
-        text_dict = page.get_text("dict")
+        if workers <= 1 or total_pages < max(chunk_pages + 1, settings.extraction_parallel_min_pages):
+            owns_doc = doc is None
+            if owns_doc:
+                doc = fitz.open(file_path)
+            try:
+                for page_num in range(total_pages):
+                    yield await self._process_page(doc[page_num], page_num)
+            finally:
+                if owns_doc:
+                    doc.close()
+            return
         
-        block_number = 0
-        for block in text_dict["blocks"]:
-            if "lines" in block:  # Text block
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        if span["text"].strip():  # Only non-empty text
-                            text_block = TextBlock(
-                                text=span["text"],
-                                bbox=(span["bbox"][0], span["bbox"][1], span["bbox"][2], span["bbox"][3]),
-                                font_name=span["font"],
-                                font_size=span["size"],
-                                font_flags=span["flags"],
-                                page_number=page_number,
-                                block_number=block_number
-                            )
-                            text_blocks.append(text_block)
-                            block_number += 1
+        ranges = iter([
+            (start, min(start + chunk_pages, total_pages))
+            for start in range(0, total_pages, chunk_pages)
+        ])
+        loop = asyncio.get_running_loop()
+        pool = extraction_pool(workers)
         
-        # Create background-only version (we'll implement this next)
-        background_content = await self._create_background_only(page)
+        def submit(page_range):
+            return loop.run_in_executor(pool, extract_page_range, file_path, *page_range)
         
-        return ProcessedPage(
-            page_number=page_number,
-            text_blocks=text_blocks,
-            background_content=background_content,
-            width=width,
-            height=height
-        )
+        in_flight = deque()
+        try:
+            in_flight.extend(submit(r) for _, r in zip(range(workers * 2), ranges))
+            while in_flight:
+                pages = await in_flight.popleft()
+                next_range = next(ranges, None)
+                if next_range is not None:
+                    in_flight.append(submit(next_range))
+                for processed_page in pages:
+                    yield processed_page
+        except BrokenProcessPool:
+            discard_extraction_pool(pool)
+            raise
+        finally:
+            # The pool outlives this job; only give up this job's queued ranges
+            for future in in_flight:
+                future.cancel()
     
-    async def _create_background_only(self, page: fitz.Page) -> Optional[bytes]:
-        """Create a page with text removed (placeholder implementation)"""
-        # For now, return None - we'll implement this with pikepdf later
-        # This is where we'll use pikepdf to strip text operators
-        return None
+    async def _process_page(self, page: fitz.Page, page_number: int) -> ProcessedPage:
+        """Process a single page off the event loop, so other stages of the job keep running"""
+        return await asyncio.to_thread(extract_page, page, page_number)
     
-    async def _save_page_segments(self, job: Job, page: ProcessedPage):
-        """Save text segments to database"""
+    async def create_background(self, job: Job, file_path: str, content_hash: str) -> str:
+        """Write the document with its text removed, reusing a cached copy.
         
-        for i, text_block in enumerate(page.text_blocks):
-            segment = Segment(
-                job_id=job.id,
-                page_number=page.page_number,
-                segment_index=i,
-                bbox_x0=text_block.bbox[0],
-                bbox_y0=text_block.bbox[1],
-                bbox_x1=text_block.bbox[2],
-                bbox_y1=text_block.bbox[3],
-                source_text=text_block.text,
-                font_name=text_block.font_name,
-                font_size=text_block.font_size,
-                font_flags=text_block.font_flags
-            )
-            
-            self.db.add(segment)
+        The background depends only on the source bytes, so it is cached by
+        content hash next to the extraction artifact.
+        """
+        if self.document_cache is None:
+            output_path = os.path.join(settings.upload_dir, f"{job.id}_background.pdf")
+            stats = await remove_text_async(file_path, output_path)
+            await self.job_service.record_metrics(job, **stats)
+            return output_path
+        
+        cached = self.document_cache.get_file(content_hash, ".background.pdf")
+        if cached is not None:
+            return cached
         
-        self.db.commit()
+        stats = {}
+        path = await asyncio.to_thread(
+            self.document_cache.put_file,
+            content_hash,
+            ".background.pdf",
+            lambda tmp_path: stats.update(remove_text(file_path, tmp_path))
+        )
+        await self.job_service.record_metrics(job, **stats)
+        return path
     
     def detect_document_type(self, file_path: str) -> Dict[str, Any]:
         """Detect if document is digital or scanned"""
@@ -207,59 +570,3 @@ class PDFProcessor:
             "image_pages": image_pages,
             "confidence": text_pages / max(1, min(5, total_pages))
         }
-
-
-class BackgroundCloner:
-    """Service for creating background-only PDF pages"""
-    
-    @staticmethod
-    def remove_text_from_pdf(input_path: str, output_path: str) -> bool:
-        """Remove text operators from PDF while preserving everything else"""
-        
-        try:
-            with pikepdf.Pdf.open(input_path) as pdf:
-                for page in pdf.pages:
-                    # Define text operator filter
-                    def text_filter(operands, operator):
-                        # Remove text show operators
-                        text_operators = [
-                            pikepdf.Name.Tj,      # Show text
-                            pikepdf.Name.TJ,      # Show text with glyph positioning
-                            pikepdf.Name.quote,   # Move to next line and show text
-                            pikepdf.Name.dquote  # Set word and character spacing, move to next line, show text
-                        ]
-                        return operator not in text_operators
-                    
-                    # Apply filter to page content
-                    if hasattr(page, 'add_content_token_filter'):
-                        page.add_content_token_filter(text_filter)
-                
-                # Save the result
-                pdf.save(output_path)
-                return True
-                
-        except Exception as e:
-            print(f"Error removing text from PDF: {e}")
-            return False
-
-
-class MockTranslationService:
-    """Mock translation service for testing (replace with real service later)"""
-    
-    @staticmethod
-    async def translate_text(text: str, source_lang: str, target_lang: str) -> str:
-        """Mock translation - just adds [TRANSLATED] prefix"""
-        if not text.strip():
-            return text
-        
-        # Simple mock translation
-        return f"[{target_lang.upper()}] {text}"
-    
-    @staticmethod
-    async def translate_segments(segments: List[str], source_lang: str, target_lang: str) -> List[str]:
-        """Translate multiple text segments"""
-        translations = []
-        for segment in segments:
-            translation = await MockTranslationService.translate_text(segment, source_lang, target_lang)
-            translations.append(translation)
-        return translations
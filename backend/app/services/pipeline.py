@@ -0,0 +1,126 @@
+"""
+Bounded streaming pipeline for running the stages of a job concurrently
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from ..core.config import settings
+
+
+_DONE = object()
+
+
+class StageError(Exception):
+    """A pipeline stage failed; ``stage`` names it and ``error`` is the cause"""
+    
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"{stage} stage failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+@dataclass
+class Stage:
+    """One step of a pipeline.
+    
+    ``process`` receives a batch of items from the previous stage and returns
+    the items to pass on. Items already waiting are drained into the same
+    batch, up to ``max_batch``, so a stage that falls behind catches up with
+    fewer, larger calls.
+    """
+    name: str
+    process: Callable[[List[Any]], Awaitable[List[Any]]]
+    max_batch: int = 1
+    busy: float = 0.0  # seconds spent in process
+    items: int = 0
+
+
+class Pipeline:
+    """Streams items from a source through stages connected by bounded queues.
+    
+    Each stage runs as its own task, so while one page is being built the
+    next is translated and the one after extracted. A full queue blocks the
+    stage feeding it, which bounds the items in flight (and so memory) by
+    the queue sizes and batch limits, whatever the length of the source.
+    The first failure cancels every stage and is raised as a StageError.
+    """
+    
+    def __init__(self, source_name: str, stages: List[Stage], queue_size: Optional[int] = None):
+        self.source_name = source_name
+        self.stages = stages
+        self.queue_size = max(1, queue_size or settings.pipeline_queue_pages)
+        self.source_busy = 0.0
+        self.wall = 0.0
+    
+    async def run(self, source: AsyncIterator[Any]):
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        
+        async def feed():
+            try:
+                while True:
+                    started = time.perf_counter()
+                    try:
+                        item = await source.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    except Exception as e:
+                        raise StageError(self.source_name, e) from e
+                    finally:
+                        self.source_busy += time.perf_counter() - started
+                    await queues[0].put(item)
+                await queues[0].put(_DONE)
+            finally:
+                if hasattr(source, "aclose"):
+                    await source.aclose()
+        
+        async def work(stage: Stage, inbox: asyncio.Queue, outbox: Optional[asyncio.Queue]):
+            done = False
+            while not done:
+                batch = [await inbox.get()]
+                while len(batch) < stage.max_batch and not inbox.empty():
+                    batch.append(inbox.get_nowait())
+                if batch[-1] is _DONE:
+                    batch.pop()
+                    done = True
+                if not batch:
+                    continue
+                
+                started = time.perf_counter()
+                try:
+                    results = await stage.process(batch)
+                except Exception as e:
+                    raise StageError(stage.name, e) from e
+                finally:
+                    stage.busy += time.perf_counter() - started
+                stage.items += len(batch)
+                
+                if outbox is not None:
+                    for result in results:
+                        await outbox.put(result)
+            if outbox is not None:
+                await outbox.put(_DONE)
+        
+        tasks = [asyncio.ensure_future(feed())] + [
+            asyncio.ensure_future(work(stage, queues[i], queues[i + 1] if i + 1 < len(queues) else None))
+            for i, stage in enumerate(self.stages)
+        ]
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            self.wall = time.perf_counter() - started
+    
+    def metrics(self) -> Dict[str, float]:
+        """Wall time per stage and for the whole run, in milliseconds"""
+        metrics = {f"stage_{self.source_name}_ms": round(self.source_busy * 1000, 1)}
+        for stage in self.stages:
+            metrics[f"stage_{stage.name}_ms"] = round(stage.busy * 1000, 1)
+        metrics["pipeline_ms"] = round(self.wall * 1000, 1)
+        return metrics
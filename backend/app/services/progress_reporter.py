@@ -0,0 +1,141 @@
+"""
+Coalescing progress writer for long-running jobs
+"""
+import time
+from typing import Optional, Dict, Any
+
+from ..core.config import settings
+from ..models.job import Job, JobStatus
+from .cancellation import CancellationToken, JobCancelled, LeaseLost
+from .job_events import job_event, job_event_broker
+from .job_service import JobService
+
+
+# Statuses that end a job and must never sit in the buffer
+TERMINAL_STATUSES = {JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED}
+
+
+class ProgressReporter:
+    """Buffers job progress updates and writes them at a bounded rate.
+    
+    Progress, stage and page updates are merged in memory and flushed through
+    ``JobService.update_job_status`` at most every ``min_interval_ms`` or once
+    progress has moved by ``min_delta_percent``. Status changes, terminal
+    statuses and errors are flushed immediately. Every write is conditional on
+    the job not being CANCELLED and raises JobCancelled otherwise, so a cancel
+    committed by another process between cancellation polls is never written
+    over. With a cancellation token, non-terminal updates are also dropped
+    once the token has seen the cancel.
+    
+    Job event subscribers hear about updates sooner: the merged state is
+    published on every flush and, between flushes, at most every
+    ``job_events_interval_ms``, without reading the job back.
+    """
+    
+    def __init__(
+        self,
+        job_service: JobService,
+        job: Job,
+        min_interval_ms: Optional[int] = None,
+        min_delta_percent: Optional[float] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        self.job_service = job_service
+        self.job = job
+        self.cancel_token = cancel_token
+        self.min_interval = (
+            settings.progress_flush_interval_ms if min_interval_ms is None else min_interval_ms
+        ) / 1000.0
+        self.min_delta_percent = (
+            settings.progress_flush_min_delta if min_delta_percent is None else min_delta_percent
+        )
+        
+        self.flush_count = 0
+        self._pending: Dict[str, Any] = {}
+        self._pending_status: Optional[JobStatus] = None
+        self._flushed_status = job.status
+        self._flushed_progress = job.progress_percent or 0.0
+        self._flushed_at = 0.0
+        
+        self.job_id = job.id
+        self.publish_interval = settings.job_events_interval_ms / 1000.0
+        self._event = job_event(job)
+        self._published_at = 0.0
+    
+    async def report(
+        self,
+        status: JobStatus,
+        progress_percent: Optional[float] = None,
+        current_stage: Optional[str] = None,
+        current_page: Optional[int] = None,
+        total_pages: Optional[int] = None,
+        error_message: Optional[str] = None,
+        download_url: Optional[str] = None
+    ) -> Job:
+        """Record a progress update, writing it if it is due"""
+        self._pending_status = status
+        updates = {
+            "progress_percent": progress_percent,
+            "current_stage": current_stage,
+            "current_page": current_page,
+            "total_pages": total_pages,
+            "error_message": error_message,
+            "download_url": download_url,
+        }
+        updates = {key: value for key, value in updates.items() if value is not None}
+        self._pending.update(updates)
+        self._event.update(updates, status=status)
+        
+        if self._is_due(status, error_message, download_url, total_pages):
+            await self.flush()
+        elif time.monotonic() - self._published_at >= self.publish_interval:
+            if self.cancel_token is None or not self.cancel_token.is_cancelled():
+                self._publish()
+        
+        return self.job
+    
+    async def flush(self, refresh: bool = False) -> Job:
+        """Write any buffered update"""
+        if self._pending_status is None:
+            return self.job
+        
+        status, updates = self._pending_status, self._pending
+        self._pending_status, self._pending = None, {}
+        
+        if self.cancel_token is not None and self.cancel_token.lease_lost():
+            # Another worker runs the job now, and reports on it
+            raise LeaseLost(self.job_id)
+        if status not in TERMINAL_STATUSES and self.cancel_token is not None and self.cancel_token.is_cancelled():
+            return self.job
+        
+        try:
+            await self.job_service.update_job_status(
+                self.job, status, refresh=refresh, publish=False, unless_cancelled=True, **updates
+            )
+        except JobCancelled:
+            if self.cancel_token is not None:
+                self.cancel_token.cancelled = True
+            raise
+        self._publish()
+        
+        self.flush_count += 1
+        self._flushed_status = status
+        self._flushed_progress = self.job.progress_percent or 0.0
+        self._flushed_at = time.monotonic()
+        return self.job
+    
+    def _publish(self):
+        job_event_broker.publish(self.job_id, dict(self._event))
+        self._published_at = time.monotonic()
+    
+    def _is_due(self, status, error_message, download_url, total_pages) -> bool:
+        if status != self._flushed_status or status in TERMINAL_STATUSES:
+            return True
+        if error_message is not None or download_url is not None or total_pages is not None:
+            return True
+        
+        progress = self._pending.get("progress_percent")
+        if progress is not None and abs(progress - self._flushed_progress) >= self.min_delta_percent:
+            return True
+        
+        return time.monotonic() - self._flushed_at >= self.min_interval
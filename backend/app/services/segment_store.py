@@ -0,0 +1,241 @@
+"""
+Bulk persistence for extracted text segments
+"""
+import csv
+import io
+import json
+import uuid
+from typing import List, Dict, Any, Optional
+from uuid import UUID
+
+from sqlalchemy import bindparam, insert, select, text, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.segment import Segment
+from .segment_translator import SegmentTranslation
+
+
+# Column order shared by the executemany and COPY paths
+SEGMENT_COLUMNS = [
+    "id", "job_id", "page_number", "segment_index",
+    "bbox_x0", "bbox_y0", "bbox_x1", "bbox_y1",
+    "source_text", "font_name", "font_size", "font_flags", "style_runs", "qa_flags",
+]
+
+JSON_COLUMNS = {"style_runs", "qa_flags"}
+
+UPDATE_FROM_ARRAYS = text(f"""
+    UPDATE {Segment.__tablename__} AS s
+    SET translated_text = v.translated_text,
+        translation_method = v.translation_method,
+        confidence_score = v.confidence_score,
+        tm_match_score = v.tm_match_score
+    FROM unnest(
+        CAST(:ids AS uuid[]),
+        CAST(:texts AS text[]),
+        CAST(:methods AS varchar[]),
+        CAST(:confidence AS double precision[]),
+        CAST(:tm_scores AS double precision[])
+    ) AS v(id, translated_text, translation_method, confidence_score, tm_match_score)
+    WHERE s.id = v.id
+""")
+
+# Replaces a segment's "overflow" QA flag with v.flag (none when v.flag is
+# NULL), keeping its other flags; rows with nothing to change are skipped
+OVERFLOW_FLAGS_FROM_ARRAYS = text(f"""
+    UPDATE {Segment.__tablename__} AS s
+    SET qa_flags = CAST(
+        COALESCE((
+            SELECT jsonb_agg(existing.value ORDER BY existing.position)
+            FROM jsonb_array_elements(CAST(s.qa_flags AS jsonb)) WITH ORDINALITY AS existing(value, position)
+            WHERE existing.value ->> 'type' IS DISTINCT FROM 'overflow'
+        ), CAST('[]' AS jsonb))
+        || CASE WHEN v.flag IS NULL THEN CAST('[]' AS jsonb) ELSE jsonb_build_array(CAST(v.flag AS jsonb)) END
+    AS json)
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:flags AS text[])) AS v(id, flag)
+    WHERE s.id = v.id
+      AND jsonb_typeof(CAST(s.qa_flags AS jsonb)) = 'array'
+      AND (v.flag IS NOT NULL OR CAST(s.qa_flags AS jsonb) @> jsonb_build_array(jsonb_build_object('type', 'overflow')))
+""")
+
+
+class SegmentWriter:
+    """Buffers segment rows and writes them in large batches.
+    
+    Rows are written with one multi-row INSERT per batch, or with
+    ``COPY ... FROM STDIN`` when the session is bound to PostgreSQL through
+    psycopg2. The writer never commits; the caller owns the transaction.
+    """
+    
+    def __init__(self, db: Session, batch_size: Optional[int] = None, use_copy: Optional[bool] = None):
+        self.db = db
+        self.batch_size = max(1, batch_size or settings.segment_batch_size)
+        
+        if use_copy is None:
+            use_copy = settings.segment_copy_enabled
+        dialect = db.get_bind().dialect
+        self.use_copy = use_copy and dialect.name == "postgresql" and dialect.driver == "psycopg2"
+        
+        self.rows_written = 0
+        self._buffer: List[Dict[str, Any]] = []
+    
+    def add_page(self, job_id: UUID, page) -> List[UUID]:
+        """Queue the text blocks of a processed page, returning the new segment IDs"""
+        ids = []
+        for i, text_block in enumerate(page.text_blocks):
+            segment_id = uuid.uuid4()
+            ids.append(segment_id)
+            self._buffer.append({
+                "id": segment_id,
+                "job_id": job_id,
+                "page_number": page.page_number,
+                "segment_index": i,
+                "bbox_x0": text_block.bbox[0],
+                "bbox_y0": text_block.bbox[1],
+                "bbox_x1": text_block.bbox[2],
+                "bbox_y1": text_block.bbox[3],
+                "source_text": text_block.text,
+                "font_name": text_block.font_name,
+                "font_size": text_block.font_size,
+                "font_flags": text_block.font_flags,
+                "style_runs": [run.to_dict() for run in text_block.style_runs],
+                "qa_flags": [],
+            })
+        
+        while len(self._buffer) >= self.batch_size:
+            self._write(self._buffer[:self.batch_size])
+            del self._buffer[:self.batch_size]
+        
+        return ids
+    
+    def flush(self):
+        """Write any buffered rows"""
+        if self._buffer:
+            self._write(self._buffer)
+            self._buffer = []
+    
+    def _write(self, rows: List[Dict[str, Any]]):
+        if self.use_copy:
+            self._copy(rows)
+        else:
+            self.db.execute(insert(Segment), rows)
+        self.rows_written += len(rows)
+    
+    def _copy(self, rows: List[Dict[str, Any]]):
+        """Stream rows through PostgreSQL COPY in CSV format"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                json.dumps(row[column]) if column in JSON_COLUMNS
+                else ("" if row[column] is None else row[column])
+                for column in SEGMENT_COLUMNS
+            ])
+        buffer.seek(0)
+        
+        # Run on the session's connection so COPY joins the open transaction
+        cursor = self.db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {Segment.__tablename__} ({', '.join(SEGMENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+
+class TranslationWriter:
+    """Writes translations onto existing segment rows in bulk.
+    
+    On PostgreSQL each batch is a single ``UPDATE ... FROM unnest(...)``
+    joined on the primary key, with the batch sent as one array per column
+    so the statement text never changes; other databases get one
+    executemany of single-row UPDATEs per batch. Rows are addressed by the IDs handed out
+    by SegmentWriter, so no segments are loaded into the session. The writer
+    never commits; the caller owns the transaction.
+    """
+    
+    def __init__(self, db: Session, batch_size: Optional[int] = None):
+        self.db = db
+        self.batch_size = max(1, batch_size or settings.segment_batch_size)
+        self.use_arrays = db.get_bind().dialect.name == "postgresql"
+        self.rows_written = 0
+    
+    def write(self, segment_ids: List[UUID], translations: List[SegmentTranslation]):
+        rows = [
+            {
+                "segment_id": segment_id,
+                "translated_text": translation.text,
+                "translation_method": translation.method,
+                "confidence_score": translation.confidence_score,
+                "tm_match_score": translation.tm_match_score,
+            }
+            for segment_id, translation in zip(segment_ids, translations)
+        ]
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            if self.use_arrays:
+                self._update_from_arrays(batch)
+            else:
+                self._update_executemany(batch)
+            self.rows_written += len(batch)
+    
+    def _update_from_arrays(self, rows: List[Dict[str, Any]]):
+        self.db.execute(UPDATE_FROM_ARRAYS, {
+            "ids": [str(row["segment_id"]) for row in rows],
+            "texts": [row["translated_text"] for row in rows],
+            "methods": [row["translation_method"] for row in rows],
+            "confidence": [row["confidence_score"] for row in rows],
+            "tm_scores": [row["tm_match_score"] for row in rows],
+        })
+    
+    def _update_executemany(self, rows: List[Dict[str, Any]]):
+        table = Segment.__table__
+        self.db.execute(
+            update(table)
+            .where(table.c.id == bindparam("segment_id"))
+            .values(
+                translated_text=bindparam("translated_text"),
+                translation_method=bindparam("translation_method"),
+                confidence_score=bindparam("confidence_score"),
+                tm_match_score=bindparam("tm_match_score")
+            ),
+            rows
+        )
+
+
+def write_overflow_flags(db: Session, flags: Dict[UUID, Optional[Dict[str, Any]]]):
+    """Set or clear the "overflow" QA flag of segments, keeping their other flags.
+    
+    ``flags`` maps each segment to its new overflow flag, or None where the
+    text now fits. On PostgreSQL this is one ``UPDATE ... FROM unnest(...)``
+    that only touches rows whose flags change; other databases read the
+    flags back and write the changed rows in one executemany. Never commits.
+    """
+    if not flags:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(OVERFLOW_FLAGS_FROM_ARRAYS, {
+            "ids": [str(segment_id) for segment_id in flags],
+            "flags": [json.dumps(flag) if flag is not None else None for flag in flags.values()],
+        })
+        return
+    
+    rows = []
+    existing = db.execute(select(Segment.id, Segment.qa_flags).where(Segment.id.in_(list(flags))))
+    for segment_id, qa_flags in existing:
+        qa_flags = qa_flags or []
+        kept = [flag for flag in qa_flags if flag.get("type") != "overflow"]
+        flag = flags[segment_id]
+        if flag is None and len(kept) == len(qa_flags):
+            continue
+        rows.append({"segment_id": segment_id, "qa_flags": kept + ([flag] if flag is not None else [])})
+    if rows:
+        table = Segment.__table__
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("segment_id"))
+            .values(qa_flags=bindparam("qa_flags")),
+            rows
+        )
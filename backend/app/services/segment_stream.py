@@ -0,0 +1,247 @@
+"""
+Streaming a job's segments as NDJSON from a server-side cursor
+"""
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select, tuple_
+
+from ..core.config import settings
+from ..core.database import StreamSessionLocal, run_db
+from ..models.segment import Segment
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+# Fields a client can ask for, with the columns each one reads
+SEGMENT_FIELDS = {
+    "id": [Segment.id],
+    "job_id": [],
+    "page_number": [Segment.page_number],
+    "segment_index": [Segment.segment_index],
+    "bbox": [Segment.bbox_x0, Segment.bbox_y0, Segment.bbox_x1, Segment.bbox_y1],
+    "source_text": [Segment.source_text],
+    "translated_text": [Segment.translated_text],
+    "post_edited_text": [Segment.post_edited_text],
+    "font_name": [Segment.font_name],
+    "font_size": [Segment.font_size],
+    "style_runs": [Segment.style_runs],
+    "translation_method": [Segment.translation_method],
+    "confidence_score": [Segment.confidence_score],
+    "tm_match_score": [Segment.tm_match_score],
+    "qa_flags": [Segment.qa_flags],
+}
+
+
+# One per connection in the stream pool; a request finding none free gets 503
+_slots = threading.BoundedSemaphore(settings.segment_stream_max_streams)
+
+
+class SegmentStreamExpired(Exception):
+    """Raised into a stream whose client stopped reading or kept it too long"""
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """The requested fields of a comma-separated list, all of them by default"""
+    if not fields:
+        return list(SEGMENT_FIELDS)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in SEGMENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown segment fields: {', '.join(unknown)}")
+    return names
+
+
+def decode_segment_cursor(cursor: str) -> Tuple[int, int]:
+    """The (page_number, segment_index) of the last segment a client received"""
+    values = decode_cursor(cursor, 2)
+    if not all(type(value) is int for value in values):
+        raise InvalidCursor("Malformed cursor")
+    return values[0], values[1]
+
+
+@dataclass
+class SegmentQuery:
+    """Which of a job's segments to stream, and which of their fields"""
+    job_id: UUID
+    fields: List[str]
+    page_from: Optional[int] = None  # 1-based, like the pages users see
+    page_to: Optional[int] = None
+    after: Optional[Tuple[int, int]] = None  # keyset: segments after this (page, index)
+    limit: Optional[int] = None
+
+
+class SegmentStream:
+    """Reads a job's segments in page order and formats them as NDJSON.
+    
+    Rows come from a server-side cursor in batches of ``batch_size``, so
+    memory stays flat whatever the size of the job, and only the columns
+    behind the requested fields are selected. Each batch is sent as one
+    chunk of lines. With a ``limit``, a final ``{"next_cursor": ...}`` line
+    carries the cursor for the next page (null once the job is exhausted).
+    
+    The stream holds a session of its own, since it outlives the request's,
+    from the stream pool: ``reserve`` takes one of its slots before the
+    response starts, or returns False when all are taken. A watchdog closes
+    the cursor and frees the slot once the client leaves a batch unread for
+    ``idle_timeout`` seconds or the stream has run for ``max_seconds``; the
+    response is then cut off rather than ended, so the client cannot mistake
+    it for a complete one. Database calls run on the database threadpool one
+    at a time, so closing can be queued behind a fetch still in flight.
+    """
+    
+    def __init__(
+        self,
+        query: SegmentQuery,
+        batch_size: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        max_seconds: Optional[float] = None
+    ):
+        self.query = query
+        self.batch_size = max(1, batch_size or settings.segment_stream_batch_size)
+        self.idle_timeout = settings.segment_stream_idle_timeout if idle_timeout is None else idle_timeout
+        self.max_seconds = settings.segment_stream_max_seconds if max_seconds is None else max_seconds
+        self._db = None
+        self._result = None
+        self._lock = threading.Lock()
+        self._slot = False
+        self._expired = False
+        self._started_at = self._active_at = 0.0
+        self._watchdog: Optional[asyncio.Task] = None
+        
+        self._columns = [Segment.page_number, Segment.segment_index]
+        for field in query.fields:
+            for column in SEGMENT_FIELDS[field]:
+                if column not in self._columns:
+                    self._columns.append(column)
+        self._formatters = [(field, self._formatter(field)) for field in query.fields]
+    
+    def _formatter(self, field: str) -> Callable[[Any], Any]:
+        positions = [self._columns.index(column) for column in SEGMENT_FIELDS[field]]
+        if field == "job_id":
+            job_id = str(self.query.job_id)
+            return lambda row: job_id
+        if field == "id":
+            i = positions[0]
+            return lambda row: str(row[i])
+        if field == "bbox":
+            x0, y0, x1, y1 = positions
+            return lambda row: {
+                "x0": row[x0],
+                "y0": row[y0],
+                "x1": row[x1],
+                "y1": row[y1],
+                "width": row[x1] - row[x0],
+                "height": row[y1] - row[y0],
+            }
+        i = positions[0]
+        return lambda row: row[i]
+    
+    def statement(self):
+        query = self.query
+        statement = select(*self._columns).where(Segment.job_id == query.job_id)
+        # Segments store 0-based page numbers
+        if query.page_from is not None:
+            statement = statement.where(Segment.page_number >= query.page_from - 1)
+        if query.page_to is not None:
+            statement = statement.where(Segment.page_number <= query.page_to - 1)
+        if query.after is not None:
+            statement = statement.where(
+                tuple_(Segment.page_number, Segment.segment_index) > tuple_(*query.after)
+            )
+        statement = statement.order_by(Segment.page_number, Segment.segment_index)
+        if query.limit is not None:
+            # One extra row tells whether there is a next page
+            statement = statement.limit(query.limit + 1)
+        return statement
+    
+    def reserve(self) -> bool:
+        """Take a stream slot; call on the event loop before responding"""
+        if not _slots.acquire(blocking=False):
+            return False
+        self._slot = True
+        self._started_at = self._active_at = time.monotonic()
+        self._watchdog = asyncio.create_task(self._watch())
+        return True
+    
+    async def _watch(self):
+        while True:
+            deadline = min(self._active_at + self.idle_timeout, self._started_at + self.max_seconds)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(remaining)
+        print(f"Closing segment stream for job {self.query.job_id}: client idle or stream too long")
+        self._expired = True
+        await run_db(self._close)
+    
+    def _open(self):
+        with self._lock:
+            if self._expired:
+                return
+            self._db = StreamSessionLocal()
+            self._result = self._db.execute(
+                self.statement(),
+                execution_options={"stream_results": True, "yield_per": self.batch_size}
+            )
+    
+    def _fetch(self) -> List[Any]:
+        with self._lock:
+            if self._result is None:
+                return []
+            return self._result.fetchmany(self.batch_size)
+    
+    def _close(self):
+        with self._lock:
+            try:
+                if self._result is not None:
+                    self._result.close()
+                if self._db is not None:
+                    self._db.close()
+            except Exception as e:
+                print(f"Failed to close segment stream: {e}")
+            finally:
+                self._result = self._db = None
+                if self._slot:
+                    self._slot = False
+                    _slots.release()
+    
+    def _record(self, row) -> Dict[str, Any]:
+        return {field: formatter(row) for field, formatter in self._formatters}
+    
+    async def lines(self) -> AsyncIterator[bytes]:
+        limit = self.query.limit
+        sent = 0
+        last = None
+        more = False
+        try:
+            await run_db(self._open)
+            while not more:
+                rows = await run_db(self._fetch)
+                if self._expired:
+                    raise SegmentStreamExpired(f"Segment stream for job {self.query.job_id} timed out")
+                if not rows:
+                    break
+                if limit is not None and sent + len(rows) > limit:
+                    rows = rows[:limit - sent]
+                    more = True
+                if rows:
+                    sent += len(rows)
+                    last = rows[-1]
+                    yield "".join(
+                        json.dumps(self._record(row), default=str) + "\n" for row in rows
+                    ).encode()
+                    self._active_at = time.monotonic()
+            
+            if limit is not None:
+                next_cursor = encode_cursor(last[0], last[1]) if more else None
+                yield (json.dumps({"next_cursor": next_cursor}) + "\n").encode()
+        finally:
+            if self._watchdog is not None:
+                self._watchdog.cancel()
+            # Shielded so a disconnect does not leave the cursor open
+            await asyncio.shield(run_db(self._close))
@@ -0,0 +1,325 @@
+"""
+Translation stages applied to a job's segments
+"""
+import hashlib
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.job import Job
+from ..models.segment import Segment
+from .glossary_matcher import GlossaryMatcher, GlossaryUsageTracker, get_glossary_matcher
+from .translation_memory import TranslationMemoryService
+from .translation_provider import BatchingTranslator
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass
+class SegmentTranslation:
+    """The translation chosen for one segment and where it came from"""
+    text: str
+    method: str  # "glossary", "tm", "tm_fuzzy" or the MT provider's method
+    confidence_score: Optional[float] = None
+    tm_match_score: Optional[float] = None
+
+
+class SegmentTranslator:
+    """Translates batches of segment texts for a job.
+    
+    Segments that are exactly a glossary term take the term's translation.
+    Exact translation memory matches are resolved next, then fuzzy matches
+    scoring at least ``tm_fuzzy_threshold``. Only the remaining segments are
+    sent to the configured MT provider in batched requests, with glossary
+    terms substituted into the source and carrying their best fuzzy score for
+    review. Counters are kept across batches so the worker can report them on
+    the job.
+    """
+    
+    def __init__(self, db: Session, job: Job):
+        self.db = db
+        self.job = job
+        self.source_language = job.source_language or "auto"
+        self.target_language = job.target_language
+        self.tm_service = TranslationMemoryService(db)
+        self.mt = BatchingTranslator()
+        # TM entries are keyed by a concrete language pair
+        self.use_tm = settings.tm_enabled and job.source_language is not None
+        
+        self.glossary: Optional[GlossaryMatcher] = None
+        if settings.glossary_enabled and job.source_language is not None:
+            self.glossary = get_glossary_matcher(
+                db, self.source_language, self.target_language, (job.options or {}).get("domain")
+            )
+        self.glossary_usage = GlossaryUsageTracker()
+        
+        self.segments = 0
+        self.glossary_hits = 0
+        self.glossary_terms_applied = 0
+        self.tm_exact_hits = 0
+        self.tm_fuzzy_hits = 0
+        self.mt_segments = 0
+    
+    async def translate(self, texts: List[str]) -> List[SegmentTranslation]:
+        """Translate a batch of segment texts, preserving order"""
+        results: List[Optional[SegmentTranslation]] = [None] * len(texts)
+        self.segments += len(texts)
+        
+        term_matches = [self.glossary.find(text) for text in texts] if self.glossary else [[] for _ in texts]
+        for i, matches in enumerate(term_matches):
+            # The whole segment is a single glossary term
+            if len(matches) == 1 and texts[i][:matches[0].start].strip() == "" and texts[i][matches[0].end:].strip() == "":
+                results[i] = SegmentTranslation(
+                    text=GlossaryMatcher.apply(texts[i], matches),
+                    method="glossary",
+                    confidence_score=1.0
+                )
+                self.glossary_usage.record(matches)
+                self.glossary_hits += 1
+        
+        if self.use_tm:
+            matches = await self.tm_service.lookup_exact(texts, self.source_language, self.target_language)
+            for i, match in enumerate(matches):
+                if match is not None and results[i] is None:
+                    results[i] = SegmentTranslation(
+                        text=match.target_text,
+                        method="tm",
+                        confidence_score=1.0,
+                        tm_match_score=1.0
+                    )
+                    self.tm_exact_hits += 1
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        fuzzy_scores: Dict[int, float] = {}
+        if self.use_tm and settings.tm_fuzzy_enabled and pending:
+            candidates = await self.tm_service.lookup_fuzzy(
+                [texts[i] for i in pending], self.source_language, self.target_language
+            )
+            for i, matches in zip(pending, candidates):
+                if not matches:
+                    continue
+                best = matches[0]
+                if best.score >= settings.tm_fuzzy_threshold:
+                    results[i] = SegmentTranslation(
+                        text=best.target_text,
+                        method="tm_fuzzy",
+                        confidence_score=best.score,
+                        tm_match_score=best.score
+                    )
+                    self.tm_fuzzy_hits += 1
+                else:
+                    fuzzy_scores[i] = best.score
+            pending = [i for i in pending if results[i] is None]
+        
+        if pending:
+            sources = []
+            for i in pending:
+                if term_matches[i]:
+                    self.glossary_usage.record(term_matches[i])
+                    self.glossary_terms_applied += len(term_matches[i])
+                    sources.append(GlossaryMatcher.apply(texts[i], term_matches[i]))
+                else:
+                    sources.append(texts[i])
+            
+            translations = await self.mt.translate(
+                sources,
+                self.source_language,
+                self.target_language
+            )
+            for i, translation in zip(pending, translations):
+                results[i] = SegmentTranslation(
+                    text=translation,
+                    method=self.mt.method,
+                    confidence_score=0.95,  # Mock confidence
+                    tm_match_score=fuzzy_scores.get(i)
+                )
+            self.mt_segments += len(pending)
+        
+        return results
+    
+    def flush_usage(self):
+        """Write the batched glossary usage counts"""
+        self.glossary_usage.flush(self.db)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """Counters to record on the job"""
+        return {
+            "segments": self.segments,
+            "glossary_hits": self.glossary_hits,
+            "glossary_terms_applied": self.glossary_terms_applied,
+            "tm_exact_hits": self.tm_exact_hits,
+            "tm_fuzzy_hits": self.tm_fuzzy_hits,
+            "tm_hit_rate": round((self.tm_exact_hits + self.tm_fuzzy_hits) / self.segments, 4) if self.segments else 0.0,
+            "mt_segments": self.mt_segments,
+            "mt_requests": self.mt.requests,
+            "mt_chars": self.mt.chars,
+        }
+
+
+class _KeyFilter:
+    """Fixed-size Bloom filter: never misses a key it was given, rarely matches one it wasn't"""
+    
+    def __init__(self, bits: int = 1 << 23):
+        self.size = bits
+        self._bits = bytearray(bits // 8)
+    
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little") % self.size, int.from_bytes(digest[8:], "little") % self.size
+    
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class _Distinct:
+    """A distinct source string: its first-seen text, occurrences and translation"""
+    __slots__ = ("text", "count", "translation", "reused")
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.count = 0
+        self.translation: Optional[SegmentTranslation] = None
+        self.reused = False  # translation taken from the job's stored segments
+
+
+class SegmentDeduplicator:
+    """Collapses repeated source strings across a document.
+    
+    Headers, footers and boilerplate repeat on most pages. Each distinct
+    string (compared after collapsing whitespace) is translated once and the
+    result fanned back out to every occurrence. Case is preserved, since it
+    changes the translation. Translations are kept by distinct string, so
+    pages streamed in later reuse those of earlier pages.
+    
+    At most ``max_entries`` strings are kept, the least recently seen dropped
+    first by ``trim``. With a session and job, a dropped string that comes
+    back takes the translation already stored on the job's segments rather
+    than being translated again; a fixed-size filter of dropped strings
+    limits those lookups to likely repeats.
+    """
+    
+    def __init__(self, db: Optional[Session] = None, job_id: Optional[UUID] = None, max_entries: Optional[int] = None):
+        self.db = db
+        self.job_id = job_id
+        self.max_entries = max(1, max_entries or settings.dedup_max_entries)
+        self._entries: "OrderedDict[str, _Distinct]" = OrderedDict()
+        self._dropped = _KeyFilter()
+        # Repeats saved by strings already dropped, by translation method
+        self._saved: Dict[str, List[int]] = {}
+        self.segments = 0
+        self.unique_segments = 0
+        self.stored_hits = 0
+    
+    @staticmethod
+    def key(text: str) -> str:
+        return _WHITESPACE.sub(" ", text.strip())
+    
+    def add(self, texts: List[str]) -> List[str]:
+        """Register segment texts and return the key of each one's distinct string"""
+        keys = []
+        for text in texts:
+            key = self.key(text)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Distinct(text)
+                self.unique_segments += 1
+            else:
+                self._entries.move_to_end(key)
+            entry.count += 1
+            keys.append(key)
+        self.segments += len(texts)
+        return keys
+    
+    def text(self, key: str) -> str:
+        return self._entries[key].text
+    
+    def translation(self, key: str) -> Optional[SegmentTranslation]:
+        return self._entries[key].translation
+    
+    def set(self, key: str, translation: SegmentTranslation):
+        self._entries[key].translation = translation
+    
+    def pending(self, keys: List[str]) -> List[str]:
+        """The distinct strings among ``keys`` not translated yet, in first-seen order"""
+        pending = [key for key in dict.fromkeys(keys) if self._entries[key].translation is None]
+        if self.db is not None:
+            self._load_stored([key for key in pending if key in self._dropped])
+        return [key for key in pending if self._entries[key].translation is None]
+    
+    def restore(self, keys: List[str], translations: List[Optional[SegmentTranslation]]):
+        """Take translations stored by an earlier run for strings not translated yet"""
+        for key, translation in zip(keys, translations):
+            entry = self._entries[key]
+            if translation is not None and entry.translation is None:
+                entry.translation = translation
+    
+    def trim(self):
+        """Drop the least recently seen strings over ``max_entries``; call once a batch is written"""
+        while len(self._entries) > self.max_entries:
+            key, entry = self._entries.popitem(last=False)
+            self._dropped.add(key)
+            if entry.translation is not None:
+                saved = self._saved.setdefault(entry.translation.method, [0, 0])
+                repeats = self._repeats(entry)
+                saved[0] += repeats
+                saved[1] += repeats * len(entry.text)
+    
+    def _load_stored(self, keys: List[str]):
+        """Translations on the job's segments for strings dropped and seen again"""
+        if not keys:
+            return
+        by_text = {self._entries[key].text: key for key in keys}
+        rows = self.db.execute(
+            select(
+                Segment.source_text, Segment.translated_text, Segment.translation_method,
+                Segment.confidence_score, Segment.tm_match_score
+            ).where(
+                Segment.job_id == self.job_id,
+                Segment.translated_text.isnot(None),
+                Segment.source_text.in_(list(by_text))
+            )
+        )
+        for row in rows:
+            entry = self._entries[by_text[row.source_text]]
+            if entry.translation is None:
+                entry.translation = SegmentTranslation(
+                    text=row.translated_text,
+                    method=row.translation_method,
+                    confidence_score=row.confidence_score,
+                    tm_match_score=row.tm_match_score
+                )
+                entry.reused = True
+                self.unique_segments -= 1
+                self.stored_hits += 1
+    
+    @staticmethod
+    def _repeats(entry: _Distinct) -> int:
+        """Occurrences that did not need a translation of their own"""
+        return entry.count if entry.reused else entry.count - 1
+    
+    def metrics(self, mt_method: str) -> Dict[str, Any]:
+        """Counters for the work saved by translating each string once"""
+        mt_segments_saved, mt_chars_saved = self._saved.get(mt_method, (0, 0))
+        for entry in self._entries.values():
+            if entry.translation is not None and entry.translation.method == mt_method:
+                repeats = self._repeats(entry)
+                mt_segments_saved += repeats
+                mt_chars_saved += repeats * len(entry.text)
+        return {
+            "segments": self.segments,
+            "unique_segments": self.unique_segments,
+            "mt_segments_saved": mt_segments_saved,
+            "mt_chars_saved": mt_chars_saved,
+            "dedup_stored_hits": self.stored_hits,
+        }
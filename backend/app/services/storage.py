@@ -0,0 +1,77 @@
+"""
+Local file storage helpers
+"""
+import os
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit"""
+    
+    def __init__(self, max_size: int):
+        super().__init__(f"File too large. Maximum size is {max_size} bytes")
+        self.max_size = max_size
+
+
+@dataclass
+class StoredFile:
+    """A file written to local storage"""
+    path: str
+    size: int
+    sha256: str
+
+
+async def save_upload_file(
+    upload: UploadFile,
+    dest_path: str,
+    max_size: Optional[int] = None,
+    chunk_size: Optional[int] = None
+) -> StoredFile:
+    """Stream an upload to ``dest_path`` in fixed-size chunks.
+    
+    The body is written to a temporary file next to the destination while the
+    size limit is enforced and a SHA-256 is computed, then atomically renamed
+    into place. Nothing is left behind if the upload is rejected. The copy,
+    hashing and fsync all run in the threadpool, off the event loop.
+    """
+    max_size = settings.max_file_size if max_size is None else max_size
+    chunk_size = chunk_size or settings.upload_chunk_size
+    return await run_in_threadpool(_write_file, upload.file, dest_path, max_size, chunk_size)
+
+
+def _write_file(source: BinaryIO, dest_path: str, max_size: int, chunk_size: int) -> StoredFile:
+    """Copy ``source`` to ``dest_path`` durably; the blocking half of save_upload_file"""
+    directory = os.path.dirname(dest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLargeError(max_size)
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    return StoredFile(path=dest_path, size=size, sha256=digest.hexdigest())
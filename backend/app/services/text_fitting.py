@@ -0,0 +1,165 @@
+"""
+Fitting translated text into the bounding boxes of the source text
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..core.config import settings
+
+
+LINE_HEIGHT = 1.2  # line advance as a multiple of the font size
+FIT_TOLERANCE = 0.05  # share of the box height text may spill over and still fit
+
+
+@dataclass
+class TextFit:
+    """Fitted sizes and line breaks for a batch of texts, indexed by text.
+    
+    ``words`` holds every text's words in order, ``word_starts`` the offset
+    of each text's first word (plus a final end offset) and ``breaks`` flags
+    the words that start a new line at the chosen size.
+    """
+    scale: np.ndarray
+    font_size: np.ndarray
+    line_count: np.ndarray
+    required_height: np.ndarray
+    overflow: np.ndarray
+    words: List[str]
+    word_starts: np.ndarray
+    breaks: np.ndarray
+    
+    def lines(self, i: int) -> List[str]:
+        start, stop = int(self.word_starts[i]), int(self.word_starts[i + 1])
+        if start == stop:
+            return []
+        bounds = [start] + (start + 1 + np.flatnonzero(self.breaks[start + 1:stop])).tolist() + [stop]
+        return [" ".join(self.words[a:b]) for a, b in zip(bounds, bounds[1:])]
+
+
+def candidate_scales(min_scale: Optional[float] = None, steps: Optional[int] = None) -> np.ndarray:
+    """Font size multipliers tried, largest first"""
+    min_scale = settings.fit_min_scale if min_scale is None else min_scale
+    steps = settings.fit_scale_steps if steps is None else steps
+    return np.linspace(1.0, min_scale, max(1, steps))
+
+
+def fit_texts(
+    texts: Sequence[str],
+    widths: Sequence[float],
+    heights: Sequence[float],
+    sizes: Sequence[float],
+    fonts: Sequence,
+    scales: Optional[np.ndarray] = None
+) -> TextFit:
+    """Pick the largest candidate font size at which each text fits its box.
+    
+    ``fonts`` are per-text font objects exposing ``advances``, an em-unit
+    advance table indexed by BMP code point, and ``text_width``. Word widths
+    come from one gather over all characters of all texts. Every text is
+    then wrapped greedily at every candidate scale at once, one word
+    position per step, and fits when no word is wider than the box and its
+    lines are no taller than the box. Texts that fit at no scale are drawn
+    at the smallest one and flagged as overflowing.
+    """
+    n = len(texts)
+    scales = candidate_scales() if scales is None else np.asarray(scales, dtype=np.float64)
+    widths = np.asarray(widths, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    sizes = np.maximum(np.asarray(sizes, dtype=np.float64), 1e-6)
+    
+    split = [text.split() for text in texts]
+    counts = np.fromiter(map(len, split), dtype=np.int64, count=n)
+    word_starts = np.concatenate(([0], np.cumsum(counts)))
+    words = [word for text_words in split for word in text_words]
+    total = len(words)
+    
+    # One stacked advance table per distinct font
+    table_index: Dict[int, int] = {}
+    unique_fonts = []
+    font_index = np.empty(n, dtype=np.int64)
+    for i, font in enumerate(fonts):
+        k = table_index.get(id(font))
+        if k is None:
+            k = table_index[id(font)] = len(unique_fonts)
+            unique_fonts.append(font)
+        font_index[i] = k
+    if unique_fonts:
+        advances = np.stack([font.advances for font in unique_fonts])
+    else:
+        advances = np.zeros((1, 0x10000), dtype=np.float32)
+    space = advances[font_index, 0x20].astype(np.float64)
+    
+    # Word widths in em
+    word_em = np.zeros(total)
+    if total:
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=total)
+        codes = np.frombuffer("".join(words).encode("utf-32-le"), dtype=np.uint32)
+        char_font = np.repeat(np.repeat(font_index, counts), lengths)
+        bmp = codes < 0x10000
+        char_em = advances[char_font, np.where(bmp, codes, 0)].astype(np.float64)
+        for j in np.flatnonzero(~bmp):
+            char_em[j] = unique_fonts[char_font[j]].text_width(chr(codes[j]), 1.0)
+        word_em = np.add.reduceat(char_em, np.concatenate(([0], np.cumsum(lengths)[:-1])))
+    
+    # Texts ranked by word count, so those still wrapping at word position j
+    # are a prefix of the ranking, and words ordered by (position, rank), so
+    # each step reads one contiguous slice
+    by_rank = np.argsort(-counts, kind="stable")
+    rank = np.empty(n, dtype=np.int64)
+    rank[by_rank] = np.arange(n)
+    word_text = np.repeat(np.arange(n), counts)
+    position = np.arange(total) - word_starts[word_text]
+    word_order = np.lexsort((rank[word_text], position))
+    ranked_counts = counts[by_rank]
+    max_words = int(ranked_counts[0]) if n else 0
+    active = np.searchsorted(-ranked_counts, -np.arange(max_words), side="left")
+    
+    s = len(scales)
+    available = (widths / sizes)[by_rank][:, None] / scales[None, :]  # line width in em
+    ranked_space = space[by_rank][:, None]
+    line_em = np.zeros((n, s))
+    ranked_lines = np.repeat((ranked_counts > 0).astype(np.int64)[:, None], s, axis=1)
+    too_wide = np.zeros((n, s), dtype=bool)
+    breaks = np.zeros((total, s), dtype=bool)
+    
+    offset = 0
+    for j in range(max_words):
+        k = int(active[j])
+        index = word_order[offset:offset + k]
+        offset += k
+        width = word_em[index][:, None]
+        if j == 0:
+            line_em[:k] = width
+        else:
+            extended = line_em[:k] + ranked_space[:k] + width
+            wrap = extended > available[:k]
+            line_em[:k] = np.where(wrap, width, extended)
+            ranked_lines[:k] += wrap
+            breaks[index] = wrap
+        too_wide[:k] |= width > available[:k]
+    
+    line_counts = np.empty_like(ranked_lines)
+    line_counts[by_rank] = ranked_lines
+    word_too_wide = np.empty_like(too_wide)
+    word_too_wide[by_rank] = too_wide
+    
+    # The last line only needs its own height, not a full line advance
+    line_ems = np.where(line_counts > 0, (line_counts - 1) * LINE_HEIGHT + 1.0, 0.0)
+    required = line_ems * sizes[:, None] * scales[None, :]
+    fits = (required <= heights[:, None] * (1.0 + FIT_TOLERANCE)) & ~word_too_wide
+    
+    fitted = fits.any(axis=1)
+    choice = np.where(fitted, fits.argmax(axis=1), s - 1)
+    rows = np.arange(n)
+    return TextFit(
+        scale=scales[choice],
+        font_size=sizes * scales[choice],
+        line_count=line_counts[rows, choice],
+        required_height=required[rows, choice],
+        overflow=~fitted,
+        words=words,
+        word_starts=word_starts,
+        breaks=breaks[np.arange(total), choice[word_text]]
+    )
@@ -0,0 +1,117 @@
+"""
+Translation memory lookups
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Dict
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.cache import LRUCache
+from ..core.config import settings
+from ..models.translation_memory import TranslationMemory
+from .fuzzy_tm import FuzzyMatch, get_fuzzy_index, index_entry
+
+
+@dataclass
+class TMMatch:
+    """A translation memory entry matched to a source segment"""
+    entry_id: UUID
+    target_text: str
+    score: float
+
+
+# Exact hits keyed by (source_language, target_language, source_hash), shared by
+# every job in the process
+_exact_match_cache = LRUCache(settings.tm_cache_size)
+
+
+class TranslationMemoryService:
+    """Resolves source segments against the translation_memory table"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    async def lookup_exact(
+        self,
+        texts: List[str],
+        source_language: str,
+        target_language: str
+    ) -> List[Optional[TMMatch]]:
+        """Find exact (normalized) matches for a batch of segments.
+        
+        Segments are hashed with TranslationMemory.generate_hash. Hashes not in
+        the in-process LRU are resolved with one ``IN (...)`` query per
+        ``tm_lookup_batch_size`` distinct hashes.
+        """
+        hashes = [TranslationMemory.generate_hash(text) for text in texts]
+        
+        found: Dict[str, TMMatch] = {}
+        missing = []
+        for source_hash in set(hashes):
+            match = _exact_match_cache.get((source_language, target_language, source_hash))
+            if match is not None:
+                found[source_hash] = match
+            else:
+                missing.append(source_hash)
+        
+        batch_size = max(1, settings.tm_lookup_batch_size)
+        for start in range(0, len(missing), batch_size):
+            rows = self.db.execute(
+                select(TranslationMemory.source_hash, TranslationMemory.id, TranslationMemory.target_text)
+                .where(
+                    TranslationMemory.source_language == source_language,
+                    TranslationMemory.target_language == target_language,
+                    TranslationMemory.source_hash.in_(missing[start:start + batch_size])
+                )
+                # Best entry first when a segment has several translations
+                .order_by(TranslationMemory.quality_score.desc(), TranslationMemory.match_count.desc())
+            ).all()
+            
+            for source_hash, entry_id, target_text in rows:
+                if source_hash in found:
+                    continue
+                match = TMMatch(entry_id=entry_id, target_text=target_text, score=1.0)
+                found[source_hash] = match
+                _exact_match_cache.put((source_language, target_language, source_hash), match)
+        
+        return [found.get(source_hash) for source_hash in hashes]
+    
+    async def lookup_fuzzy(
+        self,
+        texts: List[str],
+        source_language: str,
+        target_language: str,
+        top_k: Optional[int] = None,
+        min_score: Optional[float] = None
+    ) -> List[List[FuzzyMatch]]:
+        """Find the ``top_k`` most similar entries for each segment, best first"""
+        top_k = top_k or settings.tm_fuzzy_top_k
+        min_score = settings.tm_fuzzy_min_score if min_score is None else min_score
+        
+        index = get_fuzzy_index(self.db, source_language, target_language)
+        return [index.query(text, top_k=top_k, min_score=min_score) for text in texts]
+    
+    async def add_entry(
+        self,
+        source_text: str,
+        target_text: str,
+        source_language: str,
+        target_language: str,
+        **fields
+    ) -> TranslationMemory:
+        """Store a translation pair and make it available to lookups right away"""
+        entry = TranslationMemory(
+            source_text=source_text,
+            target_text=target_text,
+            source_language=source_language,
+            target_language=target_language,
+            **fields
+        )
+        self.db.add(entry)
+        self.db.commit()
+        
+        _exact_match_cache.pop((source_language, target_language, entry.source_hash))
+        index_entry(entry)
+        return entry
@@ -0,0 +1,171 @@
+"""
+Machine translation providers and request batching
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from ..core.config import settings
+
+
+class TranslationProvider(ABC):
+    """A machine translation backend.
+    
+    Providers translate whole batches per call so a remote backend costs one
+    round trip per request rather than one per segment. Implementations must
+    return exactly one translation per input, in input order.
+    """
+    
+    # Recorded on segments as their translation_method
+    method = "mt"
+    
+    @abstractmethod
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """Translate a batch of non-empty segments"""
+
+
+class MockProvider(TranslationProvider):
+    """Mock translation - just adds a [TARGET] prefix"""
+    
+    method = "mock_mt"
+    
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        return [f"[{target_lang.upper()}] {text}" for text in texts]
+
+
+class StubProvider(MockProvider):
+    """Offline stand-in for a remote MT API, for benchmarking batch settings.
+    
+    Every call waits ``latency_ms`` (the round trip) plus the time its
+    characters take at ``chars_per_second``. Throughput is shared by all
+    calls on the provider, like a per-account rate limit, and at most
+    ``max_concurrent_calls`` requests are served at once.
+    """
+    
+    method = "stub_mt"
+    
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        chars_per_second: Optional[float] = None,
+        max_concurrent_calls: Optional[int] = None
+    ):
+        self.latency = (latency_ms if latency_ms is not None else settings.mt_stub_latency_ms) / 1000.0
+        self.chars_per_second = chars_per_second if chars_per_second is not None else settings.mt_stub_chars_per_second
+        max_concurrent_calls = max_concurrent_calls or settings.mt_stub_max_concurrent_calls
+        self._slots = asyncio.Semaphore(max_concurrent_calls) if max_concurrent_calls else None
+        self._available_at = 0.0
+        self.calls = 0
+        self.chars = 0
+    
+    async def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        if self._slots is None:
+            return await self._serve(texts, source_lang, target_lang)
+        async with self._slots:
+            return await self._serve(texts, source_lang, target_lang)
+    
+    async def _serve(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        chars = sum(len(text) for text in texts)
+        self.calls += 1
+        self.chars += chars
+        
+        delay = self.latency
+        if self.chars_per_second:
+            # Reserve this call's share of the throughput budget
+            now = time.monotonic()
+            start = max(now, self._available_at)
+            self._available_at = start + chars / self.chars_per_second
+            delay += self._available_at - now
+        
+        await asyncio.sleep(delay)
+        return await super().translate_batch(texts, source_lang, target_lang)
+
+
+PROVIDERS = {
+    "mock": MockProvider,
+    "stub": StubProvider,
+}
+
+
+def get_translation_provider(name: Optional[str] = None) -> TranslationProvider:
+    """Create the configured provider"""
+    name = name or settings.translation_provider
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown translation provider: {name}")
+
+
+class BatchingTranslator:
+    """Packs segments into provider requests and runs them concurrently.
+    
+    Segments are grouped in order into batches of at most ``max_batch_chars``
+    characters and ``max_batch_segments`` segments; a single segment longer
+    than the character budget is sent on its own. Up to ``concurrency``
+    batches are in flight at once. Blank segments are returned unchanged
+    without reaching the provider.
+    """
+    
+    def __init__(
+        self,
+        provider: Optional[TranslationProvider] = None,
+        max_batch_chars: Optional[int] = None,
+        max_batch_segments: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.provider = provider or get_translation_provider()
+        self.max_batch_chars = max_batch_chars or settings.mt_batch_max_chars
+        self.max_batch_segments = max_batch_segments or settings.mt_batch_max_segments
+        self.concurrency = max(1, concurrency or settings.mt_concurrency)
+        self.requests = 0
+        self.chars = 0
+    
+    @property
+    def method(self) -> str:
+        return self.provider.method
+    
+    def pack(self, texts: List[str]) -> List[List[int]]:
+        """Group the indices of non-blank texts into request batches"""
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        batch_chars = 0
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            if batch and (
+                batch_chars + len(text) > self.max_batch_chars
+                or len(batch) >= self.max_batch_segments
+            ):
+                batches.append(batch)
+                batch, batch_chars = [], 0
+            batch.append(i)
+            batch_chars += len(text)
+        if batch:
+            batches.append(batch)
+        return batches
+    
+    async def translate(self, texts: List[str], source_lang: str, target_lang: str) -> List[str]:
+        """Translate segments, preserving order"""
+        results = list(texts)
+        batches = self.pack(texts)
+        if not batches:
+            return results
+        
+        slots = asyncio.Semaphore(self.concurrency)
+        
+        async def run(batch: List[int]):
+            sources = [texts[i] for i in batch]
+            async with slots:
+                translations = await self.provider.translate_batch(sources, source_lang, target_lang)
+            if len(translations) != len(batch):
+                raise ValueError(
+                    f"Provider returned {len(translations)} translations for {len(batch)} segments"
+                )
+            for i, translation in zip(batch, translations):
+                results[i] = translation
+        
+        await asyncio.gather(*(run(batch) for batch in batches))
+        self.requests += len(batches)
+        self.chars += sum(len(texts[i]) for batch in batches for i in batch)
+        return results
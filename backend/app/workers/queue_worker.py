@@ -0,0 +1,169 @@
+"""
+Queue worker entry point
+
+Runs a pool of worker processes that claim jobs from the durable job queue:
+
+    python -m app.workers.queue_worker --processes 2 --concurrency 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+from typing import Set
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..services.font_service import get_font_service
+from ..services.job_queue import JobQueue
+from .translation_worker import run_translation_job_sync
+
+
+class QueueWorker:
+    """Claims queue entries and runs up to ``concurrency`` jobs at a time.
+    
+    Each job runs in its own thread with its own event loop and database
+    session, as the pipeline does blocking database work. The worker keeps
+    the leases of its running jobs alive until they finish; a job whose
+    lease is lost is stopped, and its outcome left to the new holder.
+    """
+    
+    def __init__(self, concurrency: int, worker_id: str):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id
+        self.stopping = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        print(f"Worker {self.worker_id} started with concurrency {self.concurrency}")
+        
+        while not self.stopping.is_set():
+            await slots.acquire()
+            
+            entry = await self._claim()
+            if entry is None:
+                slots.release()
+                try:
+                    await asyncio.wait_for(self.stopping.wait(), timeout=settings.worker_poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            task = asyncio.create_task(self._process(*entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+        
+        # Let running jobs finish before exiting
+        if self._tasks:
+            print(f"Worker {self.worker_id} waiting for {len(self._tasks)} running job(s)")
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    def stop(self):
+        self.stopping.set()
+    
+    async def _claim(self):
+        db = SessionLocal()
+        try:
+            entry = await JobQueue(db).claim(self.worker_id)
+            return (entry.id, str(entry.job_id), entry.attempts) if entry else None
+        except Exception as e:
+            print(f"Worker {self.worker_id} failed to claim a job: {e}")
+            return None
+        finally:
+            db.close()
+    
+    async def _process(self, entry_id, job_id: str, attempt: int):
+        lease_lost = threading.Event()
+        heartbeat = asyncio.create_task(self._keep_lease(entry_id, lease_lost))
+        error = None
+        try:
+            await asyncio.to_thread(run_translation_job_sync, job_id, attempt, lease_lost)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            heartbeat.cancel()
+        
+        if lease_lost.is_set():
+            print(f"Job {job_id} attempt {attempt} stopped after its lease was lost")
+            return
+        
+        db = SessionLocal()
+        try:
+            queue = JobQueue(db)
+            if error is None:
+                await queue.complete(entry_id, self.worker_id)
+            else:
+                retry = await queue.fail(entry_id, error, self.worker_id)
+                print(f"Job {job_id} attempt {attempt} failed: {error}" + (" (will retry)" if retry else ""))
+        finally:
+            db.close()
+    
+    async def _keep_lease(self, entry_id, lease_lost: threading.Event):
+        interval = max(1.0, settings.job_lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            db = SessionLocal()
+            try:
+                if not await JobQueue(db).heartbeat(entry_id, self.worker_id):
+                    print(f"Worker {self.worker_id} lost the lease on queue entry {entry_id}, stopping its job")
+                    lease_lost.set()
+                    return
+            except Exception as e:
+                print(f"Worker {self.worker_id} failed to renew lease on {entry_id}: {e}")
+            finally:
+                db.close()
+
+
+def run_worker_process(concurrency: int):
+    """Run a single worker process until SIGINT/SIGTERM"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    
+    # Index fonts up front rather than on the first job's build step
+    print(f"Indexed {get_font_service().build_index()} fonts")
+    
+    async def main():
+        worker = QueueWorker(concurrency, worker_id)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+    
+    asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run translation queue workers")
+    parser.add_argument("--processes", type=int, default=settings.worker_processes)
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    args = parser.parse_args()
+    
+    if args.processes <= 1:
+        run_worker_process(args.concurrency)
+        return
+    
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_worker_process, args=(args.concurrency,), name=f"queue-worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    
+    def forward(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signum)
+    
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+    
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
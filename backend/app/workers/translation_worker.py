@@ -3,22 +3,52 @@ Background worker for processing translation jobs
 """
 import os
 import asyncio
+import threading
+from datetime import datetime
+from typing import Optional
 from uuid import UUID
 from sqlalchemy.orm import Session
 
 from ..core.database import SessionLocal
-from ..models.job import Job, JobStatus
+from ..models.job import IN_FLIGHT_STATUSES, Job, JobStatus
 from ..models.segment import Segment
+from ..services.cancellation import CancellationToken, JobCancelled, LeaseLost, clear_cancellation
+from ..services.checkpoints import CheckpointStore
 from ..services.job_service import JobService
-from ..services.pdf_processor import PDFProcessor, MockTranslationService
+from ..services.progress_reporter import ProgressReporter
+from ..services.segment_store import TranslationWriter
+from ..services.segment_translator import SegmentDeduplicator, SegmentTranslation, SegmentTranslator
+from ..services.document_cache import file_sha256
+from ..services.pdf_builder import PDFBuilder
+from ..services.output_files import output_path as job_output_path
+from ..services.pdf_processor import PDFProcessor
+from ..services.pipeline import Pipeline, Stage, StageError
 from ..core.config import settings
 
 
-async def process_translation_job(job_id: str):
-    """Process a translation job in the background"""
+# Failure messages by pipeline stage
+STAGE_FAILURES = {
+    "extract": "PDF processing failed",
+    "translate": "Translation failed",
+    "build": "PDF generation failed",
+}
+
+
+async def process_translation_job(job_id: str, attempt: int = 1, lease_lost: Optional[threading.Event] = None):
+    """Process a translation job in the background
+    
+    Retries (``attempt > 1``) also accept jobs left in an in-flight status by
+    a worker that died. Every run continues from the job's page checkpoints:
+    pages an earlier run committed keep their segments and translations, and
+    only segments without a translation are sent for translation again.
+    Unexpected errors are re-raised after the job is marked failed so the
+    queue can schedule another attempt. Once ``lease_lost`` is set the run
+    stops at the next check and leaves the job to the worker now holding it.
+    """
     
     # Create database session
     db = SessionLocal()
+    job = None
     
     try:
         # Get job service and load job
@@ -29,151 +59,288 @@ async def process_translation_job(job_id: str):
             print(f"Job {job_id} not found")
             return
         
-        if job.status != JobStatus.UPLOADED:
+        retrying = attempt > 1 and job.status in IN_FLIGHT_STATUSES
+        if job.status != JobStatus.UPLOADED and not retrying:
             print(f"Job {job_id} is not in UPLOADED status, current: {job.status}")
             return
         
+        # Pick up the pages committed by an earlier run
+        checkpoints = CheckpointStore(db, job.id)
+        resumed_pages = len(checkpoints.load())
+        if resumed_pages:
+            print(f"Job {job_id} resuming with {resumed_pages} checkpointed pages")
+        
+        cancel_token = CancellationToken(db, job.id, lease_lost=lease_lost)
+        progress = ProgressReporter(job_service, job, cancel_token=cancel_token)
+        
+        # Construct file paths
+        file_path = os.path.join(settings.upload_dir, job.options.get("file_key", "").replace("/", "_"))
+        output_path = job_output_path(job)
+        
         # Update job status to processing
-        await job_service.update_job_status(
-            job,
+        await progress.report(
             JobStatus.EXTRACTING,
             progress_percent=0.0,
             current_stage="Starting PDF processing"
         )
         
-        # Construct file path
-        file_path = os.path.join(settings.upload_dir, job.options.get("file_key", "").replace("/", "_"))
-        
         if not os.path.exists(file_path):
-            await job_service.update_job_status(
-                job,
+            await progress.report(
                 JobStatus.FAILED,
                 error_message=f"File not found: {file_path}"
             )
             return
         
-        # Initialize PDF processor
-        pdf_processor = PDFProcessor(db)
-        
-        # Step 1: Process PDF and extract text
+        # Initialize services
+        pdf_processor = PDFProcessor(db, progress=progress, cancel_token=cancel_token)
         try:
-            processed_pages = await pdf_processor.process_pdf(job, file_path)
-            
-            # Update status
-            await job_service.update_job_status(
-                job,
-                JobStatus.TRANSLATING,
-                progress_percent=70.0,
-                current_stage="Starting translation"
-            )
-            
+            translator = SegmentTranslator(db, job)
         except Exception as e:
-            await job_service.update_job_status(
-                job,
+            await progress.report(
                 JobStatus.FAILED,
-                error_message=f"PDF processing failed: {str(e)}"
+                error_message=f"Translation failed: {str(e)}"
             )
             return
+        dedup = SegmentDeduplicator(db, job.id)
+        translation_writer = TranslationWriter(db)
+        builder = PDFBuilder(db)
+        counts = {"extracted": 0, "translated": 0, "built": 0}
+        resumed_segments = 0
         
-        # Step 2: Translate text segments
-        try:
-            total_segments = sum(len(page.text_blocks) for page in processed_pages)
-            translated_segments = 0
+        content_hash = job.options.get("content_hash") or file_sha256(file_path)
+        # The background depends only on the source file: write it while pages stream
+        background = asyncio.ensure_future(pdf_processor.create_background(job, file_path, content_hash))
+        
+        async def report_progress(stage: str):
+            total = pdf_processor.total_pages or 1
+            if counts["extracted"] < total:
+                status = JobStatus.EXTRACTING
+            elif counts["translated"] < total:
+                status = JobStatus.TRANSLATING
+            else:
+                status = JobStatus.BUILDING
+            await progress.report(
+                status,
+                progress_percent=20.0 + 75.0 * sum(counts.values()) / (3 * total),
+                current_page=counts["extracted"],
+                current_stage=stage
+            )
+        
+        async def extract():
+            async for page, segment_ids in pdf_processor.iter_document(
+                job, file_path, content_hash, checkpoints=checkpoints
+            ):
+                counts["extracted"] += 1
+                await report_progress(f"Extracted page {page.page_number + 1}")
+                yield page, segment_ids
+        
+        async def translate(batch):
+            nonlocal resumed_segments
+            cancel_token.raise_if_cancelled()
+            # Translation writes onto the segment rows
+            pdf_processor.segment_writer.flush()
             
-            for page in processed_pages:
-                # Get text segments
-                segments_text = [block.text for block in page.text_blocks]
-                
-                # Translate segments
-                translations = await MockTranslationService.translate_segments(
-                    segments_text,
-                    job.source_language or "auto",
-                    job.target_language
-                )
-                
-                # Update segments in database
-                page_segments = db.query(Segment).filter(
-                    Segment.job_id == job.id,
-                    Segment.page_number == page.page_number
-                ).order_by(Segment.segment_index).all()
-                
-                for segment, translation in zip(page_segments, translations):
-                    segment.translated_text = translation
-                    segment.translation_method = "mock_mt"
-                    segment.confidence_score = 0.95  # Mock confidence
-                
-                translated_segments += len(translations)
-                
-                # Update progress
-                progress = 70.0 + (translated_segments / total_segments) * 20.0
-                await job_service.update_job_status(
-                    job,
-                    JobStatus.TRANSLATING,
-                    progress_percent=progress,
-                    current_stage=f"Translated {translated_segments}/{total_segments} segments"
-                )
+            # New pages are checkpointed with their rows; stored ones bring their IDs and translations
+            checkpoints.mark_extracted([
+                (page.page_number, len(segment_ids)) for page, segment_ids in batch if segment_ids is not None
+            ])
+            stored = checkpoints.stored_segments([
+                page.page_number for page, segment_ids in batch if segment_ids is None
+            ])
+            
+            # Translate each distinct string in the document once
+            page_keys = [dedup.add([block.text for block in page.text_blocks]) for page, _ in batch]
+            for (page, segment_ids), keys in zip(batch, page_keys):
+                if segment_ids is None:
+                    dedup.restore(keys, [
+                        SegmentTranslation(
+                            text=row.translated_text,
+                            method=row.translation_method,
+                            confidence_score=row.confidence_score,
+                            tm_match_score=row.tm_match_score
+                        ) if row.translated_text is not None else None
+                        for row in stored[page.page_number]
+                    ])
+            pending = dedup.pending([key for keys in page_keys for key in keys])
+            chunk_size = settings.translation_chunk_size
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                # Glossary and translation memory first, then MT
+                translations = await translator.translate([dedup.text(key) for key in chunk])
+                for key, translation in zip(chunk, translations):
+                    dedup.set(key, translation)
             
+            # Fan the translations back out to every segment by ID, skipping
+            # stored segments that already have theirs
+            results = []
+            batch_ids, batch_translations = [], []
+            for (page, segment_ids), keys in zip(batch, page_keys):
+                page_translations = [dedup.translation(key) for key in keys]
+                if segment_ids is None:
+                    rows = stored[page.page_number]
+                    segment_ids = [row.id for row in rows]
+                    for row, translation in zip(rows, page_translations):
+                        if row.translated_text is None:
+                            batch_ids.append(row.id)
+                            batch_translations.append(translation)
+                        else:
+                            resumed_segments += 1
+                else:
+                    batch_ids.extend(segment_ids)
+                    batch_translations.extend(page_translations)
+                results.append((page, segment_ids, [translation.text for translation in page_translations]))
+            
+            translation_writer.write(batch_ids, batch_translations)
+            checkpoints.mark_translated([page.page_number for page, _ in batch])
             db.commit()
+            # Only once this batch's translations are stored can its strings be dropped
+            dedup.trim()
+            counts["translated"] += len(batch)
+            await report_progress(f"Translated {counts['translated']} pages")
+            return results
+        
+        async def build(batch):
+            cancel_token.raise_if_cancelled()
+            if builder.document is None:
+                builder.start(await background)
             
-        except Exception as e:
-            await job_service.update_job_status(
-                job,
-                JobStatus.FAILED,
-                error_message=f"Translation failed: {str(e)}"
-            )
-            return
+            # Overlay the translations on the text-free pages
+            await builder.add_pages({
+                page.page_number: builder.overlays_for_page(page, texts, segment_ids)
+                for page, segment_ids, texts in batch
+            })
+            counts["built"] += len(batch)
+            await report_progress(f"Built {counts['built']} pages")
+            return []
+        
+        batch_pages = max(1, settings.pipeline_batch_pages)
+        pipeline = Pipeline("extract", [
+            Stage("translate", translate, max_batch=batch_pages),
+            Stage("build", build, max_batch=batch_pages),
+        ])
         
-        # Step 3: Generate output PDF (mock for now)
         try:
-            await job_service.update_job_status(
-                job,
+            await pipeline.run(extract())
+            if builder.document is None:
+                # A document without pages still gets its background as output
+                builder.start(await background)
+            
+            await progress.report(
                 JobStatus.BUILDING,
-                progress_percent=90.0,
-                current_stage="Building translated PDF"
+                progress_percent=95.0,
+                current_stage="Writing translated PDF"
             )
+            build_stats = await builder.finish(output_path)
+            checkpoints.mark_built()
+            # Downloads use the content hash as their ETag
+            job.output_sha256 = await asyncio.to_thread(file_sha256, output_path)
+            job.output_file_key = os.path.basename(output_path)
             
-            # Mock output file creation
-            output_filename = f"translated_{job.filename}"
-            output_path = os.path.join(settings.upload_dir, f"{job.id}_{output_filename}")
+            translator.flush_usage()
+            # Segment counts cover the whole document, the rest distinct strings
+            await job_service.record_metrics(
+                job,
+                **{**translator.metrics(), **dedup.metrics(translator.mt.method)},
+                **build_stats,
+                **pipeline.metrics(),
+                resumed_pages=resumed_pages,
+                resumed_segments=resumed_segments
+            )
             
-            # For now, just copy the original file as a placeholder
-            import shutil
-            shutil.copy2(file_path, output_path)
+            cancel_token.raise_if_cancelled()
             
             # Update job with download URL
             download_url = f"http://localhost:8000/api/v1/download/{job.id}"
             
-            await job_service.update_job_status(
-                job,
+            await progress.report(
                 JobStatus.COMPLETED,
                 progress_percent=100.0,
                 current_stage="Translation completed",
                 download_url=download_url
             )
-            
+        
+        except StageError as e:
+            if isinstance(e.error, JobCancelled):
+                raise e.error
+            await progress.report(
+                JobStatus.FAILED,
+                error_message=f"{STAGE_FAILURES[e.stage]}: {str(e.error)}"
+            )
+            return
+        
+        except JobCancelled:
+            raise
+        
         except Exception as e:
-            await job_service.update_job_status(
-                job,
+            await progress.report(
                 JobStatus.FAILED,
                 error_message=f"PDF generation failed: {str(e)}"
             )
             return
         
-        print(f"Job {job_id} completed successfully")
+        finally:
+            builder.close()
+            if not background.done():
+                background.cancel()
+            await asyncio.gather(background, return_exceptions=True)
         
+        print(f"Job {job_id} completed successfully")
+    
+    except LeaseLost:
+        # Committed pages stay for the new lease holder to resume from
+        db.rollback()
+        print(f"Job {job_id} stopped: its lease passed to another worker")
+    
+    except JobCancelled:
+        await _discard_cancelled_job(db, job_service, job, cancel_token, output_path)
+        print(f"Job {job_id} cancelled")
+    
     except Exception as e:
         print(f"Unexpected error processing job {job_id}: {e}")
-        if job:
-            await job_service.update_job_status(
-                job,
-                JobStatus.FAILED,
-                error_message=f"Unexpected error: {str(e)}"
-            )
+        if job and not (lease_lost is not None and lease_lost.is_set()):
+            try:
+                await job_service.update_job_status(
+                    job,
+                    JobStatus.FAILED,
+                    error_message=f"Unexpected error: {str(e)}",
+                    unless_cancelled=True
+                )
+            except JobCancelled:
+                pass
+        raise
     
     finally:
+        if job is not None:
+            clear_cancellation(job.id)
         db.close()
 
 
-def run_translation_job_sync(job_id: str):
+async def _discard_cancelled_job(
+    db: Session,
+    job_service: JobService,
+    job: Job,
+    cancel_token: CancellationToken,
+    output_path: str
+):
+    """Drop the partial results of a cancelled job and record how long it took to halt"""
+    db.rollback()
+    
+    db.query(Segment).filter(Segment.job_id == job.id).delete(synchronize_session=False)
+    CheckpointStore(db, job.id).clear()
+    if os.path.exists(output_path):
+        os.remove(output_path)
+    
+    # Re-read the status columns written by the API process
+    db.refresh(job)
+    requested_at = cancel_token.requested_at or job.cancel_requested_at
+    metrics = {}
+    if requested_at is not None:
+        metrics["cancel_latency_ms"] = round((datetime.utcnow() - requested_at).total_seconds() * 1000, 1)
+    
+    job.current_stage = "Cancelled by user"
+    await job_service.record_metrics(job, **metrics)
+
+
+def run_translation_job_sync(job_id: str, attempt: int = 1, lease_lost: Optional[threading.Event] = None):
     """Synchronous wrapper for the async translation job"""
-    asyncio.run(process_translation_job(job_id))
+    asyncio.run(process_translation_job(job_id, attempt, lease_lost))
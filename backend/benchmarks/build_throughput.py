@@ -0,0 +1,81 @@
+"""
+Benchmark translated PDF building at 10, 100 and 1000 pages
+
+Usage (from the backend directory):
+    python -m benchmarks.build_throughput --pages 10 100 1000 --workers 1 4 \\
+        --font /usr/share/fonts/truetype/dejavu/DejaVuSans.ttf
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+from app.services.pdf_builder import OverlayText, PDFBuilder
+
+
+def make_background(path: str, pages: int):
+    """Write a text-free PDF with some vector art per page"""
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.draw_rect(fitz.Rect(40, 40, 555, 120), color=(0.2, 0.3, 0.6), fill=(0.9, 0.9, 1.0))
+        page.draw_line((40, 780), (555, 780), color=(0.5, 0.5, 0.5))
+    doc.save(path)
+    doc.close()
+
+
+def make_overlays(pages: int, per_page: int, font):
+    """Synthetic translated paragraphs, one column of them per page"""
+    text = "Die Vertragsparteien vereinbaren die hierin festgelegten Bedingungen und Pflichten."
+    return {
+        page: [
+            OverlayText(text=f"{i}. {text}", bbox=(50.0, 140.0 + i * 30, 545.0, 168.0 + i * 30), font_size=9.0, font=font)
+            for i in range(per_page)
+        ]
+        for page in range(pages)
+    }
+
+
+async def build(background: str, overlays, output: str, workers: int):
+    """Build the way the worker does: pages added in pipeline batches as they are translated"""
+    # Overlays carry no segment IDs, so fitting writes nothing to the database
+    builder = PDFBuilder(db=None)
+    builder.start(background, workers=workers)
+    try:
+        batch_pages = max(1, settings.pipeline_batch_pages)
+        page_numbers = sorted(overlays)
+        for start in range(0, len(page_numbers), batch_pages):
+            await builder.add_pages({page: overlays[page] for page in page_numbers[start:start + batch_pages]})
+        return await builder.finish(output)
+    finally:
+        builder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--font", default=None, help="TrueType/OpenType font to embed; Helvetica if omitted")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            background = os.path.join(tmp, f"background_{pages}.pdf")
+            make_background(background, pages)
+            overlays = make_overlays(pages, args.per_page, args.font)
+            for workers in sorted(set(args.workers)):
+                output = os.path.join(tmp, f"output_{pages}_{workers}.pdf")
+                start = time.perf_counter()
+                stats = asyncio.run(build(background, overlays, output, workers))
+                elapsed = time.perf_counter() - start
+                print(f"pages={pages:5d} workers={workers:2d} {pages / elapsed:8.1f} pages/sec  "
+                      f"glyphs={stats['output_glyphs']:4d} size={os.path.getsize(output) / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
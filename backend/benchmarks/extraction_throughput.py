@@ -0,0 +1,82 @@
+"""
+Benchmark single-process vs. page-parallel PDF text extraction
+
+Each configuration runs twice in the same process: "cold" includes starting
+the extraction pool, "warm" reuses it as later jobs in a worker process do.
+On a single-core machine, with a fresh pool per job, 2 workers managed 51
+pages/sec on 120 pages and 128 on 600, against 314 and 317 in process. With
+the pool kept, 2 workers reach 206 and 163 pages/sec warm (--min-pages 0),
+and documents under extraction_parallel_min_pages (200) no longer use the
+pool at all. More workers only pay off with cores to run them.
+
+Usage (from the backend directory):
+    python -m benchmarks.extraction_throughput --pages 300 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+from app.services.pdf_processor import PDFProcessor
+
+
+def make_synthetic_pdf(path: str, pages: int, lines_per_page: int = 45):
+    """Write a text-heavy synthetic PDF with a few fonts per page"""
+    doc = fitz.open()
+    fonts = ["helv", "tiro", "cour"]
+    for page_num in range(pages):
+        page = doc.new_page()
+        for line in range(lines_per_page):
+            page.insert_text(
+                (50, 50 + line * 16),
+                f"Clause {page_num}.{line}: The parties agree to the terms set forth herein.",
+                fontname=fonts[line % len(fonts)],
+                fontsize=10
+            )
+    doc.save(path)
+    doc.close()
+
+
+async def run_extraction(file_path: str, pages: int, workers: int) -> float:
+    """Extract every page and return throughput in pages/sec"""
+    # Extraction never touches the database, so no session is needed
+    processor = PDFProcessor(db=None)
+    start = time.perf_counter()
+    count = 0
+    async for _ in processor.iter_pages(file_path, pages, workers=workers):
+        count += 1
+    elapsed = time.perf_counter() - start
+    return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 600])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument("--min-pages", type=int, default=settings.extraction_parallel_min_pages,
+                        help="extraction_parallel_min_pages; 0 shards every document")
+    args = parser.parse_args()
+    settings.extraction_parallel_min_pages = args.min_pages
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            path = os.path.join(tmp, f"synthetic_{pages}.pdf")
+            make_synthetic_pdf(path, pages)
+            baseline = None
+            for workers in sorted(set(args.workers)):
+                # The first run may start the process's extraction pool; later
+                # jobs in the same worker process reuse it
+                cold = asyncio.run(run_extraction(path, pages, workers))
+                rate = asyncio.run(run_extraction(path, pages, workers))
+                baseline = baseline or rate
+                print(f"pages={pages:5d} workers={workers:2d} "
+                      f"{cold:8.1f} pages/sec cold {rate:8.1f} pages/sec warm  "
+                      f"speedup={rate / baseline:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
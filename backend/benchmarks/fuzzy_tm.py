@@ -0,0 +1,91 @@
+"""
+Benchmark fuzzy translation memory lookups, by segment length
+
+Indexes ``--entries`` synthetic translation memory entries of 5 to 60 words
+in a MinHashLSHIndex, then times queries at each ``--lengths`` word count:
+half are edited copies of an indexed entry (a word or two changed, the way
+revised documents differ), half are unrelated text. Reports p50/p99 lookup
+latency and how often the edited copy's entry came back first.
+
+Usage (from the backend directory):
+    python -m benchmarks.fuzzy_tm --entries 20000 --lengths 5 10 20 40 60
+"""
+import argparse
+import random
+import time
+import uuid
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.fuzzy_tm import MinHashLSHIndex
+
+
+def make_vocabulary(size: int, rng: random.Random):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(2, 10))) for _ in range(size)]
+
+
+def sentence(words: int, vocabulary, rng: random.Random) -> str:
+    text = " ".join(rng.choice(vocabulary) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def edit(text: str, vocabulary, rng: random.Random) -> str:
+    words = text.split()
+    for _ in range(max(1, len(words) // 20)):
+        words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[5, 10, 20, 40, 60])
+    parser.add_argument("--queries", type=int, default=400, help="queries per length")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    # A small vocabulary, so unrelated segments still share shingles and bands
+    vocabulary = make_vocabulary(2000, rng)
+    index = MinHashLSHIndex(
+        num_perm=settings.tm_fuzzy_num_perm,
+        bands=settings.tm_fuzzy_bands,
+        max_candidates=settings.tm_fuzzy_max_candidates
+    )
+    
+    by_length = {length: [] for length in args.lengths}
+    start = time.perf_counter()
+    for i in range(args.entries):
+        length = args.lengths[i % len(args.lengths)] if i % 2 else rng.randint(5, 60)
+        entry_id = uuid.uuid4()
+        text = sentence(length, vocabulary, rng)
+        index.add(entry_id, text, f"[DE] {text}")
+        if length in by_length:
+            by_length[length].append((entry_id, text))
+    print(f"Indexed {len(index)} entries in {time.perf_counter() - start:.1f}s\n")
+    
+    print(f"{'words':>5s} {'p50 ms':>8s} {'p99 ms':>8s} {'found':>6s}")
+    for length in args.lengths:
+        timings = []
+        found = 0
+        for i in range(args.queries):
+            if i % 2:
+                entry_id, text = rng.choice(by_length[length])
+                query = edit(text, vocabulary, rng)
+            else:
+                entry_id, query = None, sentence(length, vocabulary, rng)
+            
+            start = time.perf_counter()
+            matches = index.query(query, top_k=settings.tm_fuzzy_top_k, min_score=settings.tm_fuzzy_min_score)
+            timings.append(time.perf_counter() - start)
+            if entry_id is not None and matches and matches[0].entry_id == entry_id:
+                found += 1
+        
+        p50, p99 = np.percentile(np.array(timings) * 1000, [50, 99])
+        print(f"{length:5d} {p50:8.3f} {p99:8.3f} {found / (args.queries // 2):6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark span-per-segment extraction vs. layout-aware paragraph aggregation
+
+Usage (from the backend directory):
+    python -m benchmarks.layout_aggregation --pages 100 --columns 1 2 3
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+from app.services.pdf_processor import PDFProcessor
+
+
+def make_multicolumn_pdf(path: str, pages: int, columns: int, paragraphs: int = 5, lines: int = 6):
+    """Write a PDF with a full-width title and justified-looking paragraphs per column"""
+    doc = fitz.open()
+    margin, gutter, size = 50, 18, 9
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((margin, 50), f"Quarterly Report, Section {page_num}", fontsize=16, fontname="hebo")
+        width = (page.rect.width - 2 * margin - (columns - 1) * gutter) / columns
+        for column in range(columns):
+            x = margin + column * (width + gutter)
+            y = 90
+            for paragraph in range(paragraphs):
+                for line in range(lines):
+                    # Each line is three spans: plain, bold, plain
+                    words = ["The board", "reviewed", f"item {paragraph}.{line}"]
+                    fonts = ["helv", "hebo", "helv"]
+                    offset = x
+                    for word, font in zip(words, fonts):
+                        page.insert_text((offset, y), word, fontsize=size, fontname=font)
+                        offset += fitz.get_text_length(word + " ", fontname=font, fontsize=size)
+                    y += size * 1.3
+                y += size * 1.5
+        page.insert_text((page.rect.width / 2, page.rect.height - 30), str(page_num + 1), fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+async def run_extraction(file_path: str, pages: int):
+    """Return (segments, seconds) for a full extraction pass"""
+    processor = PDFProcessor(db=None)
+    segments = 0
+    start = time.perf_counter()
+    async for page in processor.iter_pages(file_path, pages, workers=1):
+        segments += len(page.text_blocks)
+    return segments, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--columns", type=int, nargs="+", default=[1, 2, 3])
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for columns in args.columns:
+            path = os.path.join(tmp, f"columns_{columns}.pdf")
+            make_multicolumn_pdf(path, args.pages, columns)
+            for aggregate in (False, True):
+                settings.layout_aggregation_enabled = aggregate
+                segments, elapsed = asyncio.run(run_extraction(path, args.pages))
+                print(f"columns={columns} {'paragraphs' if aggregate else 'spans':10s} "
+                      f"segments={segments:7d}  {args.pages / elapsed:7.1f} pages/sec")
+
+
+if __name__ == "__main__":
+    main()
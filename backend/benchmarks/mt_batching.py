@@ -0,0 +1,65 @@
+"""
+Benchmark MT batching and concurrency settings against the stub provider
+
+Usage (from the backend directory; no database needed):
+    python -m benchmarks.mt_batching --segments 2000 --latency-ms 200
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.services.translation_provider import BatchingTranslator, StubProvider
+
+
+def make_segments(count: int, seed: int = 0):
+    """Synthetic spans with a realistic spread of lengths"""
+    rng = random.Random(seed)
+    words = ["layout", "invoice", "total", "page", "section", "figure", "amount", "date", "report", "summary"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 30))) for _ in range(count)]
+
+
+async def run(segments, args, max_chars, max_segments, concurrency):
+    provider = StubProvider(
+        latency_ms=args.latency_ms,
+        chars_per_second=args.chars_per_second,
+        max_concurrent_calls=args.max_concurrent_calls
+    )
+    translator = BatchingTranslator(
+        provider,
+        max_batch_chars=max_chars,
+        max_batch_segments=max_segments,
+        concurrency=concurrency
+    )
+    start = time.perf_counter()
+    await translator.translate(segments, "en", "de")
+    return time.perf_counter() - start, translator.requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segments", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--chars-per-second", type=float, default=0.0)
+    parser.add_argument("--max-concurrent-calls", type=int, default=0)
+    args = parser.parse_args()
+    
+    segments = make_segments(args.segments)
+    configs = [
+        # (max_batch_chars, max_batch_segments, concurrency)
+        (10 ** 9, 1, 1),  # one request per segment, like the old loop
+        (5000, 100, 1),
+        (5000, 100, 4),
+        (5000, 100, 16),
+        (20000, 500, 4),
+    ]
+    
+    print(f"{'chars':>8s} {'segs':>5s} {'conc':>5s} {'requests':>9s} {'seconds':>8s} {'segments/sec':>13s}")
+    for max_chars, max_segments, concurrency in configs:
+        elapsed, requests = asyncio.run(run(segments, args, max_chars, max_segments, concurrency))
+        print(f"{max_chars if max_chars < 10 ** 9 else '-':>8} {max_segments:5d} {concurrency:5d} "
+              f"{requests:9d} {elapsed:8.2f} {len(segments) / elapsed:13.0f}")
+
+
+if __name__ == "__main__":
+    main()
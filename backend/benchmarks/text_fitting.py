@@ -0,0 +1,97 @@
+"""
+Benchmark fitting translated text into source boxes, per page
+
+Compares the vectorized fitting engine with a per-segment loop that wraps
+each text at every candidate size, at several segment counts per page.
+
+Usage (from the backend directory):
+    python -m benchmarks.text_fitting --segments 100 1000 5000 \\
+        --font /usr/share/fonts/truetype/dejavu/DejaVuSans.ttf
+"""
+import argparse
+import random
+import time
+
+from app.services.pdf_builder import load_font
+from app.services.text_fitting import FIT_TOLERANCE, LINE_HEIGHT, candidate_scales, fit_texts
+
+
+WORDS = (
+    "Die Vertragsparteien vereinbaren hierin festgelegten Bedingungen und Pflichten "
+    "gemäß Anlage der Rechnung innerhalb von dreißig Tagen nach Lieferung Zahlung"
+).split()
+
+
+def make_page(segments: int, seed: int = 0):
+    """Synthetic segments: source boxes sized for text about 30% shorter"""
+    rng = random.Random(seed)
+    texts, widths, heights, sizes = [], [], [], []
+    for _ in range(segments):
+        size = rng.choice([8.0, 9.0, 10.0, 12.0])
+        lines = rng.choice([1, 1, 1, 2, 3, 6])
+        width = rng.uniform(80, 500)
+        words = max(1, int(lines * width / (size * 5.5) * 1.3))
+        texts.append(" ".join(rng.choice(WORDS) for _ in range(words)))
+        widths.append(width)
+        heights.append(size * (1.15 + (lines - 1) * LINE_HEIGHT))
+        sizes.append(size)
+    return texts, widths, heights, sizes
+
+
+def fit_loop(texts, widths, heights, sizes, font, scales):
+    """Reference: greedy wrap of each text at each size until one fits"""
+    overflow = 0
+    for text, width, height, size in zip(texts, widths, heights, sizes):
+        for scale in scales:
+            fitted_size = size * scale
+            lines, line = 0, ""
+            too_wide = False
+            for word in text.split():
+                candidate = f"{line} {word}" if line else word
+                if line and font.text_width(candidate, fitted_size) > width:
+                    lines += 1
+                    line = word
+                else:
+                    line = candidate
+                too_wide |= font.text_width(word, fitted_size) > width
+            lines += 1 if line else 0
+            required = ((lines - 1) * LINE_HEIGHT + 1.0) * fitted_size if lines else 0.0
+            if required <= height * (1.0 + FIT_TOLERANCE) and not too_wide:
+                break
+        else:
+            overflow += 1
+    return overflow
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segments", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--font", default=None, help="TrueType/OpenType font to measure with; Helvetica if omitted")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--loop-max", type=int, default=1000, help="largest segment count to time the per-segment loop at")
+    args = parser.parse_args()
+    
+    font = load_font(args.font)
+    scales = candidate_scales()
+    for segments in args.segments:
+        texts, widths, heights, sizes = make_page(segments)
+        fonts = [font] * segments
+        
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fit = fit_texts(texts, widths, heights, sizes, fonts, scales)
+            best = min(best, time.perf_counter() - start)
+        line = (f"segments={segments:5d} vectorized {best * 1000:8.2f} ms/page  "
+                f"shrunk={int((fit.scale < 1).sum()):5d} overflow={int(fit.overflow.sum()):5d}")
+        
+        if segments <= args.loop_max:
+            start = time.perf_counter()
+            overflow = fit_loop(texts, widths, heights, sizes, font, scales)
+            elapsed = time.perf_counter() - start
+            line += f"  loop {elapsed * 1000:9.2f} ms/page (overflow={overflow})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""
+Shared fixtures
+
+Database tests run against the database in DATABASE_URL and are skipped
+when it cannot be reached.
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import Base, SessionLocal, engine
+from app.models import job, segment, glossary, translation_memory, job_queue, page_checkpoint  # noqa: F401
+
+
+@pytest.fixture(scope="session")
+def database():
+    try:
+        with engine.connect():
+            pass
+    except OperationalError as e:
+        pytest.skip(f"Database not available: {e}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture
+def db(database):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
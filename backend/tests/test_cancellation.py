@@ -0,0 +1,107 @@
+"""
+Cancelling a running job from another process
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime
+
+import fitz
+import pytest
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import Job, JobStatus
+from app.models.segment import Segment
+from app.services import segment_translator
+from app.services.cancellation import JobCancelled
+from app.services.job_service import JobService
+from app.workers.translation_worker import process_translation_job
+
+
+def make_pdf(path, pages: int, lines: int = 20):
+    document = fitz.open()
+    for page_number in range(pages):
+        page = document.new_page()
+        for i in range(lines):
+            page.insert_text((72, 72 + i * 20), f"Page {page_number + 1} line {i}: the quick brown fox.", fontsize=10)
+    document.save(str(path))
+    document.close()
+
+
+def create_job(db, status=JobStatus.UPLOADED) -> Job:
+    job = Job(
+        filename="doc.pdf",
+        target_language="de",
+        source_language="en",
+        options={"file_key": "k/doc.pdf"},
+        status=status
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def cancel_elsewhere(job_id):
+    """Cancel the way an API process on another machine does: a committed status change, no in-process signal"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id)
+            .values(status=JobStatus.CANCELLED, cancel_requested_at=datetime.utcnow())
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def status_of(job_id) -> JobStatus:
+    db = SessionLocal()
+    try:
+        return db.get(Job, job_id).status
+    finally:
+        db.close()
+
+
+def test_worker_status_write_does_not_overwrite_cancel(db):
+    job = create_job(db, status=JobStatus.EXTRACTING)
+    service = JobService(db)
+    
+    cancel_elsewhere(job.id)
+    
+    with pytest.raises(JobCancelled):
+        asyncio.run(service.update_job_status(job, JobStatus.TRANSLATING, progress_percent=50.0, unless_cancelled=True))
+    assert status_of(job.id) == JobStatus.CANCELLED
+
+
+def test_cancel_from_separate_session_stops_running_job(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    # Only the first check polls the database, as between two polls in production
+    monkeypatch.setattr(settings, "cancel_poll_interval", 3600.0)
+    monkeypatch.setattr(settings, "progress_flush_interval_ms", 0)
+    monkeypatch.setattr(settings, "pipeline_batch_pages", 1)
+    make_pdf(tmp_path / "k_doc.pdf", pages=12)
+    
+    translate = segment_translator.SegmentTranslator.translate
+    
+    async def slow_translate(self, texts):
+        await asyncio.sleep(0.2)
+        return await translate(self, texts)
+    monkeypatch.setattr(segment_translator.SegmentTranslator, "translate", slow_translate)
+    
+    job_id = create_job(db).id
+    worker = threading.Thread(target=lambda: asyncio.run(process_translation_job(str(job_id))))
+    worker.start()
+    
+    deadline = time.monotonic() + 30
+    while status_of(job_id) != JobStatus.TRANSLATING and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert status_of(job_id) == JobStatus.TRANSLATING
+    cancel_elsewhere(job_id)
+    
+    worker.join(timeout=60)
+    assert not worker.is_alive()
+    assert status_of(job_id) == JobStatus.CANCELLED
+    assert db.query(Segment).filter(Segment.job_id == job_id).count() == 0
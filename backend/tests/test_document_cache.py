@@ -0,0 +1,46 @@
+"""
+Document cache eviction
+"""
+import os
+import time
+
+from app.services.document_cache import DocumentCache
+
+HASH_OLD = "a1" + "0" * 62
+HASH_NEW = "b2" + "0" * 62
+
+
+def write(path: str, size: int, age: float = 0.0) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_evict_only_touches_document_artifacts(tmp_path):
+    cache = DocumentCache(cache_dir=str(tmp_path), max_bytes=100, max_age_days=30, grace_seconds=0)
+    old = write(cache.path_for(HASH_OLD, ".background.pdf"), 80, age=7200)
+    new = write(cache.path_for(HASH_NEW, ".jsonl.gz"), 80, age=3600)
+    subset = write(str(tmp_path / "fonts" / "6d" / ("6d" + "f" * 62 + ".subset")), 500, age=86400 * 60)
+    
+    assert cache.evict() == 1
+    assert not os.path.exists(old)
+    assert os.path.exists(new)
+    assert os.path.exists(subset)
+
+
+def test_evict_keeps_recently_used_entries_over_budget(tmp_path):
+    cache = DocumentCache(cache_dir=str(tmp_path), max_bytes=100, max_age_days=30, grace_seconds=600)
+    # Handed to a job a minute ago and not opened yet
+    background = write(cache.path_for(HASH_OLD, ".background.pdf"), 80, age=60)
+    artifact = write(cache.path_for(HASH_NEW, ".jsonl.gz"), 80)
+    
+    assert cache.evict() == 0
+    assert os.path.exists(background)
+    assert os.path.exists(artifact)
+    
+    os.utime(background, (time.time() - 1200, time.time() - 1200))
+    assert cache.evict() == 1
+    assert not os.path.exists(background)
@@ -0,0 +1,61 @@
+"""
+Downloads served from the output cache
+"""
+import asyncio
+import hashlib
+
+import httpx
+from sqlalchemy import delete, update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.main import app
+from app.models.job import Job, JobStatus
+from app.services.output_files import output_path
+
+from .test_cancellation import create_job
+
+
+def write_output(job, data: bytes):
+    with open(output_path(job), "wb") as f:
+        f.write(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def elsewhere(statement):
+    """Run a statement the way another API process would: committed, no cache invalidation"""
+    db = SessionLocal()
+    try:
+        db.execute(statement)
+        db.commit()
+    finally:
+        db.close()
+
+
+def get(url: str) -> httpx.Response:
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost") as client:
+            return await client.get(url)
+    return asyncio.run(run())
+
+
+def test_cached_output_is_not_served_after_rerun_or_delete(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    job = create_job(db, status=JobStatus.COMPLETED)
+    url = f"/api/v1/download/{job.id}"
+    first = write_output(job, b"%PDF-1 first")
+    elsewhere(update(Job).where(Job.id == job.id).values(output_sha256=first))
+    
+    response = get(url)
+    assert response.status_code == 200
+    assert response.headers["etag"] == f'"{first}"'
+    
+    # A rerun from another process replaces the file and its hash
+    second = write_output(job, b"%PDF-1 second run")
+    elsewhere(update(Job).where(Job.id == job.id).values(output_sha256=second))
+    response = get(url)
+    assert response.headers["etag"] == f'"{second}"'
+    assert response.content == b"%PDF-1 second run"
+    
+    elsewhere(delete(Job).where(Job.id == job.id))
+    assert get(url).status_code == 404
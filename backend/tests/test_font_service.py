@@ -0,0 +1,26 @@
+"""
+Font subset cache
+"""
+import glob
+import os
+
+import pytest
+
+from app.services.font_service import FontService
+
+FONTS = sorted(glob.glob("/usr/share/fonts/**/DejaVuSans.ttf", recursive=True))
+
+
+@pytest.mark.skipif(not FONTS, reason="DejaVuSans.ttf not installed")
+def test_subset_cache_is_bounded(tmp_path):
+    font = FONTS[0]
+    first = FontService(font_dirs=[], cache_dir=str(tmp_path)).subset(font, range(1, 40))
+    budget = len(first) * 3
+    service = FontService(font_dirs=[], cache_dir=str(tmp_path), subset_cache_bytes=budget)
+    
+    for start in range(40, 400, 40):
+        service.subset(font, range(start, start + 40))
+    
+    subsets = glob.glob(os.path.join(str(tmp_path), "*", "*.subset"))
+    assert 1 <= len(subsets) < 10
+    assert sum(os.path.getsize(path) for path in subsets) <= budget
@@ -0,0 +1,27 @@
+"""
+Glossary selection by domain
+"""
+import uuid
+
+from app.models.glossary import Glossary
+from app.services.glossary_matcher import GlossaryMatcher, get_glossary_matcher
+
+
+def test_domain_terms_only_apply_to_their_domain(db):
+    # A language pair of its own, so other tests' glossaries do not match
+    source, target = "en", uuid.uuid4().hex[:8]
+    db.add_all([
+        Glossary(source_term="agreement", target_term="Vereinbarung", source_language=source, target_language=target),
+        Glossary(source_term="consideration", target_term="Gegenleistung", source_language=source,
+                 target_language=target, domain="legal"),
+    ])
+    db.commit()
+    text = "In consideration of this agreement"
+    
+    def translated(domain):
+        matcher = get_glossary_matcher(db, source, target, domain)
+        return GlossaryMatcher.apply(text, matcher.find(text))
+    
+    assert translated(None) == "In consideration of this Vereinbarung"
+    assert translated("legal") == "In Gegenleistung of this Vereinbarung"
+    assert translated("medical") == "In consideration of this Vereinbarung"
@@ -0,0 +1,57 @@
+"""
+Request body limits
+"""
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestBodyLimitMiddleware
+
+LIMIT = 64 * 1024
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(RequestBodyLimitMiddleware, max_body_size=LIMIT)
+    
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+    
+    return TestClient(app)
+
+
+def multipart(size: int):
+    boundary = "boundary"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="doc.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    body = head + b"x" * size + f"\r\n--{boundary}--\r\n".encode()
+    return body, {"content-type": f"multipart/form-data; boundary={boundary}"}
+
+
+def chunked(body: bytes, chunk_size: int = 8192):
+    # A generator body goes out with Transfer-Encoding: chunked and no Content-Length
+    for offset in range(0, len(body), chunk_size):
+        yield body[offset:offset + chunk_size]
+
+
+def test_small_chunked_upload_passes():
+    body, headers = multipart(1024)
+    response = make_client().post("/upload", content=chunked(body), headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"size": 1024}
+
+
+def test_oversized_content_length_is_rejected():
+    body, headers = multipart(LIMIT * 2)
+    response = make_client().post("/upload", content=body, headers=headers)
+    assert response.status_code == 413
+
+
+def test_oversized_chunked_upload_is_rejected():
+    body, headers = multipart(LIMIT * 2)
+    response = make_client().post("/upload", content=chunked(body), headers=headers)
+    assert response.status_code == 413
+    assert "too large" in response.json()["detail"]
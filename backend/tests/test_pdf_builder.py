@@ -0,0 +1,54 @@
+"""
+Overflow QA flags written while building
+"""
+from app.models.segment import Segment
+from app.services.pdf_builder import OverlayText, PDFBuilder
+
+from .test_cancellation import create_job
+
+GLOSSARY_FLAG = {"type": "glossary_conflict", "term": "Vertrag"}
+
+
+def add_segment(db, job_id, qa_flags) -> Segment:
+    segment = Segment(
+        job_id=job_id, page_number=0, segment_index=0,
+        bbox_x0=50, bbox_y0=50, bbox_x1=150, bbox_y1=62,
+        source_text="Contract", translated_text="Vertrag", qa_flags=qa_flags
+    )
+    db.add(segment)
+    db.commit()
+    return segment
+
+
+def build(db, segment, text):
+    bbox = (segment.bbox_x0, segment.bbox_y0, segment.bbox_x1, segment.bbox_y1)
+    return PDFBuilder(db).fit_overlays({0: [OverlayText(text=text, bbox=bbox, font_size=10.0, segment_id=segment.id)]})
+
+
+def flags_of(db, segment):
+    db.expire_all()
+    return db.get(Segment, segment.id).qa_flags
+
+
+def test_overflow_flag_is_merged_into_existing_flags(db):
+    segment = add_segment(db, create_job(db).id, [GLOSSARY_FLAG])
+    
+    stats = build(db, segment, "Vertrag " * 40)
+    assert stats["fit_overflow_segments"] == 1
+    flags = flags_of(db, segment)
+    assert flags[0] == GLOSSARY_FLAG
+    assert [flag["type"] for flag in flags] == ["glossary_conflict", "overflow"]
+    
+    # A second overflowing build replaces the flag rather than adding another
+    build(db, segment, "Vertrag " * 40)
+    assert [flag["type"] for flag in flags_of(db, segment)] == ["glossary_conflict", "overflow"]
+
+
+def test_rebuild_that_fits_clears_overflow_flag(db):
+    segment = add_segment(db, create_job(db).id, [])
+    build(db, segment, "Vertrag " * 40)
+    assert [flag["type"] for flag in flags_of(db, segment)] == ["overflow"]
+    
+    stats = build(db, segment, "Vertrag")
+    assert stats["fit_overflow_segments"] == 0
+    assert flags_of(db, segment) == []
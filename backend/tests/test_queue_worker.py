@@ -0,0 +1,78 @@
+"""
+Queue workers losing the lease on a running job
+"""
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.job import JobStatus
+from app.models.job_queue import JobQueueEntry, QueueStatus
+from app.services import segment_translator
+from app.workers.queue_worker import QueueWorker
+
+from .test_cancellation import create_job, make_pdf, status_of
+
+
+def entry_of(entry_id) -> JobQueueEntry:
+    db = SessionLocal()
+    try:
+        return db.get(JobQueueEntry, entry_id)
+    finally:
+        db.close()
+
+
+def test_lost_lease_stops_job_without_recording_outcome(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "upload_dir", str(tmp_path))
+    # Heartbeats every second
+    monkeypatch.setattr(settings, "job_lease_seconds", 3)
+    monkeypatch.setattr(settings, "pipeline_batch_pages", 1)
+    make_pdf(tmp_path / "k_doc.pdf", pages=40)
+    
+    translate = segment_translator.SegmentTranslator.translate
+    
+    async def slow_translate(self, texts):
+        await asyncio.sleep(0.2)
+        return await translate(self, texts)
+    monkeypatch.setattr(segment_translator.SegmentTranslator, "translate", slow_translate)
+    
+    job_id = create_job(db).id
+    entry = JobQueueEntry(
+        job_id=job_id,
+        status=QueueStatus.RUNNING,
+        attempts=1,
+        worker_id="stale",
+        leased_until=datetime.utcnow() + timedelta(seconds=3)
+    )
+    db.add(entry)
+    db.commit()
+    entry_id = entry.id
+    
+    worker = QueueWorker(concurrency=1, worker_id="stale")
+    thread = threading.Thread(target=lambda: asyncio.run(worker._process(entry_id, str(job_id), 1)))
+    thread.start()
+    
+    deadline = time.monotonic() + 30
+    while status_of(job_id) != JobStatus.TRANSLATING and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert status_of(job_id) == JobStatus.TRANSLATING
+    
+    # Another worker reclaims the entry, as after a lease expired during a stall
+    db.execute(
+        update(JobQueueEntry)
+        .where(JobQueueEntry.id == entry_id)
+        .values(worker_id="new", leased_until=datetime.utcnow() + timedelta(seconds=60))
+    )
+    db.commit()
+    
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+    
+    entry = entry_of(entry_id)
+    assert entry.status == QueueStatus.RUNNING
+    assert entry.worker_id == "new"
+    assert status_of(job_id) == JobStatus.TRANSLATING
@@ -0,0 +1,23 @@
+"""
+Byte range parsing
+"""
+import pytest
+
+from app.core.responses import parse_range
+
+
+def test_parse_range():
+    assert parse_range("bytes=10-19", 100) == (10, 19)
+    assert parse_range("bytes=90-200", 100) == (90, 99)
+    assert parse_range("bytes=-5", 100) == (95, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+
+
+def test_invalid_range_is_ignored():
+    # Last byte before the first: invalid, so the full body is sent
+    assert parse_range("bytes=5-3", 100) is None
+
+
+def test_range_past_the_end_is_unsatisfiable():
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
@@ -0,0 +1,48 @@
+"""
+Bounded deduplication of repeated source strings
+"""
+from app.models.segment import Segment
+from app.services.segment_translator import SegmentDeduplicator, SegmentTranslation
+
+from .test_cancellation import create_job
+
+
+def translate(dedup, texts):
+    keys = dedup.add(texts)
+    for key in dedup.pending(keys):
+        dedup.set(key, SegmentTranslation(text=f"[DE] {dedup.text(key)}", method="mock"))
+    return keys
+
+
+def test_table_is_bounded_by_max_entries():
+    dedup = SegmentDeduplicator(max_entries=3)
+    for i in range(10):
+        translate(dedup, [f"line {i}", "Header"])
+        dedup.trim()
+    
+    assert len(dedup._entries) <= 3
+    metrics = dedup.metrics("mock")
+    assert metrics["segments"] == 20
+    # Without a session, a dropped string is translated again
+    assert metrics["unique_segments"] + metrics["mt_segments_saved"] == 20
+
+
+def test_dropped_string_reuses_stored_translation(db):
+    job = create_job(db)
+    db.add(Segment(
+        job_id=job.id, page_number=1, segment_index=0,
+        bbox_x0=0, bbox_y0=0, bbox_x1=10, bbox_y1=10,
+        source_text="Confidential", translated_text="Vertraulich",
+        translation_method="mock", confidence_score=0.9
+    ))
+    db.commit()
+    
+    dedup = SegmentDeduplicator(db, job.id, max_entries=1)
+    translate(dedup, ["Confidential"])
+    translate(dedup, ["Other text"])
+    dedup.trim()
+    
+    keys = dedup.add(["Confidential"])
+    assert dedup.pending(keys) == []
+    assert dedup.translation(keys[0]).text == "Vertraulich"
+    assert dedup.metrics("mock")["dedup_stored_hits"] == 1
@@ -0,0 +1,89 @@
+"""
+Segment streams: bounded slots and slow clients
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from app.models.segment import Segment
+from app.services import segment_stream
+from app.services.segment_stream import SegmentQuery, SegmentStream, SegmentStreamExpired, parse_fields
+
+from .test_cancellation import create_job
+
+
+def add_segments(db, job_id, count: int):
+    db.add_all(
+        Segment(
+            job_id=job_id, page_number=1, segment_index=i,
+            bbox_x0=0, bbox_y0=0, bbox_x1=10, bbox_y1=10,
+            source_text=f"Segment {i}", translated_text=f"Segment {i} [DE]"
+        )
+        for i in range(count)
+    )
+    db.commit()
+
+
+def test_stream_slots_are_bounded(db, monkeypatch):
+    monkeypatch.setattr(segment_stream, "_slots", threading.BoundedSemaphore(1))
+    job_id = create_job(db).id
+    add_segments(db, job_id, 3)
+    query = SegmentQuery(job_id=job_id, fields=parse_fields("id"))
+    
+    async def run():
+        first = SegmentStream(query)
+        assert first.reserve()
+        assert not SegmentStream(query).reserve()
+        
+        lines = [line async for line in first.lines()]
+        assert sum(chunk.count(b"\n") for chunk in lines) == 3
+        # Finishing the stream frees its slot
+        assert SegmentStream(query).reserve()
+    
+    asyncio.run(run())
+
+
+def test_idle_client_is_cut_off_and_frees_its_slot(db, monkeypatch):
+    monkeypatch.setattr(segment_stream, "_slots", threading.BoundedSemaphore(1))
+    job_id = create_job(db).id
+    add_segments(db, job_id, 10)
+    query = SegmentQuery(job_id=job_id, fields=parse_fields("id,translated_text"))
+    
+    async def run():
+        stream = SegmentStream(query, batch_size=2, idle_timeout=0.2)
+        assert stream.reserve()
+        lines = stream.lines()
+        await lines.__anext__()
+        
+        # The client stops reading: the watchdog closes the cursor
+        await asyncio.sleep(0.5)
+        assert stream._result is None
+        assert SegmentStream(query).reserve()
+        
+        with pytest.raises(SegmentStreamExpired):
+            await lines.__anext__()
+    
+    asyncio.run(run())
+
+
+def test_page_filters_are_one_based(db):
+    job_id = create_job(db).id
+    db.add_all(
+        Segment(
+            job_id=job_id, page_number=page, segment_index=0,
+            bbox_x0=0, bbox_y0=0, bbox_x1=10, bbox_y1=10,
+            source_text=f"Page {page + 1}"
+        )
+        for page in range(3)
+    )
+    db.commit()
+    
+    async def texts(page_from, page_to):
+        query = SegmentQuery(job_id=job_id, fields=parse_fields("source_text"), page_from=page_from, page_to=page_to)
+        body = b"".join([chunk async for chunk in SegmentStream(query).lines()])
+        return [json.loads(line)["source_text"] for line in body.splitlines()]
+    
+    assert asyncio.run(texts(1, 1)) == ["Page 1"]
+    assert asyncio.run(texts(2, None)) == ["Page 2", "Page 3"]
@@ -61,8 +61,8 @@ const UploadSection = () => {
       await translationAPI.startJob(job.id);
       setUploadProgress(80);
       
-      // Step 4: Start polling for updates
-      const cleanup = await translationAPI.pollJobStatus(job.id, (updatedJob) => {
+      // Step 4: Follow progress updates
+      const cleanup = translationAPI.subscribeToJob(job.id, (updatedJob) => {
         setCurrentJob(updatedJob);
         if (updatedJob.status === JobStatus.COMPLETED) {
           setIsProcessing(false);
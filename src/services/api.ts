@@ -44,6 +44,32 @@ export enum JobStatus {
   CANCELLED = "cancelled"
 }
 
+export interface SegmentResponse {
+  id: string;
+  job_id: string;
+  page_number: number;
+  segment_index: number;
+  bbox: { x0: number; y0: number; x1: number; y1: number; width: number; height: number };
+  source_text: string;
+  translated_text?: string;
+  post_edited_text?: string;
+  font_name?: string;
+  font_size?: number;
+  style_runs: Record<string, any>[];
+  translation_method?: string;
+  confidence_score?: number;
+  tm_match_score?: number;
+  qa_flags: Record<string, any>[];
+}
+
+export interface SegmentStreamOptions {
+  pageFrom?: number;
+  pageTo?: number;
+  fields?: (keyof SegmentResponse)[];
+  after?: string;
+  limit?: number;
+}
+
 export interface UploadResponse {
   job_id: string;
   upload_url: string;
@@ -120,7 +146,93 @@ class TranslationAPI {
     });
   }
 
-  // Polling-based status updates (WebSocket alternative for now)
+  async resumeJob(jobId: string): Promise<{ message: string; job_id: string }> {
+    return this.request(`/jobs/${jobId}/resume`, {
+      method: 'POST',
+    });
+  }
+
+  // Stream a job's segments (NDJSON), handing each batch over as it
+  // arrives. Resolves to the cursor for the next page when `limit` is set.
+  async streamSegments(
+    jobId: string,
+    options: SegmentStreamOptions,
+    onSegments: (segments: Partial<SegmentResponse>[]) => void
+  ): Promise<string | null> {
+    const params = new URLSearchParams();
+    if (options.pageFrom !== undefined) params.set('page_from', String(options.pageFrom));
+    if (options.pageTo !== undefined) params.set('page_to', String(options.pageTo));
+    if (options.fields?.length) params.set('fields', options.fields.join(','));
+    if (options.after) params.set('after', options.after);
+    if (options.limit !== undefined) params.set('limit', String(options.limit));
+
+    const response = await fetch(`${this.baseURL}/jobs/${jobId}/segments?${params}`);
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
+      throw new Error(error.detail || `HTTP ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let nextCursor: string | null = null;
+
+    for (;;) {
+      const { done, value } = await reader.read();
+      buffer += decoder.decode(value, { stream: !done });
+      const lines = buffer.split('\n');
+      buffer = done ? '' : lines.pop() ?? '';
+
+      const segments: Partial<SegmentResponse>[] = [];
+      for (const line of lines) {
+        if (!line) continue;
+        const record = JSON.parse(line);
+        if ('next_cursor' in record) nextCursor = record.next_cursor;
+        else segments.push(record);
+      }
+      if (segments.length) onSegments(segments);
+      if (done) return nextCursor;
+    }
+  }
+
+  // Push-based status updates over server-sent events, falling back to
+  // polling when the stream cannot be opened
+  subscribeToJob(
+    jobId: string,
+    onUpdate: (job: JobResponse) => void
+  ): () => void {
+    let job: JobResponse | null = null;
+    let stopPolling: (() => void) | null = null;
+    let closed = false;
+    const source = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+
+    const handle = (data: Partial<JobResponse>) => {
+      job = { ...(job as JobResponse), ...data };
+      onUpdate(job);
+      if ([JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED].includes(job.status)) {
+        source.close();
+      }
+    };
+
+    source.addEventListener('job', (event) => handle(JSON.parse((event as MessageEvent).data)));
+    source.addEventListener('progress', (event) => handle(JSON.parse((event as MessageEvent).data)));
+    source.onerror = () => {
+      if (job !== null || closed) return;  // EventSource reconnects by itself once opened
+      source.close();
+      this.pollJobStatus(jobId, onUpdate).then((stop) => {
+        if (closed) stop();
+        else stopPolling = stop;
+      });
+    };
+
+    return () => {
+      closed = true;
+      source.close();
+      stopPolling?.();
+    };
+  }
+
+  // Polling-based status updates
   async pollJobStatus(
     jobId: string,
     onUpdate: (job: JobResponse) => void,